@@ -1,10 +1,10 @@
 from core.auth import Authentication
+from core.http_client import HttpClient
 
 import argparse
 import datetime
 import json
 import os
-import requests
 from lxml import html
 import time
 import pandas as pd
@@ -17,7 +17,8 @@ def format_time_iso8601_utc(dt: datetime):
 def get_attendees(auth: Authentication):
     login_url = "https://members.asnevents.com.au/login"
     export_url = f"https://members.asnevents.com.au/event/{auth.asn['event_id']}/committee/report?Organisation=&EventAddon=&Export=Export"
-    s = requests.Session()
+    # own client, the login cookies must not leak into the shared http_client
+    s = HttpClient()
     r = s.get(login_url)
     tree = html.fromstring(r.content)
     csrf_token = tree.xpath('//input[@name="csrf_token"]/@value')[0]
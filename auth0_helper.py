@@ -19,6 +19,7 @@ from datetime import datetime
 from email.mime.image import MIMEImage
 
 from core.auth import Authentication
+from core.http_client import http_client
 #import core.schedule as schedule
 
 alphabet = string.ascii_letters + string.digits
@@ -52,8 +53,8 @@ def send_to_auth0(session, filename, access_token, connection_id):
         urlsplit(session.auth0["audience"]).netloc + \
         "/api/v2/jobs/users-imports"
     print(domain)
-    response = requests.post(domain, data=payload, files=files,
-                             headers=headers)
+    response = http_client.post(domain, data=payload, files=files,
+                                headers=headers)
     print(response.content)
 
 def retrieve_users_via_export(auth: Authentication, access_token: str) -> List[dict]:
@@ -90,7 +91,7 @@ def retrieve_users_via_export(auth: Authentication, access_token: str) -> List[d
                 """.replace("{conn}", connection)
     url = "https://" + auth.auth0["domain"] + f"/api/v2/jobs/users-exports"
     print(url)
-    exp_response = requests.post(url, data=export_req_body, headers={
+    exp_response = http_client.post(url, data=export_req_body, headers={
         **headers, 
         "Content-Type": "application/json"}).json()
     job_id = exp_response["id"]
@@ -98,7 +99,7 @@ def retrieve_users_via_export(auth: Authentication, access_token: str) -> List[d
         time.sleep(2)
         url = "https://" + auth.auth0["domain"] + f"/api/v2/jobs/{job_id}"
         print(url)
-        job_res = requests.get(url, headers=headers).json()
+        job_res = http_client.get(url, headers=headers).json()
         status = job_res["status"] if "status" in job_res else "<missing>"
         if status == "pending":
             continue
@@ -108,7 +109,7 @@ def retrieve_users_via_export(auth: Authentication, access_token: str) -> List[d
         print(url)
         if not url.startswith("http"):
             raise Exception(f"unexpected location: {url}")
-        res_response = requests.get(url).content
+        res_response = http_client.get(url).content
         json_lines = decompress(res_response).decode("utf-8").splitlines()
         res = []
         for l in json_lines:
@@ -133,7 +134,7 @@ def retrieve_users(auth: Authentication, access_token: str) -> List:
             auth.auth0["domain"] + \
             f"/api/v2/users?page={cur_page}&per_page=100&q=identities.connection%3A%22{db}%22&search_engine=v3"
         print(url)
-        response = requests.get(url, headers=headers).json()
+        response = http_client.get(url, headers=headers).json()
         if not response or len(response) == 0:
             break
         users.extend(response)
@@ -153,7 +154,7 @@ def user_update_merge_metadata(auth: Authentication, access_token: str, user_id
 
     url = "https://" + auth.auth0["domain"] + "/api/v2/users/" + user_id
     print(url)
-    response = requests.patch(url, json=payload, headers=headers)
+    response = http_client.patch(url, json=payload, headers=headers)
     print(response.content)
     return response
 
@@ -175,19 +176,19 @@ def send_create_user(auth: Authentication, access_token: str, name: str, email:
 
     url = "https://" + auth.auth0["domain"] + "/api/v2/users"
     print(url)
-    response = requests.post(url, json=payload, headers=headers)
+    response = http_client.post(url, json=payload, headers=headers)
     print(response.content)
     return response
 
 
-def create_user(auth: Authentication, access_token: str, email: str, name: str, metadata: dict):
+def create_user(auth: Authentication, access_token: str, email: str, name: str, metadata: dict) -> requests.Response:
     """function to create a user on the specified auth0 database
     """
     password = generate_password(email, auth.auth0["password_secret"])
     print(f"Email: {email}")
     print(f"Password: {password}")
 
-    send_create_user(auth, access_token, name, email, password, metadata)
+    return send_create_user(auth, access_token, name, email, password, metadata)
 
 def get_any_password_requests():
     password_requests = []
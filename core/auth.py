@@ -3,7 +3,6 @@ import os
 import sys
 import boto3
 import pickle
-import requests
 #import eventbrite
 import google_auth_oauthlib.flow
 import googleapiclient.discovery
@@ -12,6 +11,8 @@ import googleapiclient.errors
 from urllib.parse import urlsplit
 from google.auth.transport.requests import Request
 
+from core.http_client import http_client
+
 # The SUPERMINISTREAM_AUTH_FILE file should be a JSON file with the authentication
 # information for the APIs to be used. For Zoom, the JWT token should be for the
 # admin account, so that it can schedule meetings for the technician accounts.
@@ -47,7 +48,8 @@ from google.auth.transport.requests import Request
 #       "evtstub": ""
 #    },
 #    "gsheets": {
-#       "db_link": ""
+#       "db_link": "",
+#       "cache_ttl": 60
 #    },
 #   "asn": {
 #       "username": "",
@@ -89,6 +91,7 @@ class Authentication:
             
             self.email = None
             self.youtube = None
+            self.youtube_credentials = None
 
             if email:
                 self.email = boto3.client("ses",
@@ -132,6 +135,8 @@ class Authentication:
                 with open(yt_pickle_file, "wb") as f:
                     pickle.dump(credentials, f)
 
+        # kept to build additional clients, e.g. one per thread (see YouTubeHelper.youtube)
+        self.youtube_credentials = credentials
         return googleapiclient.discovery.build("youtube", "v3", credentials=credentials)
 
     def get_auth0_token(self):
@@ -143,7 +148,7 @@ class Authentication:
         }
         # "https://" + urlsplit(self.auth0["audience"]).netloc
         domain = self.auth0["domain"]
-        resp = requests.post("https://" + domain +
-                             "/oauth/token", json=auth0_payload).json()
+        resp = http_client.post("https://" + domain +
+                                "/oauth/token", json=auth0_payload).json()
         print(resp)
         return resp["access_token"]
@@ -0,0 +1,104 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Any, List
+
+from core.google_sheets import GoogleSheets
+
+DEFAULT_DB_FILE = os.path.join(".", "tmp", "conference.db")
+
+SYNC_SHEETS = ["Sessions", "Events", "Tracks", "PapersDB", "ItemsVIS-A", "ItemsEXT",
+               "Videos", "FFVideos", "Broadcasts", "Recordings"]
+
+# columns that get an index in every table that has them
+INDEXED_COLUMNS = ["UID", "Session ID", "Paper UID", "Event Prefix", "Day of Week", "Track"]
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class ConferenceDatabase:
+    def __init__(self, db_file: str = DEFAULT_DB_FILE):
+        """Local SQLite mirror of the conference Google Sheets, one table per sheet with all values stored as TEXT
+        (column names are the sheet headers) and indexes on the INDEXED_COLUMNS. Call sync() to (re-)download the sheets.
+        """
+        self.db_file = db_file
+        db_dir = os.path.dirname(db_file)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS "_synced_sheets" ("sheet" TEXT PRIMARY KEY, "synced_at" REAL, "num_rows" INTEGER)')
+
+    def sync(self, sheet_names: List[str] = SYNC_SHEETS, use_cache: bool = True):
+        """download the specified sheets (in parallel) and replace the contents of their tables
+        """
+        sheets = GoogleSheets.load_many(sheet_names, use_cache=use_cache)
+        for name, sheet in sheets.items():
+            self.store_table(name, sheet.fieldnames, sheet.data)
+            print(f"synced {len(sheet.data)} rows of sheet {name}")
+
+    def store_table(self, table: str, fieldnames: List[str], rows: List[dict]):
+        """replace table with the provided rows, empty or duplicate column names are renamed to 'column_<i>'
+        """
+        columns = []
+        for i, f in enumerate(fieldnames):
+            columns.append(f if f and f not in columns and not f.startswith("_") else f"column_{i}")
+        col_defs = ", ".join(quote_identifier(c) + " TEXT" for c in columns)
+        placeholders = ", ".join(["?"] * (len(columns) + 1))
+        with self._lock, self.conn:
+            self.conn.execute(f"DROP TABLE IF EXISTS {quote_identifier(table)}")
+            self.conn.execute(f'CREATE TABLE {quote_identifier(table)} ("_row" INTEGER PRIMARY KEY, {col_defs})')
+            self.conn.executemany(f"INSERT INTO {quote_identifier(table)} VALUES ({placeholders})",
+                                  [[i] + [row.get(f) for f in fieldnames] for i, row in enumerate(rows)])
+            for c in INDEXED_COLUMNS:
+                if c in columns:
+                    self.conn.execute(f"CREATE INDEX {quote_identifier(table + '_' + c)} "
+                                      f"ON {quote_identifier(table)} ({quote_identifier(c)})")
+            self.conn.execute('INSERT OR REPLACE INTO "_synced_sheets" VALUES (?, ?, ?)', (table, time.time(), len(rows)))
+
+    def has_table(self, table: str) -> bool:
+        return self.conn.execute('SELECT 1 FROM "_synced_sheets" WHERE "sheet" = ?', (table,)).fetchone() is not None
+
+    def query(self, sql: str, params: Any = ()) -> List[dict]:
+        """run sql and return result rows as dicts
+        """
+        with self._lock:
+            cursor = self.conn.execute(sql, params)
+            return [dict(r) for r in cursor.fetchall()]
+
+    def select(self, table: str, where: dict = None) -> List[dict]:
+        """return rows of table (in sheet order) whose columns equal the values in where,
+        None or empty values in where are ignored, e.g. select("Sessions", {"Day of Week": args.dow})
+        """
+        if not self.has_table(table):
+            raise RuntimeError(f"table {table} does not exist in {self.db_file}, it has to be synced first")
+        conditions = []
+        params = []
+        for col, value in (where or {}).items():
+            if value is None or (isinstance(value, str) and len(value.strip()) == 0):
+                continue
+            conditions.append(f"{quote_identifier(col)} = ?")
+            params.append(value)
+        sql = f"SELECT * FROM {quote_identifier(table)}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        rows = self.query(sql + ' ORDER BY "_row"', params)
+        for r in rows:
+            del r["_row"]
+        return rows
+
+    def filter_sessions(self, dow: str = None, event_prefix: str = None, track: str = None) -> List[dict]:
+        """sessions filtered by the common --dow, --event_prefix and --track script arguments
+        """
+        return self.select("Sessions", {"Day of Week": dow, "Event Prefix": event_prefix, "Track": track})
+
+    def session_items(self, session_id: str) -> List[dict]:
+        """slot items (ItemsVIS-A, then ItemsEXT) of the specified session
+        """
+        return self.select("ItemsVIS-A", {"Session ID": session_id}) + self.select("ItemsEXT", {"Session ID": session_id})
@@ -0,0 +1,120 @@
+import os
+import gzip
+import json
+import uuid
+import hashlib
+import threading
+from collections.abc import Mapping
+from typing import Any, Callable, List
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PRECOMPRESS_EXTENSIONS = {"gzip": ".gz", "br": ".br"}
+
+
+class ExportManifest:
+    def __init__(self, output_dir: str, file_name: str = "export_manifest.json", force: bool = False,
+                 precompress: List[str] = None):
+        """Keeps track of the input digest of every file written to output_dir in '<output_dir>/<file_name>',
+        so that an incremental export only re-serializes and rewrites files whose inputs changed.
+        force: write every file regardless of the stored digests (the manifest is still updated)
+        precompress: encodings ("gzip", "br") of pre-compressed siblings to write next to compressible files
+        """
+        self.output_dir = output_dir
+        self.force = force
+        self.precompress = list(precompress) if precompress else []
+        for enc in self.precompress:
+            if enc not in PRECOMPRESS_EXTENSIONS:
+                raise RuntimeError(f"unknown precompression '{enc}', has to be one of {list(PRECOMPRESS_EXTENSIONS)}")
+        if "br" in self.precompress and brotli is None:
+            print("WARNING: brotli is not installed, skipping .br files (pip install brotli)")
+            self.precompress.remove("br")
+        self.path = os.path.join(output_dir, file_name)
+        self.files: dict[str, str] = {}
+        self.num_written = 0
+        self.num_skipped = 0
+        self._lock = threading.Lock()
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.files = json.load(f)["files"]
+            except (OSError, ValueError, KeyError):
+                print(f"WARNING: could not read export manifest {self.path}, exporting everything")
+                self.files = {}
+
+    @staticmethod
+    def digest(*inputs: Any) -> str:
+        """content hash of the provided json-serializable inputs (e.g. sheet rows)
+        """
+        data = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=_json_default)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def is_current(self, rel_path: str, digest: str, compressible: bool = False) -> bool:
+        """True if rel_path (and its pre-compressed siblings) was written from inputs with the same digest and still exists
+        """
+        if self.force:
+            return False
+        path = os.path.join(self.output_dir, rel_path)
+        if compressible and not all(os.path.isfile(path + PRECOMPRESS_EXTENSIONS[enc]) for enc in self.precompress):
+            return False
+        if any(os.path.isfile(p) for p in self._stale_siblings(path, compressible)):
+            return False
+        return self.files.get(rel_path) == digest and os.path.isfile(path)
+
+    def write(self, rel_path: str, digest: str, serialize: Callable[[], str], compressible: bool = False) -> bool:
+        """write the text returned by serialize() to rel_path, unless the file is current. Returns True if written.
+        compressible: also write the pre-compressed siblings (e.g. rel_path + '.gz') requested for this export
+        """
+        if self.is_current(rel_path, digest, compressible):
+            with self._lock:
+                self.num_skipped += 1
+            return False
+        path = os.path.join(self.output_dir, rel_path)
+        content = serialize()
+        write_file(path, content)
+        if compressible:
+            data = content.encode("utf8")
+            for enc in self.precompress:
+                if enc == "gzip":
+                    # mtime=0 keeps the output identical for identical content
+                    write_file(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+                else:
+                    write_file(path + ".br", brotli.compress(data))
+        # otherwise a server with gzip_static/brotli_static keeps serving the old content
+        for stale in self._stale_siblings(path, compressible):
+            if os.path.isfile(stale):
+                os.remove(stale)
+        with self._lock:
+            self.files[rel_path] = digest
+            self.num_written += 1
+        return True
+
+    def _stale_siblings(self, path: str, compressible: bool) -> List[str]:
+        """paths of the pre-compressed siblings of path that are not written by this export
+        """
+        return [path + ext for enc, ext in PRECOMPRESS_EXTENSIONS.items()
+                if not compressible or enc not in self.precompress]
+
+    def save(self):
+        write_file(self.path, json.dumps({"files": self.files}, indent=1, sort_keys=True))
+
+
+def _json_default(o: Any):
+    # compact rows (core.row_store.RowView) are mappings but not dicts
+    return dict(o) if isinstance(o, Mapping) else str(o)
+
+
+def write_file(path: str, content, encoding: str = "utf8"):
+    """atomically replace the file at path with content (str or bytes)
+    """
+    temp_fn = path + str(uuid.uuid4())
+    if isinstance(content, bytes):
+        with open(temp_fn, "wb") as f:
+            f.write(content)
+    else:
+        with open(temp_fn, "w", encoding=encoding) as f:
+            f.write(content)
+    os.replace(temp_fn, path)
@@ -1,66 +1,503 @@
 from pydoc import describe
+import io
 import os
 import time
 import uuid
+import json
+import hashlib
 import argparse
-from typing import Any, List
+import atexit
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, List
 from datetime import timezone, datetime, timedelta
 import csv
+import urllib.error
+import urllib.parse
 import urllib.request
 
 import core.auth as conf_auth
+from core.row_store import RowStore
+
+SHEETS_CACHE_DIR = os.path.join(".", "tmp", "sheets_cache")
+
+# seconds a downloaded sheet is used without revalidation, unless gsheets->cache_ttl is set in the auth file
+DEFAULT_CACHE_TTL = 60
+
+
+class SheetCache:
+    def __init__(self, cache_dir: str = SHEETS_CACHE_DIR, ttl: float = None):
+        """Cache of downloaded sheets, shared by all GoogleSheets instances of a process and kept on disk only
+        (so the raw rows do not stay in memory next to the rows of the instances): per sheet the rows are stored as
+        json lines (header first) in '<key>.rows.jsonl' and etag, last_modified and fetched_at in '<key>.meta.json'.
+        Entries are keyed by spreadsheet and sheet name, see key().
+        Entries younger than ttl seconds are used as is, older entries are revalidated with a conditional
+        request if the server provided an ETag or Last-Modified header, otherwise they are downloaded again.
+        If ttl is None, it is set by the first GoogleSheets instance (gsheets->cache_ttl or DEFAULT_CACHE_TTL).
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(link: str, sheet_name: str) -> str:
+        """cache key of sheet sheet_name of the spreadsheet at link
+        """
+        return hashlib.sha256(link.encode("utf-8")).hexdigest()[:16] + "-" + sheet_name
+
+    def _path(self, cache_key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, urllib.parse.quote(cache_key, safe="") + suffix)
+
+    def get_meta(self, cache_key: str) -> dict:
+        """return dict with 'etag', 'last_modified' and 'fetched_at' of the cached sheet or None if not cached
+        """
+        meta_path = self._path(cache_key, ".meta.json")
+        if not os.path.isfile(meta_path) or not os.path.isfile(self._path(cache_key, ".rows.jsonl")):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def read(self, cache_key: str) -> dict:
+        """return dict with 'fieldnames' and 'rows' (list of value lists) of the cached sheet or None
+        """
+        try:
+            with open(self._path(cache_key, ".rows.jsonl"), "r", encoding="utf-8") as f:
+                fieldnames = json.loads(f.readline())
+                return {"fieldnames": fieldnames, "rows": [json.loads(line) for line in f]}
+        except (OSError, ValueError):
+            return None
+
+    def writer(self, cache_key: str, fieldnames: List[str]) -> "SheetCacheWriter":
+        """writer of the rows of a new entry, call commit() after the last row or abort()
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return SheetCacheWriter(self, cache_key, fieldnames)
+
+    def put(self, cache_key: str, fieldnames: List[str], rows: List[List[str]], meta: dict):
+        writer = self.writer(cache_key, fieldnames)
+        try:
+            for values in rows:
+                writer.write(values)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit(meta)
+
+    def _write_meta(self, cache_key: str, meta: dict):
+        path = self._path(cache_key, ".meta.json")
+        temp_fn = path + str(uuid.uuid4())
+        with open(temp_fn, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(temp_fn, path)
+
+    def touch(self, cache_key: str, meta: dict):
+        """mark entry as fresh after the server confirmed that it is still valid, only the meta file is rewritten
+        """
+        meta["fetched_at"] = time.time()
+        with self._lock:
+            self._write_meta(cache_key, meta)
+
+    def is_fresh(self, meta: dict, ttl: float = None) -> bool:
+        ttl = (self.ttl if self.ttl is not None else DEFAULT_CACHE_TTL) if ttl is None else ttl
+        return time.time() - meta["fetched_at"] < ttl
+
+    def invalidate(self, cache_key: str = None):
+        """drop cached entry of cache_key (see key()) or of all sheets if None
+        """
+        with self._lock:
+            if cache_key is not None:
+                paths = [self._path(cache_key, ".meta.json"), self._path(cache_key, ".rows.jsonl")]
+            elif os.path.isdir(self.cache_dir):
+                paths = [os.path.join(self.cache_dir, fn) for fn in os.listdir(self.cache_dir)]
+            else:
+                paths = []
+            for path in paths:
+                if os.path.isfile(path):
+                    os.remove(path)
+
+
+class SheetCacheWriter:
+    def __init__(self, cache: SheetCache, cache_key: str, fieldnames: List[str]):
+        """Writes the rows of a cache entry to a temporary file while they are downloaded,
+        commit() replaces the cached entry with it
+        """
+        self.cache = cache
+        self.cache_key = cache_key
+        self._temp_fn = cache._path(cache_key, ".rows.jsonl") + str(uuid.uuid4())
+        self._file = open(self._temp_fn, "w", encoding="utf-8")
+        self.write(fieldnames)
+
+    def write(self, values: List[str]):
+        self._file.write(json.dumps(values) + "\n")
+
+    def commit(self, meta: dict):
+        self._file.close()
+        with self.cache._lock:
+            os.replace(self._temp_fn, self.cache._path(self.cache_key, ".rows.jsonl"))
+            self.cache._write_meta(self.cache_key, meta)
+
+    def abort(self):
+        self._file.close()
+        if os.path.isfile(self._temp_fn):
+            os.remove(self._temp_fn)
+
+
+sheet_cache = SheetCache()
+sheet_cache_setup_lock = threading.Lock()
 
 
 class GoogleSheets:
-    def __init__(self):
+    def __init__(self, compact : bool = False):
         """Google Sheets helper class to retrieve csv data
+            compact: store rows in a RowStore (dict-like RowView rows sharing one header) to reduce memory use
         """
+        self.compact = compact
         self.auth = conf_auth.Authentication()
         self._link = self.auth.gsheets['db_link']
         self.data : List[dict[str, Any]] = []
         self.data_by_index : dict = {}
         self.sheet_name = ""
+        self.index_key : str = None
+        self.journal_compact_every = 200
+        self._journal_count = 0
+        self._journal_atexit = False
+        self._journal_base : str = None
+        self._loaded_values : dict = {}
+        self._save_lock = threading.RLock()
         if not self._link or not self._link.startswith("http"):
             raise RuntimeError("auth file needs to define sheet url via gsheets->db_link")
+        with sheet_cache_setup_lock:
+            if sheet_cache.ttl is None:
+                sheet_cache.ttl = float(self.auth.gsheets.get("cache_ttl", DEFAULT_CACHE_TTL))
+
+    def _cache_key(self, sheet_name : str) -> str:
+        return SheetCache.key(self._link, sheet_name)
+
+    def _request_sheet(self, sheet_name : str, meta : dict = None):
+        """send (conditional, if the cache meta of a cached meta is provided) request for the csv export of sheet_name.
+            Returns the unread response or None if the server answered 304 Not Modified.
+        """
+        url = self._link + "/gviz/tq?tqx=out:csv&sheet=" + urllib.parse.quote(sheet_name)
+        req = urllib.request.Request(url)
+        if meta is not None:
+            if meta.get("etag"):
+                req.add_header("If-None-Match", meta["etag"])
+            if meta.get("last_modified"):
+                req.add_header("If-Modified-Since", meta["last_modified"])
+        try:
+            return urllib.request.urlopen(req)
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and meta is not None:
+                return None
+            raise
+
+    @staticmethod
+    def _csv_rows(resp) -> Iterator[List[str]]:
+        """parse the csv body of resp while it is being downloaded, first item is the header row.
+            Like csv.DictReader, empty lines are skipped and rows are padded with None / cut to the header length.
+        """
+        try:
+            reader = csv.reader(io.TextIOWrapper(resp, encoding="utf-8", newline=""))
+            fieldnames = next(reader, [])
+            yield fieldnames
+            num_fields = len(fieldnames)
+            for values in reader:
+                if not values:
+                    continue
+                if len(values) < num_fields:
+                    values += [None] * (num_fields - len(values))
+                elif len(values) > num_fields:
+                    del values[num_fields:]
+                yield values
+        finally:
+            resp.close()
+
+    @staticmethod
+    def _cache_meta(resp) -> dict:
+        return {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "fetched_at": time.time()
+        }
+
+    def _fetch_sheet(self, sheet_name : str, use_cache : bool = True) -> dict:
+        """return dict with 'fieldnames' and 'rows' (list of value lists) of sheet, served from the sheet_cache
+            or downloaded (revalidated, if the cached entry is stale)
+        """
+        key = self._cache_key(sheet_name)
+        meta = sheet_cache.get_meta(key) if use_cache else None
+        if meta is not None and sheet_cache.is_fresh(meta):
+            entry = sheet_cache.read(key)
+            if entry is not None:
+                return entry
+
+        resp = self._request_sheet(sheet_name, meta)
+        if resp is None:
+            entry = sheet_cache.read(key)
+            if entry is not None:
+                sheet_cache.touch(key, meta)
+                return entry
+            resp = self._request_sheet(sheet_name)
+        rows = self._csv_rows(resp)
+        fieldnames = next(rows)
+        entry = {"fieldnames": fieldnames, "rows": list(rows)}
+        sheet_cache.put(key, fieldnames, entry["rows"], self._cache_meta(resp))
+        return entry
 
-    def load_sheet(self, sheet_name : str):
+    def iter_sheet(self, sheet_name : str, use_cache : bool = True) -> Iterator[dict]:
+        """Iterate once over the rows (dicts) of sheet sheet_name without loading them into self.data.
+            Downloaded rows are parsed and yielded while the response is being read. A fresh cached
+            entry is served as is, downloaded rows are streamed to the sheet_cache file and the entry is stored
+            after the last row was read, set use_cache to False to always download and not store the rows.
+            Journaled row updates (see save_row) are not applied.
+        """
+        key = self._cache_key(sheet_name)
+        meta = sheet_cache.get_meta(key) if use_cache else None
+        entry = None
+        if meta is not None and sheet_cache.is_fresh(meta):
+            entry = sheet_cache.read(key)
+        resp = None
+        if entry is None:
+            resp = self._request_sheet(sheet_name, meta)
+            if resp is None:
+                entry = sheet_cache.read(key)
+                if entry is not None:
+                    sheet_cache.touch(key, meta)
+                else:
+                    resp = self._request_sheet(sheet_name)
+        if resp is None:
+            fieldnames = entry["fieldnames"]
+            for values in entry["rows"]:
+                yield dict(zip(fieldnames, values))
+            return
+
+        rows = self._csv_rows(resp)
+        fieldnames = next(rows)
+        # rows are written to the cache file while they are yielded, nothing is collected in memory
+        writer = sheet_cache.writer(key, fieldnames) if use_cache else None
+        try:
+            for values in rows:
+                if writer is not None:
+                    writer.write(values)
+                yield dict(zip(fieldnames, values))
+        except BaseException:
+            # also if the caller stops iterating early (GeneratorExit), the partial entry is not cached
+            if writer is not None:
+                writer.abort()
+            raise
+        if writer is not None:
+            writer.commit(self._cache_meta(resp))
+
+    def load_sheet(self, sheet_name : str, use_cache : bool = True, replay_journal : bool = False):
         """Load data from sheet with the name sheet_name.
             First column is used as index if field name ends with ID (self.data_by_index)
+            Data is served from the shared sheet_cache if it is still fresh, set use_cache to False to force a download.
+            replay_journal: apply (and compact) row updates journaled by a run that ended before its journal
+            was compacted (see save_row), only scripts that write the sheet should set it.
         """
-        url = self._link + "/gviz/tq?tqx=out:csv&sheet=" + sheet_name
-        resp = urllib.request.urlopen(url)
-        lines = [ l.decode('utf-8') for l in resp.readlines() ]
-        cr = csv.DictReader(lines)
-        self.fieldnames = cr.fieldnames
-        self.sheet_name = sheet_name        
+        entry = self._fetch_sheet(sheet_name, use_cache)
+        self.fieldnames = list(entry["fieldnames"])
+        self.sheet_name = sheet_name
         self.data = []
         self.data_by_index : dict = {}
 
         index_key = None
         if self.fieldnames[0].lower().endswith("id"):
             index_key = self.fieldnames[0]
+        self.index_key = index_key
 
-        for row in cr:            
-            uid :str = row[index_key] if index_key else None            
-            self.data.append(row)
-            self.data_by_index[uid] = row
+        # every instance gets its own rows, scripts modify them in place
+        if self.compact:
+            store = RowStore(self.fieldnames)
+            for values in entry["rows"]:
+                row = store.row(values)
+                self.data.append(row)
+                self.data_by_index[values[0] if index_key else None] = row
+        else:
+            for values in entry["rows"]:
+                row = dict(zip(self.fieldnames, values))
+                uid :str = row[index_key] if index_key else None
+                self.data.append(row)
+                self.data_by_index[uid] = row
 
-    def save(self, target_fn : str = None):
-        """Saves sheet to .csv file. Target path is './tmp/<sheet name>.csv' if none is specified. Overwrites existing file.
+        # loaded values by index, save_row only journals the columns that differ from them
+        self._loaded_values = {values[0]: tuple(values) for values in entry["rows"]} if index_key else {}
+
+        if replay_journal:
+            self._replay_journal()
+        elif os.path.isfile(self._target_fn() + ".journal"):
+            print(f"WARNING: not applying journaled row updates of sheet {sheet_name}")
+
+    @staticmethod
+    def load_many(sheet_names : List[str], max_workers : int = 6, use_cache : bool = True,
+                  compact : bool = False, replay_journal : bool = False) -> dict[str, "GoogleSheets"]:
+        """Load several sheets in parallel with at most max_workers concurrent downloads.
+            Returns dict with the sheet name as key and the loaded GoogleSheets instance as value.
         """
+        sheet_names = list(dict.fromkeys(sheet_names))
+
+        def load(sheet_name : str) -> "GoogleSheets":
+            sheet = GoogleSheets(compact)
+            sheet.load_sheet(sheet_name, use_cache, replay_journal)
+            return sheet
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sheet_names)))) as pool:
+            sheets = list(pool.map(load, sheet_names))
+        return dict(zip(sheet_names, sheets))
+
+    def _target_fn(self, target_fn : str = None) -> str:
         if not self.sheet_name or len(self.sheet_name) == 0:
             raise RuntimeError("no sheet loaded that could be saved")
         if not target_fn:
             if not os.path.exists("./tmp"):
                 os.mkdir("./tmp")
             target_fn = "./tmp/" + self.sheet_name + ".csv"
+        return target_fn
+
+    def save(self, target_fn : str = None):
+        """Saves sheet to .csv file. Target path is './tmp/<sheet name>.csv' if none is specified. Overwrites existing file.
+        Pending row updates of the journal (see save_row) are part of the written file, the journal is removed afterwards.
+        """
+        target_fn = self._target_fn(target_fn)
+        with self._save_lock:
+            self._write_csv(target_fn, self.fieldnames, self.data)
+            if os.path.isfile(target_fn + ".journal"):
+                os.remove(target_fn + ".journal")
+            self._journal_count = 0
+
+    def save_row(self, row : dict, target_fn : str = None):
+        """Saves the update of a single (existing) row by appending the columns that differ from the loaded
+        sheet to the journal file '<target_fn>.journal' instead of rewriting the whole .csv file. The journal is compacted into the .csv file every
+        journal_compact_every updates and on exit, and replayed by load_sheet if the process ended before.
+        Falls back to save() if the row cannot be journaled (sheet without index column, new row) and on the first
+        call, so that the journal is based on a .csv file written by this instance.
+        """
+        target_fn = self._target_fn(target_fn)
+        with self._save_lock:
+            uid = row.get(self.index_key) if self.index_key else None
+            if not uid or self.data_by_index.get(uid) is not row or self._journal_base != target_fn:
+                self.save(target_fn)
+                self._journal_base = target_fn
+                return
+            loaded = self._loaded_values.get(uid)
+            changes = {f: row.get(f) for i, f in enumerate(self.fieldnames)
+                       if loaded is None or i >= len(loaded) or row.get(f) != loaded[i]}
+            with open(target_fn + ".journal", "a", encoding="utf-8") as f:
+                f.write(json.dumps({"index": uid, "row": changes}) + "\n")
+            self._journal_count += 1
+            if not self._journal_atexit:
+                atexit.register(self._compact_at_exit, target_fn)
+                self._journal_atexit = True
+            if self._journal_count >= self.journal_compact_every:
+                self.save(target_fn)
+
+    def _compact_at_exit(self, target_fn : str):
+        if self._journal_count > 0:
+            self.save(target_fn)
+
+    def _replay_journal(self):
+        """Apply row updates of a journal left behind by an earlier run to the loaded data and compact
+        the journal into the .csv file it was written against.
+        """
+        target_fn = self._target_fn()
+        journal_fn = target_fn + ".journal"
+        if not os.path.isfile(journal_fn):
+            return
+        updates = GoogleSheets._read_journal(journal_fn)
+        print(f"replaying {len(updates)} journaled row updates of sheet {self.sheet_name}")
+        if self.index_key:
+            for uid, values in updates.items():
+                if uid in self.data_by_index:
+                    row = self.data_by_index[uid]
+                    changes = {k: v for k, v in values.items() if k in self.fieldnames and row.get(k) != v}
+                    if len(changes) > 0:
+                        print(f"  {uid}: overwriting {', '.join(changes.keys())}")
+                    row.update(changes)
+                else:
+                    print(f"WARNING: journaled row {uid} not found in sheet {self.sheet_name}")
+
+        # bring the .csv file up to date as well, it may contain rows that are not in the sheet yet
+        with self._save_lock:
+            if os.path.isfile(target_fn):
+                with open(target_fn, 'r', newline='', encoding='utf-8') as f:
+                    reader = csv.DictReader(f)
+                    fieldnames = reader.fieldnames
+                    rows = list(reader)
+                index_key = fieldnames[0]
+                for row in rows:
+                    if row[index_key] in updates:
+                        row.update({k: v for k, v in updates[row[index_key]].items() if k in fieldnames})
+                self._write_csv(target_fn, fieldnames, rows)
+            os.remove(journal_fn)
+
+    @staticmethod
+    def _read_journal(journal_fn : str) -> dict:
+        """returns latest journaled values by index, ignores a truncated last line of a crashed run
+        """
+        updates = {}
+        with open(journal_fn, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                updates[entry["index"]] = entry["row"]
+        return updates
+
+    @staticmethod
+    def _write_csv(target_fn : str, fieldnames : List[str], rows : List[dict]):
         temp_fn = target_fn + str(uuid.uuid4())
         with open(temp_fn, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, self.fieldnames)
+            writer = csv.DictWriter(f, fieldnames)
             writer.writeheader()
-            writer.writerows(self.data)
+            writer.writerows(rows)
         try:
             os.replace(temp_fn, target_fn)
         except PermissionError:
             time.sleep(5)
             os.replace(temp_fn, target_fn)
+
+
+class SheetWriter:
+    def __init__(self):
+        """Performs the save_row / save calls of several worker threads one after another on a single
+        background thread, so that workers do not block on (or interleave) writing the .csv and journal files.
+        Use as context manager or call close() to wait for all pending writes.
+        """
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def save_row(self, sheet : GoogleSheets, row : dict):
+        self._queue.put((sheet, row))
+
+    def save(self, sheet : GoogleSheets):
+        self._queue.put((sheet, None))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            sheet, row = item
+            try:
+                if row is None:
+                    sheet.save()
+                else:
+                    sheet.save_row(row)
+            except BaseException as ex:
+                print(f"\r\nsaving {sheet.sheet_name}.csv failed: {str(ex)}")
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self) -> "SheetWriter":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
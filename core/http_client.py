@@ -0,0 +1,112 @@
+import time
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeout in seconds of every request without an explicit timeout
+DEFAULT_TIMEOUT = (10, 60)
+
+# status codes that are retried with exponential backoff (and the Retry-After of the response if it sends one)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# methods that can be retried after any of the RETRY_STATUSES, other methods (POST, PATCH) are only retried after a 429,
+# because a rate limited request was not processed
+IDEMPOTENT_METHODS = frozenset(["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE"])
+
+
+def retry_after_seconds(response: requests.Response, default: float = 1.0) -> float:
+    """seconds to wait according to the Retry-After header (seconds or http date) of a response
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+
+class HttpClient:
+    def __init__(self, timeout: Tuple[float, float] = DEFAULT_TIMEOUT, retries: int = 3, backoff_factor: float = 0.5,
+                 retry_statuses: Tuple[int, ...] = RETRY_STATUSES, pool_maxsize: int = 16, cache_ttl: float = 0):
+        """HTTP client on a requests.Session: connections are kept alive and pooled per host (up to pool_maxsize
+        per host, for concurrent threads), so consecutive requests to the same API skip the TCP and TLS handshake.
+        Connection errors and retry_statuses are retried up to retries times with exponential backoff,
+        see IDEMPOTENT_METHODS for which methods are retried.
+        cache_ttl: keep successful GET responses for this many seconds (0 = no caching), use get(..., cache=False)
+        to bypass the cache for a request. The client keeps cookies, use one client per login (e.g. for scraping).
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.retry_statuses = tuple(retry_statuses)
+        self.cache_ttl = cache_ttl
+        self._cache: dict = {}
+        self._cache_lock = threading.Lock()
+        self.session = requests.Session()
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries, backoff_factor=backoff_factor,
+                      status_forcelist=self.retry_statuses, allowed_methods=IDEMPOTENT_METHODS,
+                      respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, cache: bool = True, **kwargs: Any) -> requests.Response:
+        """send a request, kwargs are passed to requests.Session.request
+        """
+        method = method.upper()
+        kwargs.setdefault("timeout", self.timeout)
+        use_cache = cache and self.cache_ttl > 0 and method == "GET" and not kwargs.get("stream")
+        if use_cache:
+            key = (url, repr(kwargs.get("params")), repr(sorted((kwargs.get("headers") or {}).items())))
+            with self._cache_lock:
+                entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.cache_ttl:
+                return entry[1]
+
+        response = self.session.request(method, url, **kwargs)
+        attempt = 0
+        while response.status_code == 429 and 429 in self.retry_statuses and method not in IDEMPOTENT_METHODS \
+                and attempt < self.retries:
+            # files (e.g. multipart uploads) cannot be sent twice
+            if kwargs.get("files"):
+                break
+            attempt += 1
+            time.sleep(retry_after_seconds(response, self.backoff_factor * 2 ** attempt))
+            response = self.session.request(method, url, **kwargs)
+
+        if use_cache and response.status_code == 200:
+            with self._cache_lock:
+                self._cache[key] = (time.monotonic(), response)
+        return response
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def put(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+
+# shared client of the API helpers (stateless requests with tokens in headers or urls)
+http_client = HttpClient()
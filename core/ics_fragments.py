@@ -0,0 +1,36 @@
+import threading
+from typing import Iterable
+
+import ics
+
+
+class CalendarFragments:
+    def __init__(self):
+        """Cache of serialized VEVENT blocks. Every event is serialized once when added, calendars containing
+        any subset of the events are then assembled by concatenating the cached text fragments.
+        """
+        self.fragments: dict[str, str] = {}
+        self._lock = threading.Lock()
+        empty = ics.Calendar().serialize()
+        end = empty.rindex("END:VCALENDAR")
+        self.header = empty[:end]
+        self.footer = empty[end:]
+
+    def add(self, key: str, event: ics.Event):
+        """serialize event and store its VEVENT block under key
+        """
+        calendar = ics.Calendar()
+        calendar.events.add(event)
+        text = calendar.serialize()
+        start = text.index("BEGIN:VEVENT")
+        end = text.index("END:VCALENDAR")
+        with self._lock:
+            self.fragments[key] = text[start:end]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.fragments
+
+    def calendar(self, keys: Iterable[str]) -> str:
+        """serialized calendar with the events stored under keys, in the given order
+        """
+        return self.header + "".join(self.fragments[k] for k in keys) + self.footer
@@ -5,12 +5,15 @@ import json
 import uuid
 import time
 
+from core.row_store import RowStore
+
 class PapersDatabase:
     """
     Read the stored metadata of papers/sessions from a specified CSV file that was exported from the Google Sheets workbook, for instance.    
     """
-    def __init__(self, csv_file : str):
+    def __init__(self, csv_file : str, compact : bool = False):
         """ Load and parse the specified csv file. First row must contain headers.
+            compact: store rows in a RowStore (dict-like RowView rows sharing one header) to reduce memory use
         """
         self.csv_file = csv_file
         data : List[dict] = []        
@@ -19,10 +22,20 @@ class PapersDatabase:
         if not os.path.isfile(csv_file):
             raise RuntimeError(f"Could not find the specified csv_file '{csv_file}'")
         with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            self.fieldnames = reader.fieldnames
-            for row in reader:
-                uid :str = row['UID']
+            if compact:
+                reader = csv.reader(f)
+                self.fieldnames = next(reader, [])
+                if 'UID' not in self.fieldnames:
+                    raise RuntimeError(f"each entry in db needs to provide UID")
+                store = RowStore(self.fieldnames)
+                uid_pos = self.fieldnames.index('UID')
+                rows = ((store.row(values), values[uid_pos] if uid_pos < len(values) else None)
+                        for values in reader if values)
+            else:
+                reader = csv.DictReader(f)
+                self.fieldnames = reader.fieldnames
+                rows = ((row, row['UID']) for row in reader)
+            for row, uid in rows:
                 if not uid:
                     raise RuntimeError(f"each entry in db needs to provide UID")
                 if uid in self.data_by_uid:
@@ -4,12 +4,15 @@ import os
 import time
 import uuid
 import argparse
+import threading
 from typing import Any, Dict, List, Tuple
 from datetime import timezone, datetime, timedelta
 import csv
-import urllib.request
+import urllib.parse
+from collections import Counter
 
 import core.auth as conf_auth
+from core.http_client import http_client
 
 
 class PmuHelper:
@@ -18,8 +21,9 @@ class PmuHelper:
         """
         self.auth = conf_auth.Authentication()
         self._link = self.auth.pmu["items_url"]
-        pmu_items_json = urllib.request.urlopen(self._link).read()
-        self.data = json.loads(pmu_items_json)
+        resp = http_client.get(self._link)
+        resp.raise_for_status()
+        self.data = resp.json()
         self.data_by_index : Dict[str, Dict[str, Dict[str, Any]]] = {}
         for o in self.data:
             uid = o["uid"]
@@ -56,13 +60,162 @@ class PmuHelper:
         
         print("downloading video " + video_url)
         video_path = os.path.join(target_path, pmu_video["fileName"])
-        urllib.request.urlretrieve(video_url, video_path)
+        self._download(video_url, video_path)
 
         subs_path = None
         if subs_url is not None and len(subs_url) > 0:
             print("downloading subtitles " + subs_url)
             subs_path = os.path.join(target_path, pmu_subs["fileName"])
-            urllib.request.urlretrieve(subs_url, subs_path)
+            try:
+                self._download(subs_url, subs_path)
+            except BaseException:
+                # the caller only gets (and deletes) the files of a complete download
+                os.remove(video_path)
+                raise
 
         return (video_path, subs_path)
 
+    @staticmethod
+    def _download(url : str, path : str, chunk_size : int = 1024 * 1024):
+        """download url to path, the file is written under a temporary name that is removed
+        if the download fails, so no partial file is left behind
+        """
+        temp_fn = f"{path}.{uuid.uuid4()}.part"
+        try:
+            with http_client.get(url, stream=True) as resp:
+                resp.raise_for_status()
+                with open(temp_fn, "wb") as f:
+                    for chunk in resp.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+            os.replace(temp_fn, path)
+        except BaseException:
+            if os.path.exists(temp_fn):
+                os.remove(temp_fn)
+            raise
+
+    def open_presentation_video(self, uid : str, open_video : bool = True):
+        """Opens the download of the presentation video without reading it, e.g. to stream it to YouTube.
+        Returns (http response, size in bytes or None if unknown, subtitles as bytes or None if not available),
+        with open_video False only the subtitles are downloaded (response and size are None)
+        """
+        video_url, subs_url = self.get_video_urls(uid)
+        if not video_url:
+            raise RuntimeError("no video url found for uid " + uid)
+
+        subs_data = None
+        if subs_url is not None and len(subs_url) > 0:
+            print("downloading subtitles " + subs_url)
+            resp = http_client.get(subs_url)
+            resp.raise_for_status()
+            subs_data = resp.content
+
+        if not open_video:
+            return (None, None, subs_data)
+        print("streaming video " + video_url)
+        resp = http_client.get(video_url, stream=True)
+        resp.raise_for_status()
+        # the raw response is read like a file, decoded if the server sent it compressed
+        resp.raw.decode_content = True
+        size = resp.headers.get("Content-Length")
+        return (resp.raw, int(size) if size else None, subs_data)
+
+
+class PmuPrefetcher:
+    def __init__(self, pmu : PmuHelper, uids : List[str], target_path : str, depth : int = 2,
+                 max_bytes : int = 20 * 1024**3):
+        """Downloads the presentation videos and subtitles of uids (in this order) to a subdirectory per uid
+        of target_path on a background thread while earlier videos are still being processed (e.g. uploaded).
+        A download is only started while less than depth downloaded videos and less than max_bytes
+        are on disk that were not released yet, so the disk budget can be exceeded by at most one video.
+        uids may repeat, a uid is downloaded once and its files are deleted when it was released as often as it
+        occurs in uids.
+        """
+        self.pmu = pmu
+        self.target_path = target_path
+        self.depth = max(1, depth)
+        self.max_bytes = max_bytes
+        self._uids = list(dict.fromkeys(uids))
+        self._refs = Counter(uids)
+        self._results : Dict[str, Any] = {}
+        self._sizes : Dict[str, int] = {}
+        self._num_on_disk = 0
+        self._used_bytes = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for uid in self._uids:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or
+                                    (self._num_on_disk < self.depth and self._used_bytes < self.max_bytes))
+                if self._closed:
+                    return
+            size = 0
+            try:
+                uid_path = self._uid_path(uid)
+                os.makedirs(uid_path, exist_ok=True)
+                result = self.pmu.download_presentation_video(uid, uid_path)
+                size = sum(os.path.getsize(p) for p in result if p is not None)
+            except Exception as ex:
+                result = ex
+            with self._cond:
+                self._results[uid] = result
+                if not isinstance(result, Exception):
+                    self._sizes[uid] = size
+                    self._num_on_disk += 1
+                    self._used_bytes += size
+                    print(f"prefetched {uid} ({self._num_on_disk} videos, {self._used_bytes / 1024**3:.1f} GB on disk)")
+                self._cond.notify_all()
+
+    def _uid_path(self, uid : str) -> str:
+        # PMU file names are not unique across uids
+        return os.path.join(self.target_path, urllib.parse.quote(uid, safe=""))
+
+    def get(self, uid : str) -> Tuple[str, str]:
+        """wait until video and subtitles of uid are downloaded and return their paths
+        (as download_presentation_video), raises the exception if the download failed
+        """
+        if uid not in self._uids:
+            raise RuntimeError(f"uid {uid} is not prefetched")
+        with self._cond:
+            self._cond.wait_for(lambda: uid in self._results or self._closed)
+            result = self._results.get(uid)
+        if result is None:
+            raise RuntimeError("prefetcher was closed")
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def release(self, uid : str, force : bool = False):
+        """release one use of uid, the downloaded files are deleted after the last use (or with force),
+        which makes room for the next downloads
+        """
+        with self._cond:
+            self._refs[uid] -= 1
+            if self._refs[uid] > 0 and not force:
+                return
+            result = self._results.pop(uid, None)
+            if result is None or isinstance(result, Exception):
+                return
+            self._num_on_disk -= 1
+            self._used_bytes -= self._sizes.pop(uid, 0)
+            self._cond.notify_all()
+        for p in result:
+            if p is not None and os.path.isfile(p):
+                os.remove(p)
+        try:
+            os.rmdir(self._uid_path(uid))
+        except OSError:
+            pass
+
+    def close(self):
+        """stop downloading and delete all files that were not released
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        for uid in list(self._results.keys()):
+            self.release(uid, force=True)
@@ -0,0 +1,106 @@
+import sys
+from collections.abc import MutableMapping
+from typing import Any, Iterable, Iterator, List
+
+# marks a column value that was deleted from a row
+_MISSING = object()
+
+
+class RowStore:
+    def __init__(self, fieldnames: Iterable[str], intern_max_len: int = 64):
+        """Compact storage for the rows of one table: the header is stored once as a shared tuple and every row
+        only keeps a list of its values, exposed through a dict-like RowView.
+        String values up to intern_max_len characters are interned, so repeated values
+        (Event Prefix, Track, Day of Week, ...) are stored once per process instead of once per row.
+        """
+        self.fieldnames = tuple(fieldnames)
+        self.positions = {f: i for i, f in enumerate(self.fieldnames)}
+        self.intern_max_len = intern_max_len
+
+    def row(self, values: Iterable[Any]) -> "RowView":
+        """create a row from its values in header order, values are padded with None / cut to the header length
+        """
+        max_len = self.intern_max_len
+        num_fields = len(self.fieldnames)
+        values = [sys.intern(v) if type(v) is str and len(v) <= max_len else v for v in values]
+        if len(values) < num_fields:
+            values += [None] * (num_fields - len(values))
+        elif len(values) > num_fields:
+            del values[num_fields:]
+        return RowView(self, values)
+
+    def rows(self, values_list: Iterable[Iterable[Any]]) -> List["RowView"]:
+        return [self.row(values) for values in values_list]
+
+
+class RowView(MutableMapping):
+    """dict-like view of a row of a RowStore. Reading and writing header columns changes the value list in place,
+    other keys (e.g. added by scripts via row["New Column"] = ... or update()) are kept in a per-row dict.
+    Use dict(row) where a real dict is required, e.g. for json.dumps.
+    """
+    __slots__ = ("_store", "_values", "_extras")
+
+    def __init__(self, store: RowStore, values: List[Any]):
+        self._store = store
+        self._values = values
+        self._extras = None
+
+    def __getitem__(self, key):
+        i = self._store.positions.get(key)
+        if i is not None:
+            value = self._values[i]
+            if value is not _MISSING:
+                return value
+        elif self._extras is not None and key in self._extras:
+            return self._extras[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        i = self._store.positions.get(key)
+        if i is not None:
+            value = self._values[i]
+            return default if value is _MISSING else value
+        if self._extras is not None:
+            return self._extras.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        i = self._store.positions.get(key)
+        if i is not None:
+            self._values[i] = value
+        else:
+            if self._extras is None:
+                self._extras = {}
+            self._extras[key] = value
+
+    def __delitem__(self, key):
+        i = self._store.positions.get(key)
+        if i is not None and self._values[i] is not _MISSING:
+            self._values[i] = _MISSING
+        elif i is None and self._extras is not None and key in self._extras:
+            del self._extras[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        i = self._store.positions.get(key)
+        if i is not None:
+            return self._values[i] is not _MISSING
+        return self._extras is not None and key in self._extras
+
+    def __iter__(self) -> Iterator[str]:
+        for f, value in zip(self._store.fieldnames, self._values):
+            if value is not _MISSING:
+                yield f
+        if self._extras is not None:
+            yield from self._extras
+
+    def __len__(self) -> int:
+        n = sum(1 for value in self._values if value is not _MISSING)
+        return n + (len(self._extras) if self._extras is not None else 0)
+
+    def copy(self) -> dict:
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
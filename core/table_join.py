@@ -0,0 +1,62 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+def table_rows(tables) -> List[dict]:
+    """return the rows of a table (anything with a .data list like GoogleSheets or PapersDatabase),
+    of a plain list of row dicts, or the concatenated rows of a list of such tables
+    """
+    if hasattr(tables, "data"):
+        return tables.data
+    tables = list(tables)
+    # rows can be dicts or dict-like (e.g. core.row_store.RowView)
+    if len(tables) == 0 or isinstance(tables[0], Mapping):
+        return tables
+    rows = []
+    for t in tables:
+        rows.extend(table_rows(t))
+    return rows
+
+
+class TableIndex:
+    def __init__(self, tables, key: str):
+        """Group-by index over the rows of one or several tables (see table_rows), built once in a single pass.
+        Rows keep their original order within a group, rows of the first table come first.
+        """
+        self.key = key
+        self.groups: Dict[Any, List[dict]] = {}
+        for row in table_rows(tables):
+            value = row.get(key)
+            if value in self.groups:
+                self.groups[value].append(row)
+            else:
+                self.groups[value] = [row]
+
+    def get_all(self, value) -> List[dict]:
+        """all rows with key == value (empty list if none)
+        """
+        return self.groups.get(value, [])
+
+    def get(self, value) -> dict:
+        """first row with key == value or None
+        """
+        rows = self.groups.get(value)
+        return rows[0] if rows else None
+
+    def keys(self) -> Iterable:
+        return self.groups.keys()
+
+    def __contains__(self, value) -> bool:
+        return value in self.groups
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+
+def one_to_many(parents, parent_key: str, children, child_key: str = None) -> List[Tuple[dict, List[dict]]]:
+    """join each parent row with the list of child rows whose child_key (default: parent_key) equals its parent_key,
+    e.g. one_to_many(sessions, "Session ID", [items_vis, items_ext]) -> [(session, [item, ...]), ...]
+    children can be a prebuilt TableIndex to reuse it across several joins.
+    """
+    index = children if isinstance(children, TableIndex) else TableIndex(children, child_key or parent_key)
+    return [(p, index.get_all(p[parent_key])) for p in table_rows(parents)]
@@ -1,7 +1,31 @@
 import io
+import os
+import json
+import hashlib
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
 import qrcode
 from PIL import Image, ImageDraw, ImageFont
 
+# rendered thumbnails, named by their thumbnail_key
+THUMBNAIL_CACHE_DIR = os.path.join(".", "tmp", "thumbnails")
+
+# change this when the layout of render_thumbnail changes, so cached thumbnails are rendered again
+RENDER_VERSION = 1
+
+# Fonts, fit results and backgrounds are cached per process, so rendering many thumbnails
+# (see render_thumbnails) only loads each font size and decodes each background once
+@functools.lru_cache(maxsize=None)
+def load_font(font_file, size):
+    return ImageFont.truetype(font_file, size=size)
+
+@functools.lru_cache(maxsize=None)
+def load_background(background_file):
+    background = Image.open(background_file)
+    background.load()
+    return background
+
 def compute_text_bounds(text, font):
     ascent, descent = font.getmetrics()
     lines = text.split("\n")
@@ -14,21 +38,25 @@ def compute_text_bounds(text, font):
 
 # Binary search to fit the biggest text we can in the bounds specified
 def fit_text_to_bounds(text, font_file, width, height, max_font_size=0):
+    size = fit_font_size(text, font_file, width, height, max_font_size)
+    return load_font(font_file, size) if size else None
+
+# Font size found by fit_text_to_bounds, cached for identical strings (e.g. the same chair on many sessions)
+@functools.lru_cache(maxsize=4096)
+def fit_font_size(text, font_file, width, height, max_font_size=0):
     max_size = min(height, 128)
     if max_font_size > 0:
         max_size = max_font_size
     min_size = 16
-    font = None
-    bounds = None
+    size = None
     while max_size > min_size:
         size = int((max_size + min_size) / 2)
-        font = ImageFont.truetype(font_file, size=size)
-        bounds = compute_text_bounds(text, font)
+        bounds = compute_text_bounds(text, load_font(font_file, size))
         if bounds[0] > width or bounds[1] > height:
             max_size = size - 1
         else:
             min_size = size + 1
-    return font
+    return size
 
 # Renders the thumbnail out to an io.BytesIO object
 # NOTE: You'll probably want to adjust the text placement to better
@@ -42,8 +70,8 @@ def render_thumbnail(background_file, fonts, title, chair, schedule, qr_string=N
     chair_font = fit_text_to_bounds(chair, fonts["italic"], 1920 - 160, 72)
     schedule_font = fit_text_to_bounds(schedule, fonts["regular"], 1920 - 200, 640, max_font_size=40)
 
-    background = Image.open(background_file)
-    
+    background = load_background(background_file).copy()
+
     if qr_string:
         qr = qrcode.make(qr_string, border=1)
         qr = qr.resize((300, 300), resample=Image.NEAREST)
@@ -58,3 +86,64 @@ def render_thumbnail(background_file, fonts, title, chair, schedule, qr_string=N
     background.save(img_bytes, format="png")
     return img_bytes
 
+def _render_thumbnail_file(background_file, fonts, target_path, job):
+    img_bytes = render_thumbnail(background_file, fonts, job["title"], job["chair"], job["schedule"],
+                                 job.get("qr_string"))
+    path = os.path.join(target_path, job["file_name"])
+    # written under a temporary name first, so an interrupted run never leaves a partial (cached) thumbnail
+    temp_fn = f"{path}.{os.getpid()}.tmp"
+    with open(temp_fn, "wb") as f:
+        f.write(img_bytes.getbuffer())
+    os.replace(temp_fn, path)
+    return path
+
+# Renders many thumbnails across a process pool and writes them to target_path,
+# jobs are dicts with "file_name", "title", "chair", "schedule" and optionally "qr_string".
+# Returns the paths of the written files in the order of jobs
+def render_thumbnails(background_file, fonts, jobs, target_path, max_workers=None) -> List[str]:
+    os.makedirs(target_path, exist_ok=True)
+    render = functools.partial(_render_thumbnail_file, background_file, fonts, target_path)
+    if len(jobs) <= 1 or max_workers == 1:
+        return [render(job) for job in jobs]
+    max_workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=load_background,
+                             initargs=(background_file,)) as pool:
+        return list(pool.map(render, jobs, chunksize=max(1, len(jobs) // (max_workers * 4))))
+
+@functools.lru_cache(maxsize=None)
+def _file_digest(path, mtime_ns, size):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def file_digest(path):
+    st = os.stat(path)
+    return _file_digest(os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+# Content hash of a thumbnail: covers the texts, the QR string and the contents of the background and font files,
+# so identical inputs always map to the same rendered image
+def thumbnail_key(background_file, fonts, title, chair, schedule, qr_string=None):
+    inputs = {
+        "version": RENDER_VERSION,
+        "background": file_digest(background_file),
+        "fonts": {k: file_digest(f) for k, f in fonts.items()},
+        "texts": [title, chair, schedule, qr_string]
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+# Like render_thumbnails, but the thumbnails are stored in cache_dir as <thumbnail_key>.png and only
+# thumbnails that are not in the cache are rendered. Returns (key, path) for every job in the order of jobs
+def render_thumbnails_cached(background_file, fonts, jobs, cache_dir=THUMBNAIL_CACHE_DIR, max_workers=None):
+    keys = [thumbnail_key(background_file, fonts, job["title"], job["chair"], job["schedule"], job.get("qr_string"))
+            for job in jobs]
+    paths = [os.path.join(cache_dir, key + ".png") for key in keys]
+    to_render = {}
+    for job, key, path in zip(jobs, keys, paths):
+        if not os.path.isfile(path):
+            to_render[key] = dict(job, file_name=key + ".png")
+    if len(to_render) > 0:
+        print(f"rendering {len(to_render)} of {len(jobs)} thumbnails")
+        render_thumbnails(background_file, fonts, list(to_render.values()), cache_dir, max_workers)
+    return list(zip(keys, paths))
@@ -0,0 +1,135 @@
+import time
+from typing import Any, Callable, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+
+from core.yt_helper import YouTubeHelper
+
+
+class BroadcastController:
+    def __init__(self, yt: YouTubeHelper, max_workers: int = 16, poll_interval: float = 5, stream_timeout: float = 30):
+        """Binds, starts and stops the broadcasts of rows of the Broadcasts sheet ("Video ID", "Stream Key ID",
+        "Livestream ID", "Title") all at once: the state of all broadcasts and streams is polled with batched list calls
+        and the binds / transitions are sent concurrently by up to max_workers threads (one per track).
+        start() waits up to stream_timeout seconds (polling every poll_interval seconds) for streams to become active.
+        self.states holds the last known state per broadcast id, see print_states().
+        """
+        self.yt = yt
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.stream_timeout = stream_timeout
+        # broadcast id -> {"row": sheet row, "broadcast": lifeCycleStatus, "stream": streamStatus,
+        #                  "health": healthStatus, "action": last action, "result": "ok" or error}
+        self.states: Dict[str, dict] = {}
+
+    def poll(self, rows: List[dict]) -> Dict[str, dict]:
+        """update the states of the broadcasts of rows and of their streams, one batch request for each
+        """
+        rows = [r for r in rows if r["Video ID"]]
+        broadcasts = {b["id"]: b for b in self.yt.get_broadcasts([r["Video ID"] for r in rows])}
+        streams = self.yt.get_streams_by_ids([r["Stream Key ID"] for r in rows if r["Stream Key ID"]])
+        for row in rows:
+            state = self.states.setdefault(row["Video ID"], {"row": row, "action": "", "result": ""})
+            broadcast = broadcasts.get(row["Video ID"])
+            stream = streams.get(row["Stream Key ID"])
+            state["broadcast"] = broadcast["status"]["lifeCycleStatus"] if broadcast else "missing"
+            state["stream"] = stream["status"]["streamStatus"] if stream else "missing"
+            state["health"] = stream["status"].get("healthStatus", {}).get("status", "") if stream else ""
+        return {row["Video ID"]: self.states[row["Video ID"]] for row in rows}
+
+    def run(self, jobs: Dict[str, Callable[[], Any]], action: str) -> Dict[str, Any]:
+        """run jobs (broadcast id -> function) concurrently, returns broadcast id -> result or exception
+        and records action and outcome in self.states
+        """
+        def run_job(job: Callable[[], Any]):
+            try:
+                return job()
+            except Exception as ex:
+                return ex
+
+        if len(jobs) == 0:
+            return {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(jobs)))) as pool:
+            results = dict(zip(jobs.keys(), pool.map(run_job, jobs.values())))
+        for broadcast_id, res in results.items():
+            state = self.states.setdefault(broadcast_id, {"row": None, "broadcast": "", "stream": "", "health": ""})
+            state["action"] = action
+            state["result"] = f"ERROR: {res}" if isinstance(res, Exception) else "ok"
+        return results
+
+    def bind(self, rows: List[dict]) -> Dict[str, Any]:
+        """bind the stream key of every row to its broadcast
+        """
+        return self.run({row["Video ID"]: lambda row=row: self.yt.bind_stream_to_broadcast(row["Stream Key ID"], row["Video ID"])
+                         for row in rows if row["Video ID"]}, "bind")
+
+    def unbind(self, rows: List[dict]) -> Dict[str, Any]:
+        return self.run({row["Video ID"]: lambda row=row: self.yt.bind_stream_to_broadcast(None, row["Video ID"])
+                         for row in rows if row["Video ID"]}, "unbind")
+
+    def start(self, rows: List[dict]) -> Dict[str, Any]:
+        """transition the broadcasts that are ready (or created) to live, once their streams are active.
+        Broadcasts whose stream is not active after stream_timeout are still transitioned (as make_broadcast_live did).
+        """
+        states = self.poll(rows)
+        to_start = [b_id for b_id, s in states.items() if s["broadcast"] in ("ready", "created")]
+        for b_id, s in states.items():
+            if b_id not in to_start:
+                print(f"Broadcast {b_id} is in state {s['broadcast']}, and cannot be (re-)made live")
+
+        deadline = time.time() + self.stream_timeout
+        while any(states[b_id]["stream"] != "active" for b_id in to_start) and time.time() < deadline:
+            inactive = [b_id for b_id in to_start if states[b_id]["stream"] != "active"]
+            print(f"{len(inactive)} streams are not active yet, will wait {self.poll_interval}s longer for data")
+            time.sleep(self.poll_interval)
+            states = self.poll(rows)
+
+        for b_id in to_start:
+            s = states[b_id]
+            if s["stream"] != "active":
+                print(f"Stream (key {s['row']['Stream Key ID']}) for broadcast {b_id} is still not active "
+                      f"(currently {s['stream']})")
+            elif s["health"] != "good":
+                print(f"WARNING: Stream (key {s['row']['Stream Key ID']}) is active, but not healthy. "
+                      f"Health status is {s['health']}")
+        return self.run({b_id: lambda b_id=b_id: self.yt.set_broadcast_status(b_id, "live") for b_id in to_start},
+                        "start")
+
+    def stop(self, rows: List[dict]) -> Dict[str, Any]:
+        """transition the live broadcasts to complete and unbind their stream keys (for reuse),
+        then make the videos embeddable in one batch request
+        """
+        states = self.poll(rows)
+        to_stop = []
+        for b_id, s in states.items():
+            if s["broadcast"] == "live":
+                to_stop.append(b_id)
+            elif s["broadcast"] == "complete":
+                print(f"Broadcast {b_id} has already been made complete, skipping redundant transition")
+            else:
+                print(f"Broadcast {b_id} is {s['broadcast']}, not live, cannot make complete")
+
+        def stop_job(b_id: str):
+            res = self.yt.set_broadcast_status(b_id, "complete")
+            self.yt.bind_stream_to_broadcast(None, b_id)
+            return res
+
+        results = self.run({b_id: lambda b_id=b_id: stop_job(b_id) for b_id in to_stop}, "stop")
+        stopped = [b_id for b_id, res in results.items() if not isinstance(res, Exception)]
+        for b_id, res in zip(stopped, self.yt.set_videos_embeddable(stopped)):
+            if isinstance(res, Exception):
+                print(f"making {b_id} embeddable failed: {res}")
+        return results
+
+    def print_states(self, broadcast_ids: List[str] = None):
+        """print the state table, e.g. after poll(), start() or stop()
+        """
+        header = ["Livestream ID", "Video ID", "Broadcast", "Stream", "Health", "Action", "Result"]
+        table = [header]
+        for b_id in broadcast_ids if broadcast_ids is not None else self.states.keys():
+            s = self.states[b_id]
+            row = s["row"] or {}
+            table.append([row.get("Livestream ID", ""), b_id, s["broadcast"], s["stream"], s["health"],
+                          s["action"], s["result"]])
+        widths = [max(len(str(r[i])) for r in table) for i in range(len(header))]
+        for r in table:
+            print("  ".join(str(v).ljust(w) for v, w in zip(r, widths)))
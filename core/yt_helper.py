@@ -2,13 +2,21 @@ from pydoc import describe
 import sys
 import io
 import os
+import json
+import uuid
+import hashlib
+import threading
+import urllib.parse
 import http.client
 import httplib2
 import time
-from apiclient.http import MediaFileUpload
+import googleapiclient.discovery
+from apiclient.http import HttpRequest, MediaFileUpload, MediaIoBaseUpload, MediaUpload
 from apiclient.errors import HttpError
-from typing import List
+from typing import Any, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timezone, datetime, timedelta
+from zoneinfo import ZoneInfo
 
 import core.auth as conf_auth
 
@@ -19,13 +27,351 @@ RETRIABLE_EXCEPTIONS = (httplib2.HttpLib2Error, IOError, http.client.NotConnecte
                         http.client.CannotSendRequest, http.client.CannotSendHeader,
                         http.client.ResponseNotReady, http.client.BadStatusLine)
 
+# size of the chunks of resumable uploads, has to be a multiple of 256 KiB
+UPLOAD_CHUNK_SIZE = 16 * 1024 * 1024
+
+# upload session URIs of interrupted resumable uploads, one .json file per upload
+UPLOAD_STATE_DIR = os.path.join(".", "tmp", "yt_uploads")
+
+# maximum number of calls in one batch request and of ids in one list request
+BATCH_SIZE = 50
+
+# quota units of the YouTube Data API methods, see https://developers.google.com/youtube/v3/determine_quota_cost
+QUOTA_COSTS = {
+    "videos.insert": 1600,
+    "videos.update": 50,
+    "videos.list": 1,
+    "videos.delete": 50,
+    "captions.insert": 400,
+    "thumbnails.set": 50,
+    "playlists.insert": 50,
+    "playlists.update": 50,
+    "playlists.list": 1,
+    "playlistItems.insert": 50,
+    "playlistItems.delete": 50,
+    "playlistItems.list": 1,
+    "liveBroadcasts.insert": 50,
+    "liveBroadcasts.update": 50,
+    "liveBroadcasts.bind": 50,
+    "liveBroadcasts.transition": 50,
+    "liveBroadcasts.list": 1,
+    "liveStreams.list": 1,
+    "channels.list": 1,
+    "search.list": 100,
+}
+
+DEFAULT_DAILY_QUOTA = 10000
+
+QUOTA_LEDGER_FILE = os.path.join(".", "tmp", "yt_quota_ledger.json")
+
+# playlists and their items of the channel, see ChannelInventory
+INVENTORY_FILE = os.path.join(".", "tmp", "yt_inventory.json")
+
+# hash of the thumbnail image every video currently has, see ThumbnailManifest
+THUMBNAIL_MANIFEST_FILE = os.path.join(".", "tmp", "yt_thumbnails.json")
+
+# the daily quota resets at midnight Pacific Time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+class QuotaLedger:
+    def __init__(self, daily_quota: int = DEFAULT_DAILY_QUOTA, path: str = QUOTA_LEDGER_FILE):
+        """Units of the YouTube Data API quota used per quota day, persisted in path.
+        Larger jobs (e.g. a video upload with thumbnail and captions) reserve their units with acquire() before
+        they start, so that concurrent jobs cannot exceed the daily quota together. The calls of a thread
+        are charged against its reservation first, release() frees what is left of it.
+        """
+        self.daily_quota = daily_quota
+        self.path = path
+        self.days: dict = {}
+        self._reserved = 0
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.days = json.load(f)["days"]
+            except (OSError, ValueError, KeyError):
+                print(f"WARNING: could not read quota ledger {path}")
+
+    @staticmethod
+    def cost(*methods: str) -> int:
+        """quota units of the specified methods, e.g. cost("videos.insert", "captions.insert")
+        """
+        return sum(QUOTA_COSTS.get(m, 1) for m in methods)
+
+    @staticmethod
+    def quota_day(t: datetime = None) -> str:
+        return (t or datetime.now(timezone.utc)).astimezone(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+    @staticmethod
+    def next_reset() -> datetime:
+        now = datetime.now(QUOTA_TIMEZONE)
+        return (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def _today(self) -> dict:
+        return self.days.setdefault(self.quota_day(), {"used": 0, "calls": {}})
+
+    def used(self) -> int:
+        with self._cond:
+            return self._today()["used"]
+
+    def remaining(self) -> int:
+        """units that are neither used nor reserved today
+        """
+        with self._cond:
+            return max(0, self.daily_quota - self._today()["used"] - self._reserved)
+
+    def charge(self, method_id: str):
+        """record a call of method_id (e.g. "youtube.videos.insert")
+        """
+        method = method_id[len("youtube."):] if method_id and method_id.startswith("youtube.") else method_id
+        units = self.cost(method)
+        with self._cond:
+            today = self._today()
+            today["used"] += units
+            today["calls"][method] = today["calls"].get(method, 0) + 1
+            reserved = getattr(self._local, "reserved", 0)
+            covered = min(reserved, units)
+            self._local.reserved = reserved - covered
+            self._reserved -= covered
+            self._save()
+
+    def check_error(self, e: Exception):
+        """mark the quota of today as used up if the API responded with quotaExceeded
+        """
+        if isinstance(e, HttpError) and e.resp.status == 403 and b"quotaExceeded" in (e.content or b""):
+            print("WARNING: YouTube API quota exceeded")
+            with self._cond:
+                today = self._today()
+                today["used"] = max(today["used"], self.daily_quota)
+                self._save()
+
+    def acquire(self, units: int, wait: bool = False) -> bool:
+        """reserve units for the calling thread. If they are not available, returns False or,
+        with wait, blocks until the quota was reset.
+        """
+        with self._cond:
+            while self._today()["used"] + self._reserved + units > self.daily_quota:
+                if not wait:
+                    return False
+                reset = self.next_reset()
+                print(f"YouTube API quota used up, waiting for the reset at {reset.isoformat()}")
+                self._cond.wait(timeout=(reset - datetime.now(QUOTA_TIMEZONE)).total_seconds() + 60)
+            self._reserved += units
+            self._local.reserved = getattr(self._local, "reserved", 0) + units
+            return True
+
+    def release(self):
+        """free the units that are left of the reservation of the calling thread
+        """
+        with self._cond:
+            self._reserved -= getattr(self._local, "reserved", 0)
+            self._local.reserved = 0
+            self._cond.notify_all()
+
+    def _save(self):
+        # only keep the last month
+        for day in sorted(self.days.keys())[:-31]:
+            del self.days[day]
+        dir_name = os.path.dirname(self.path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        temp_fn = self.path + str(uuid.uuid4())
+        with open(temp_fn, "w", encoding="utf-8") as f:
+            json.dump({"daily_quota": self.daily_quota, "days": self.days}, f, indent=1)
+        os.replace(temp_fn, self.path)
+
+
+class QuotaHttpRequest(HttpRequest):
+    """HttpRequest that charges the quota units of its method to a QuotaLedger when it is sent
+    """
+    ledger: QuotaLedger = None
+
+    def execute(self, http=None, num_retries=0):
+        self.ledger.charge(self.methodId)
+        try:
+            return super().execute(http=http, num_retries=num_retries)
+        except HttpError as e:
+            self.ledger.check_error(e)
+            raise
+
+    def next_chunk(self, http=None, num_retries=0):
+        if self.resumable_uri is None:
+            # starting a resumable upload session costs the units of the method
+            self.ledger.charge(self.methodId)
+        try:
+            return super().next_chunk(http=http, num_retries=num_retries)
+        except HttpError as e:
+            self.ledger.check_error(e)
+            raise
+
+
+class QuotaScheduler:
+    def __init__(self, ledger: QuotaLedger):
+        """Runs tasks in the order of their priority (lowest first) if the ledger can afford the units they need to start
+        """
+        self.ledger = ledger
+        self.tasks = []
+
+    def add(self, name: str, fn, units: int, priority: int):
+        self.tasks.append((priority, len(self.tasks), name, fn, units))
+
+    def run(self, wait: bool = False) -> List[str]:
+        """run tasks by priority. With wait, tasks wait for the quota reset if needed, otherwise tasks that cannot
+        be afforded anymore are skipped. Returns the names of the skipped tasks.
+        """
+        skipped = []
+        for priority, _, name, fn, units in sorted(self.tasks, key=lambda t: t[:2]):
+            if not self.ledger.acquire(units, wait):
+                skipped.append(name)
+                continue
+            self.ledger.release()
+            print(f"\r\nrunning {name} ({self.ledger.remaining()} quota units left today)")
+            fn()
+        if len(skipped) > 0:
+            print(f"not enough quota for {', '.join(skipped)}, run again after {self.ledger.next_reset().isoformat()}")
+        return skipped
+
+
+class ThumbnailManifest:
+    def __init__(self, path: str = THUMBNAIL_MANIFEST_FILE):
+        """Hash of the thumbnail image that was last set for every video (video id -> hash), persisted in path,
+        so that thumbnails are only uploaded again if the image changed. The hash is the content hash of the image
+        (file_key / data_key), rendering is deterministic, so a re-rendered thumbnail with unchanged inputs
+        (see core.thumbnail.render_thumbnails_cached) has the same hash.
+        """
+        self.path = path
+        self.hashes: dict[str, str] = {}
+        self._lock = threading.Lock()
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.hashes = json.load(f)["thumbnails"]
+            except (OSError, ValueError, KeyError):
+                print(f"WARNING: could not read thumbnail manifest {path}")
+
+    @staticmethod
+    def file_key(path: str) -> str:
+        """content hash of an image file
+        """
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def data_key(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def get(self, video_id: str) -> str:
+        with self._lock:
+            return self.hashes.get(video_id)
+
+    def is_current(self, video_id: str, key: str) -> bool:
+        """True if the thumbnail with hash key was already set for video_id
+        """
+        return self.get(video_id) == key
+
+    def set(self, video_id: str, key: str):
+        with self._lock:
+            self.hashes[video_id] = key
+            self._save()
+
+    def _save(self):
+        dir_name = os.path.dirname(self.path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        temp_fn = self.path + str(uuid.uuid4())
+        with open(temp_fn, "w", encoding="utf-8") as f:
+            json.dump({"thumbnails": self.hashes}, f)
+        os.replace(temp_fn, self.path)
+
+
+class StreamMediaUpload(MediaUpload):
+    def __init__(self, stream, size: int = None, mimetype: str = "application/octet-stream",
+                 chunksize: int = UPLOAD_CHUNK_SIZE):
+        """Resumable upload of the data read from a non-seekable stream (e.g. http response) in chunks.
+        The bytes that were read but not yet confirmed by the server are kept in a spill buffer (about one chunk),
+        so that failed chunks can be sent again. size can be None if unknown.
+        """
+        self._stream = stream
+        self._size = size
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._buffer = bytearray()
+        # stream offset of the first byte in _buffer
+        self._buffer_start = 0
+
+    def chunksize(self):
+        return self._chunksize
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return self._size
+
+    def resumable(self):
+        return True
+
+    def has_stream(self):
+        return False
+
+    def stream(self):
+        return None
+
+    def getbytes(self, begin: int, length: int) -> bytes:
+        if begin < self._buffer_start:
+            raise RuntimeError(f"bytes from offset {begin} were already discarded, upload cannot be resumed")
+        # everything before begin was confirmed by the server
+        del self._buffer[:begin - self._buffer_start]
+        self._buffer_start = begin
+        while len(self._buffer) < length:
+            data = self._stream.read(length - len(self._buffer))
+            if not data:
+                break
+            self._buffer += data
+        return bytes(self._buffer[:length])
+
+    def rewindable(self) -> bool:
+        """whether the upload can start over from the first byte, i.e. no bytes were discarded yet
+        """
+        return self._buffer_start == 0
+
+    def to_json(self):
+        raise TypeError("stream uploads are not serializable")
+
 
 class YouTubeHelper:
-    def __init__(self):
+    def __init__(self, daily_quota: int = DEFAULT_DAILY_QUOTA):
         """YouTube helper class to perform various actions, will immediately authenticate upon class instantiation
+        daily_quota: YouTube Data API units per day, the units used by all calls are tracked in self.quota
         """
         self.auth = conf_auth.Authentication(
             youtube=True, use_pickled_credentials=True)
+        self.quota = QuotaLedger(daily_quota)
+        self.thumbnails = ThumbnailManifest()
+        self._local = threading.local()
+
+    def _build_request(self, *args, **kwargs) -> QuotaHttpRequest:
+        request = QuotaHttpRequest(*args, **kwargs)
+        request.ledger = self.quota
+        return request
+
+    @property
+    def youtube(self):
+        """YouTube API client of the calling thread. The http connection of a client must not be shared
+        between threads, so every thread gets its own client built from the same credentials.
+        The quota units of all requests are charged to self.quota.
+        """
+        client = getattr(self._local, "youtube", None)
+        if client is None:
+            client = googleapiclient.discovery.build(
+                "youtube", "v3", credentials=self.auth.youtube_credentials, requestBuilder=self._build_request)
+            self._local.youtube = client
+        return client
 
     def make_youtube_title(self, title: str) -> str:
         """Make sure title is valid for Youtube: <= 100 characters and no '<' or '>' symbols
@@ -89,7 +435,7 @@ class YouTubeHelper:
                 }
         """
         title = self.make_youtube_title(title)
-        resp = self.auth.youtube.playlists().insert(
+        resp = self.youtube.playlists().insert(
             part="id,status,snippet",
             body={
                 "snippet": {
@@ -102,10 +448,29 @@ class YouTubeHelper:
             }).execute()
         return resp
 
-    def add_video_to_playlist(self, playlist_id: str, video_id: str):
-        """Add existing video to existing playlist
+    def execute_batch(self, requests: List[Any]) -> List[Any]:
+        """Execute api requests (e.g. self.youtube.videos().update(...) without .execute()) in batch http requests
+        of up to BATCH_SIZE calls. Media uploads cannot be batched.
+        Returns the responses in the order of requests, or the exception for calls that failed.
         """
-        resp = self.auth.youtube.playlistItems().insert(
+        results: List[Any] = [None] * len(requests)
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                self.quota.check_error(exception)
+            results[int(request_id)] = exception if exception is not None else response
+
+        for start in range(0, len(requests), BATCH_SIZE):
+            batch = self.youtube.new_batch_http_request(callback=callback)
+            for i in range(start, min(start + BATCH_SIZE, len(requests))):
+                # the calls of a batch are sent without their execute()
+                self.quota.charge(requests[i].methodId)
+                batch.add(requests[i], request_id=str(i))
+            batch.execute()
+        return results
+
+    def _add_video_to_playlist_request(self, playlist_id: str, video_id: str):
+        return self.youtube.playlistItems().insert(
             part="id,status,snippet",
             body={
                 "snippet": {
@@ -115,22 +480,63 @@ class YouTubeHelper:
                         "videoId": video_id
                     }
                 }
-            }).execute()
-        return resp
+            })
+
+    def add_video_to_playlist(self, playlist_id: str, video_id: str):
+        """Add existing video to existing playlist
+        """
+        return self._add_video_to_playlist_request(playlist_id, video_id).execute()
+
+    def add_videos_to_playlists(self, items: List[Tuple[str, str]]) -> List:
+        """Add existing videos to existing playlists, items: list of (playlist_id, video_id), in batch requests.
+        Inserts into the same playlist can conflict within a batch, failed inserts are therefore retried one by one.
+        Returns the responses in the order of items.
+        """
+        results = self.execute_batch([self._add_video_to_playlist_request(p, v) for p, v in items])
+        for i, res in enumerate(results):
+            if isinstance(res, Exception):
+                print(f"batch insert of video {items[i][1]} into playlist {items[i][0]} failed, retrying: {res}")
+                results[i] = self.add_video_to_playlist(*items[i])
+        return results
 
     def set_thumbnail(self, video_id: str, path: str):
-        """Upload image and set it as thumbnail for video
+        """Upload image and set it as thumbnail for video, the content hash of the file is recorded in self.thumbnails
         """
-        res = self.auth.youtube.thumbnails().set(
+        return self._set_thumbnail(video_id, MediaFileUpload(path), ThumbnailManifest.file_key(path))
+
+    def _set_thumbnail(self, video_id: str, media_body: MediaUpload, key: str):
+        res = self.youtube.thumbnails().set(
             videoId=video_id,
-            media_body=MediaFileUpload(path)
+            media_body=media_body
         ).execute()
+        self.thumbnails.set(video_id, key)
         return res
 
-    def upload_video(self, path: str, title: str, description: str):
+    def _set_broadcast_thumbnail(self, video_id: str, thumbnail_png_bytes: io.BytesIO, thumbnail_path: str):
+        if thumbnail_png_bytes:
+            self._set_thumbnail(video_id, MediaIoBaseUpload(thumbnail_png_bytes, mimetype="image/png"),
+                                ThumbnailManifest.data_key(thumbnail_png_bytes.getvalue()))
+        elif thumbnail_path:
+            self.set_thumbnail(video_id, thumbnail_path)
+
+    def set_thumbnails(self, items: List[Tuple[str, str]], max_workers: int = 4) -> List:
+        """Upload images and set them as thumbnails, items: list of (video_id, path).
+        Media uploads cannot be part of batch requests, so they are sent concurrently by max_workers threads instead.
+        Returns the responses in the order of items, or the exception for uploads that failed.
+        """
+        def set_thumbnail(item: Tuple[str, str]):
+            try:
+                return self.set_thumbnail(*item)
+            except Exception as ex:
+                return ex
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            return list(pool.map(set_thumbnail, items))
+
+    def _insert_video_request(self, title: str, description: str, media_body: MediaUpload):
         title = self.make_youtube_title(title)
         description = self.make_youtube_description(description)
-        upload_request = self.auth.youtube.videos().insert(
+        return self.youtube.videos().insert(
             part="id,status,snippet",
             body={
                 "snippet": {
@@ -144,29 +550,83 @@ class YouTubeHelper:
                     "embeddable": True
                 }
             },
-            # MediaFileUpload('cow.png', mimetype='image/png', chunksize=1024*1024, resumable=True)
-            # Depending on the platform you are working on, you may pass -1 as the
-            # chunksize, which indicates that the entire file should be uploaded in a single
-            # request.
-            media_body=MediaFileUpload(path, chunksize=-1, resumable=True)
+            media_body=media_body
         )
 
+    def upload_video(self, path: str, title: str, description: str, resume_key: str = None,
+                     chunksize: int = UPLOAD_CHUNK_SIZE):
+        """Upload video file in chunks of chunksize bytes with a resumable upload.
+        resume_key: identifies the upload (e.g. the video source id), the upload session is persisted in
+        UPLOAD_STATE_DIR after every chunk so that an interrupted upload of the same file continues
+        where it stopped the next time it is uploaded with the same key.
+        """
+        upload_request = self._insert_video_request(
+            title, description, MediaFileUpload(path, chunksize=chunksize, resumable=True))
+        state_fn = self._upload_state_path(resume_key) if resume_key else None
+        file_info = {"path": os.path.abspath(path), "size": os.path.getsize(path)}
+        return self._run_upload(upload_request, self.make_youtube_title(title), path, state_fn, file_info)
+
+    def upload_video_stream(self, stream, title: str, description: str, size: int = None, name: str = "stream",
+                            chunksize: int = UPLOAD_CHUNK_SIZE):
+        """Upload video read from stream (e.g. an http response of a video download) without storing it on disk,
+        see StreamMediaUpload. size: number of bytes if known, name: shown in log messages.
+        Interrupted uploads are retried within this call but cannot be resumed by a later run.
+        """
+        upload_request = self._insert_video_request(
+            title, description, StreamMediaUpload(stream, size=size, chunksize=chunksize))
+        return self._run_upload(upload_request, self.make_youtube_title(title), name)
+
+    def _run_upload(self, upload_request, title: str, path: str, state_fn: str = None, file_info: dict = None):
+        """send the chunks of the resumable upload_request, retrying chunks that failed.
+        With state_fn, the upload session is persisted (and resumed) there (see upload_video).
+        """
+        state = self._read_upload_state(state_fn, file_info) if state_fn else None
+        if state:
+            print(f"Resuming upload of {path}")
+            upload_request.resumable_uri = state["resumable_uri"]
+            # makes next_chunk() ask the server how many bytes it already received
+            upload_request._in_error_state = True
+
         httplib2.RETRIES = 1
         response = None
         error = None
         retries = 0
+        print(f"Uploading Video:\ntitle = {title}\nvideo = {path}")
         while not response:
+            error = None
             try:
-                print(f"Uploading Video:\ntitle = {title}\nvideo = {path}")
                 status, response = upload_request.next_chunk()
                 if response:
+                    if state_fn:
+                        self._clear_upload_state(state_fn)
                     if "id" in response:
                         print(f"Uploaded\ntitle = {title}\nvideo = {path}")
                         return response
                     else:
                         print("Upload failed with an unexpected response")
                         return None
+                if status:
+                    print(f"{status.resumable_progress / 1024**2:.0f} MB uploaded of {path}")
+                if state_fn and upload_request.resumable_uri and \
+                        (state is None or state["resumable_uri"] != upload_request.resumable_uri):
+                    state = dict(file_info, resumable_uri=upload_request.resumable_uri)
+                    self._write_upload_state(state_fn, state)
+                retries = 0
             except HttpError as e:
+                if e.resp.status in (404, 410) and upload_request.resumable_uri:
+                    media = upload_request.resumable
+                    if isinstance(media, StreamMediaUpload) and not media.rewindable():
+                        raise RuntimeError(f"Upload session of {path} expired and the stream cannot be read again, "
+                                           f"the upload has to be restarted") from e
+                    # upload session expired, start over
+                    print(f"Upload session of {path} expired, restarting upload")
+                    upload_request.resumable_uri = None
+                    upload_request.resumable_progress = 0
+                    upload_request._in_error_state = False
+                    state = None
+                    if state_fn:
+                        self._clear_upload_state(state_fn)
+                    continue
                 if e.resp.status in RETRIABLE_STATUS_CODES:
                     error = f"Retriable HTTP error {
                         e.resp.status}: {e.content}"
@@ -185,31 +645,68 @@ class YouTubeHelper:
 
         return None
 
-    def update_video(self, enable_captions: bool, video_id: str, title: str, description: str, privacy: str = "unlisted"):
-        # print("Updating\ntitle = {}\nvideo = {}".format(title, video_id))
+    @staticmethod
+    def _upload_state_path(resume_key: str) -> str:
+        return os.path.join(UPLOAD_STATE_DIR, urllib.parse.quote(resume_key, safe="") + ".json")
+
+    @staticmethod
+    def _read_upload_state(state_fn: str, file_info: dict) -> dict:
+        """returns the persisted upload session if it belongs to the same (unchanged) file
+        """
+        if not os.path.isfile(state_fn):
+            return None
+        try:
+            with open(state_fn, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if any(state.get(k) != v for k, v in file_info.items()) or not state.get("resumable_uri"):
+            return None
+        return state
+
+    @staticmethod
+    def _write_upload_state(state_fn: str, state: dict):
+        os.makedirs(UPLOAD_STATE_DIR, exist_ok=True)
+        temp_fn = state_fn + str(uuid.uuid4())
+        with open(temp_fn, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp_fn, state_fn)
+
+    @staticmethod
+    def _clear_upload_state(state_fn: str):
+        if os.path.isfile(state_fn):
+            os.remove(state_fn)
+
+    def _update_video_request(self, video_id: str, title: str, description: str, privacy: str = "unlisted"):
         title = self.make_youtube_title(title)
         description = self.make_youtube_description(description)
-        resp = self.auth.youtube.videos().update(
+        return self.youtube.videos().update(
             part="id,snippet,status",
             body={
                 "id": video_id,
                 "snippet": {
                     "title": title,
-                    "scheduledStartTime": start_time.astimezone(tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.0Z"),
                     "description": description,
+                    "categoryId": 27  # has to be provided when updating the snippet
                 },
                 "status": {
                     "privacyStatus": privacy
                 }
             }
-        ).execute()
-        return resp
+        )
 
-    def set_video_embeddable(self, video_id: str, privacy: str = "unlisted"):
-        """Make sure that 'embeddable' is set to True of specified video
-        (e.g., after live broadcast has stoppped)
+    def update_video(self, enable_captions: bool, video_id: str, title: str, description: str, privacy: str = "unlisted"):
+        # print("Updating\ntitle = {}\nvideo = {}".format(title, video_id))
+        return self._update_video_request(video_id, title, description, privacy).execute()
+
+    def update_videos(self, updates: List[Tuple[str, str, str]], privacy: str = "unlisted") -> List:
+        """Update title and description of videos, updates: list of (video_id, title, description), in batch requests.
+        Returns the responses in the order of updates, or the exception for calls that failed.
         """
-        resp = self.auth.youtube.videos().update(
+        return self.execute_batch([self._update_video_request(v, t, d, privacy) for v, t, d in updates])
+
+    def _set_video_embeddable_request(self, video_id: str, privacy: str = "unlisted"):
+        return self.youtube.videos().update(
             part="id,contentDetails,status",
             body={
                 "id": video_id,
@@ -218,13 +715,24 @@ class YouTubeHelper:
                     "privacyStatus": privacy
                 }
             }
-        ).execute()
-        return resp
+        )
+
+    def set_video_embeddable(self, video_id: str, privacy: str = "unlisted"):
+        """Make sure that 'embeddable' is set to True of specified video
+        (e.g., after live broadcast has stoppped)
+        """
+        return self._set_video_embeddable_request(video_id, privacy).execute()
+
+    def set_videos_embeddable(self, video_ids: List[str], privacy: str = "unlisted") -> List:
+        """set_video_embeddable for several videos in batch requests.
+        Returns the responses in the order of video_ids, or the exception for calls that failed.
+        """
+        return self.execute_batch([self._set_video_embeddable_request(v, privacy) for v in video_ids])
 
     def disable_autostart(self, broadcast_id: str):
         """Make sure that auto start streaming is disabled
         """
-        resp = self.auth.youtube.liveBroadcasts().update(
+        resp = self.youtube.liveBroadcasts().update(
             part="id,contentDetails",
             body={
                 "id": broadcast_id,
@@ -246,10 +754,14 @@ class YouTubeHelper:
         return resp
 
     def upload_subtitles(self, video_id: str, subtitles_path: str, name: str = "English Subtitles",
-                         language: str = "en-us"):
-        """Upload subtitles file to specified video
+                         language: str = "en-us", subtitles_data: bytes = None):
+        """Upload subtitles file to specified video, subtitles_data can be provided instead of a file path
         """
-        resp = self.auth.youtube.captions().insert(
+        if subtitles_data is not None:
+            media_body = MediaIoBaseUpload(io.BytesIO(subtitles_data), mimetype="application/octet-stream")
+        else:
+            media_body = MediaFileUpload(subtitles_path)
+        resp = self.youtube.captions().insert(
             part="id,snippet",
             body={
                 "snippet": {
@@ -258,14 +770,14 @@ class YouTubeHelper:
                     "name": name
                 }
             },
-            media_body=MediaFileUpload(subtitles_path)
+            media_body=media_body
         ).execute()
         return resp
 
     def update_broadcast(self, broadcast_id: str, start_time: datetime, end_time: datetime, enable_captions: bool = True, thumbnail_png_bytes: io.BytesIO = None, thumbnail_path: str = None,
                          enable_auto_start: bool = False, privacy: str = "unlisted"):
         # https://developers.google.com/youtube/v3/live/docs/liveBroadcasts#resource
-        broadcast_info = self.auth.youtube.liveBroadcasts().update(
+        broadcast_info = self.youtube.liveBroadcasts().update(
             part="id,snippet,contentDetails,status",
             body={
                 "id": broadcast_id,
@@ -299,17 +811,7 @@ class YouTubeHelper:
         ).execute()
 
         # Render the thumbnail for the session and upload it
-        if thumbnail_png_bytes:
-            self.auth.youtube.thumbnails().set(
-                videoId=broadcast_info["id"],
-                media_body=MediaIoBaseUpload(
-                    thumbnail_png_bytes, mimetype="image/png")
-            ).execute()
-        elif thumbnail_path:
-            self.auth.youtube.thumbnails().set(
-                videoId=broadcast_info["id"],
-                media_body=MediaFileUpload(thumbnail_path)
-            ).execute()
+        self._set_broadcast_thumbnail(broadcast_info["id"], thumbnail_png_bytes, thumbnail_path)
 
         return broadcast_info
 
@@ -326,7 +828,7 @@ class YouTubeHelper:
         title = self.make_youtube_title(title)
         description = self.make_youtube_description(description)
         # https://developers.google.com/youtube/v3/live/docs/liveBroadcasts#resource
-        broadcast_info = self.auth.youtube.liveBroadcasts().insert(
+        broadcast_info = self.youtube.liveBroadcasts().insert(
             part="id,snippet,contentDetails,status",
             body={
                 "contentDetails": {
@@ -362,7 +864,7 @@ class YouTubeHelper:
 
         # Due to a bug in the Youtube Broadcast API we have to set the made for
         # kids and embeddable flags through the videos API separately
-        update_resp = self.auth.youtube.videos().update(
+        update_resp = self.youtube.videos().update(
             part="id,contentDetails,status",
             body={
                 "id": broadcast_info["id"],
@@ -374,17 +876,7 @@ class YouTubeHelper:
         ).execute()
 
         # Render the thumbnail for the session and upload it
-        if thumbnail_png_bytes:
-            self.auth.youtube.thumbnails().set(
-                videoId=broadcast_info["id"],
-                media_body=MediaIoBaseUpload(
-                    thumbnail_png_bytes, mimetype="image/png")
-            ).execute()
-        elif thumbnail_path:
-            self.auth.youtube.thumbnails().set(
-                videoId=broadcast_info["id"],
-                media_body=MediaFileUpload(thumbnail_path)
-            ).execute()
+        self._set_broadcast_thumbnail(broadcast_info["id"], thumbnail_png_bytes, thumbnail_path)
 
         return broadcast_info
 
@@ -445,32 +937,48 @@ class YouTubeHelper:
         return res
 
     def get_broadcasts(self, ids: List[str]) -> List:
-        """get all broadcasts of associated channel (mine)
+        """get broadcasts with the specified ids, requested in batches of list calls with up to BATCH_SIZE ids each
         """
+        print(",".join(ids))
+        chunks = [ids[i:i + BATCH_SIZE] for i in range(0, len(ids), BATCH_SIZE)]
+        results = self.execute_batch([self.youtube.liveBroadcasts().list(
+            id=",".join(chunk),
+            part="id,snippet,contentDetails,status",
+            maxResults=BATCH_SIZE
+        ) for chunk in chunks])
         all_items = []
-        page_token = None
-        id_str = ",".join(ids)
-        print(id_str)
-        while True:
-            items = self.auth.youtube.liveBroadcasts().list(
-                id=id_str,
-                part="id,snippet,contentDetails,status",
-                maxResults=50,
-                pageToken=page_token
-            ).execute()
-            all_items += items["items"]
-            if "nextPageToken" not in items:
-                break
-            page_token = items["nextPageToken"]
+        for res in results:
+            if isinstance(res, Exception):
+                raise res
+            all_items += res["items"]
         return all_items
 
+    def get_streams_by_ids(self, ids: List[str]) -> dict:
+        """get livestreams with the specified ids, requested in batches of list calls with up to BATCH_SIZE ids each.
+        Returns dict of stream id -> stream (id, snippet, status), streams that do not exist are missing.
+        """
+        ids = list(dict.fromkeys(ids))
+        chunks = [ids[i:i + BATCH_SIZE] for i in range(0, len(ids), BATCH_SIZE)]
+        results = self.execute_batch([self.youtube.liveStreams().list(
+            id=",".join(chunk),
+            part="id,snippet,status",
+            maxResults=BATCH_SIZE
+        ) for chunk in chunks])
+        streams = {}
+        for res in results:
+            if isinstance(res, Exception):
+                raise res
+            for s in res["items"]:
+                streams[s["id"]] = s
+        return streams
+
     def get_streams(self) -> List:
         """get all livestreams of associated channel (mine)
         """
         all_items = []
         page_token = None
         while True:
-            items = self.auth.youtube.liveStreams().list(
+            items = self.youtube.liveStreams().list(
                 part="id,snippet,cdn,status",
                 maxResults=50,
                 mine=True,
@@ -488,7 +996,7 @@ class YouTubeHelper:
         all_items = []
         page_token = None
         while True:
-            items = self.auth.youtube.search().list(
+            items = self.youtube.search().list(
                 part="id,snippet",
                 maxResults=50,
                 forMine=True,
@@ -507,7 +1015,7 @@ class YouTubeHelper:
         all_items = []
         page_token = None
         while True:
-            items = self.auth.youtube.channels().list(
+            items = self.youtube.channels().list(
                 part="id,snippet,contentDetails,status",
                 maxResults=50,
                 mine=True,
@@ -519,10 +1027,19 @@ class YouTubeHelper:
             page_token = items["nextPageToken"]
         return all_items
 
+    def get_uploads_playlist_id(self) -> str:
+        """id of the playlist that contains all uploaded videos of associated channel (mine)
+        """
+        resp = self.youtube.channels().list(
+            part="contentDetails",
+            mine=True
+        ).execute()
+        return resp["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
+
     def get_video(self, video_id: str):
         """get details of a specific video by id
         """
-        resp = self.auth.youtube.videos().list(
+        resp = self.youtube.videos().list(
             part="id,snippet,contentDetails,fileDetails,liveStreamingDetails,player,processingDetails,recordingDetails,statistics,status,suggestions,topicDetails",
             id=video_id
         ).execute()
@@ -530,10 +1047,30 @@ class YouTubeHelper:
             return None
         return resp['items'][0]
 
+    def get_videos_by_ids(self, video_ids: List[str],
+                          part: str = "id,snippet,contentDetails,liveStreamingDetails,processingDetails,status") -> dict:
+        """get details of several videos, requested in batches of list calls with up to BATCH_SIZE ids each.
+        Returns dict of video id -> video, videos that do not exist are missing.
+        """
+        video_ids = list(dict.fromkeys(video_ids))
+        chunks = [video_ids[i:i + BATCH_SIZE] for i in range(0, len(video_ids), BATCH_SIZE)]
+        results = self.execute_batch([self.youtube.videos().list(
+            part=part,
+            id=",".join(chunk),
+            maxResults=BATCH_SIZE
+        ) for chunk in chunks])
+        videos = {}
+        for res in results:
+            if isinstance(res, Exception):
+                raise res
+            for v in res["items"]:
+                videos[v["id"]] = v
+        return videos
+
     def get_playlist(self, playlist_id: str):
         """get specific playlist
         """
-        resp = self.auth.youtube.playlists().list(
+        resp = self.youtube.playlists().list(
             part="snippet,contentDetails",
             maxResults=50,
             id=playlist_id
@@ -590,7 +1127,7 @@ class YouTubeHelper:
             }
         """
         while True:
-            playlists = self.auth.youtube.playlists().list(
+            playlists = self.youtube.playlists().list(
                 part="snippet,contentDetails",
                 maxResults=50,
                 mine=True,
@@ -647,7 +1184,7 @@ class YouTubeHelper:
         all_items = []
         page_token = None
         while True:
-            items = self.auth.youtube.playlistItems().list(
+            items = self.youtube.playlistItems().list(
                 part="id,snippet,contentDetails,status",
                 maxResults=50,
                 playlistId=playlist_id,
@@ -662,11 +1199,11 @@ class YouTubeHelper:
     def delete_playlist_item(self, playlist_item_id: str):
         """Delete specified playlist item
         """
-        resp = self.auth.youtube.playlistItems().delete(id=playlist_item_id).execute()
+        resp = self.youtube.playlistItems().delete(id=playlist_item_id).execute()
         return resp
 
-    def get_playlists_and_videos_compact(self) -> dict:
-        """retrieves all playlists and their corresponding items (id only)
+    def get_playlists_and_videos_compact(self, use_cache: bool = True) -> dict:
+        """retrieves all playlists and their corresponding items (id only), see ChannelInventory
         returns dict (with playlist title as key):
         {
             "title": {
@@ -675,22 +1212,10 @@ class YouTubeHelper:
             },
         }
         """
-        yt_playlists = self.get_all_playlists()
-        res = {}
-        for pl in yt_playlists:
-            title = pl["snippet"]["title"]
-            res[title] = {
-                "id": pl["id"],
-                "videos": []
-            }
-            items = self.get_playlist_items(pl["id"])
-            videos = res[title]["videos"]
-            for i in items:
-                videos.append(i["snippet"]["resourceId"]["videoId"])
-        return res
+        return self.inventory(use_cache).compact()
 
-    def get_playlists_and_videos(self) -> List:
-        """retrieves all playlists and their corresponding items
+    def get_playlists_and_videos(self, use_cache: bool = True) -> List:
+        """retrieves all playlists and their corresponding items, see ChannelInventory
         returns list of the like:
         [
             {
@@ -699,21 +1224,19 @@ class YouTubeHelper:
             }, ...
         ]
         """
-        yt_playlists = self.get_all_playlists()
-        res = []
-        for pl in yt_playlists:
-            items = self.get_playlist_items(pl["id"])
-            res_item = {
-                "playlist": pl,
-                "items": items
-            }
-            res.append(res_item)
-        return res
+        return self.inventory(use_cache).playlists_and_items()
+
+    def inventory(self, use_cache: bool = True, max_workers: int = 8) -> "ChannelInventory":
+        """up to date ChannelInventory, use_cache False fetches the items of all playlists again
+        """
+        inventory = ChannelInventory(self, max_workers=max_workers)
+        inventory.refresh(force=not use_cache)
+        return inventory
 
     def get_stream_status(self, stream_key_id: str):
         """get streamStatus ("active", "created", "error", "inactive", "ready"), healthStatus ("good", "ok", "bad", "noData") of specified stream
         """
-        response = self.auth.youtube.liveStreams().list(
+        response = self.youtube.liveStreams().list(
             id=stream_key_id,
             part="status"
         ).execute()
@@ -722,7 +1245,7 @@ class YouTubeHelper:
     def get_broadcast_status(self, broadcast_id: str):
         """return broadcast lifeCycleStatus of specified broadcast, e.g. "ready", "live" or "complete" or "testing"
         """
-        response = self.auth.youtube.liveBroadcasts().list(
+        response = self.youtube.liveBroadcasts().list(
             id=broadcast_id,
             part="status"
         ).execute()
@@ -731,7 +1254,7 @@ class YouTubeHelper:
     def set_broadcast_status(self, broadcast_id: str, status: str):
         """set status of specified broadcast, e.g. to "live" or "complete" or "testing"
         """
-        resp = self.auth.youtube.liveBroadcasts().transition(
+        resp = self.youtube.liveBroadcasts().transition(
             broadcastStatus=status,
             id=broadcast_id,
             part="status"
@@ -741,7 +1264,7 @@ class YouTubeHelper:
     def get_broadcast_statistics(self, broadcast_id: str):
         """return liveStreamingDetails of specified broadcast
         """
-        response = self.auth.youtube.videos().list(
+        response = self.youtube.videos().list(
             id=broadcast_id,
             part="liveStreamingDetails"
         ).execute()
@@ -750,9 +1273,116 @@ class YouTubeHelper:
     def bind_stream_to_broadcast(self, stream_key_id: str, broadcast_id: str):
         """attach specified stream to specified broadcast or remove it by setting stream_key_id to None
         """
-        resp = self.auth.youtube.liveBroadcasts().bind(
+        resp = self.youtube.liveBroadcasts().bind(
             id=broadcast_id,
             part="status",
             streamId=stream_key_id,
         ).execute()
         return resp
+
+
+class ChannelInventory:
+    def __init__(self, yt: YouTubeHelper, path: str = INVENTORY_FILE, max_workers: int = 8):
+        """Playlists of the channel with all their items, stored in path. refresh() lists the playlists
+        (one call per 50 playlists) and only fetches the items of playlists whose etag or itemCount changed,
+        with up to max_workers playlists fetched concurrently.
+        """
+        self.yt = yt
+        self.path = path
+        self.max_workers = max_workers
+        # playlist id -> {"playlist": playlist resource, "items": [playlist item resources]}
+        self.entries: dict = {}
+        # uploads playlist of the channel (all uploaded videos) in the same format, see refresh_uploads
+        self.uploads: dict = None
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    inventory = json.load(f)
+                self.entries = inventory["playlists"]
+                self.uploads = inventory.get("uploads")
+            except (OSError, ValueError, KeyError):
+                print(f"WARNING: could not read channel inventory {path}")
+
+    @staticmethod
+    def _is_current(entry: dict, playlist: dict) -> bool:
+        cached = entry["playlist"]
+        return cached.get("etag") == playlist.get("etag") and \
+            cached["contentDetails"]["itemCount"] == playlist["contentDetails"]["itemCount"]
+
+    def refresh(self, force: bool = False) -> int:
+        """bring the inventory up to date, returns the number of playlists whose items were fetched
+        """
+        playlists = self.yt.get_all_playlists()
+        entries = {}
+        to_fetch = []
+        for pl in playlists:
+            entry = self.entries.get(pl["id"])
+            if not force and entry is not None and self._is_current(entry, pl):
+                entries[pl["id"]] = {"playlist": pl, "items": entry["items"]}
+            else:
+                to_fetch.append(pl)
+
+        if len(to_fetch) > 0:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(to_fetch)))) as pool:
+                items = list(pool.map(lambda pl: self.yt.get_playlist_items(pl["id"]), to_fetch))
+            for pl, pl_items in zip(to_fetch, items):
+                entries[pl["id"]] = {"playlist": pl, "items": pl_items}
+
+        # keep the order of get_all_playlists
+        self.entries = {pl["id"]: entries[pl["id"]] for pl in playlists}
+        self.save()
+        print(f"channel inventory: {len(playlists)} playlists, items of {len(to_fetch)} fetched")
+        return len(to_fetch)
+
+    def refresh_uploads(self, force: bool = False) -> bool:
+        """bring the list of uploaded videos up to date (the uploads playlist is not part of get_all_playlists),
+        returns whether its items were fetched
+        """
+        uploads_id = self.yt.get_uploads_playlist_id()
+        pl = self.yt.get_playlist(uploads_id)
+        if not force and self.uploads is not None and self.uploads["playlist"]["id"] == uploads_id \
+                and self._is_current(self.uploads, pl):
+            return False
+        self.uploads = {"playlist": pl, "items": self.yt.get_playlist_items(uploads_id)}
+        self.save()
+        print(f"channel inventory: {len(self.uploads['items'])} uploaded videos fetched")
+        return True
+
+    def save(self):
+        dir_name = os.path.dirname(self.path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        temp_fn = self.path + str(uuid.uuid4())
+        with open(temp_fn, "w", encoding="utf-8") as f:
+            json.dump({"playlists": self.entries, "uploads": self.uploads}, f)
+        os.replace(temp_fn, self.path)
+
+    def playlists_and_items(self) -> List:
+        """same format as YouTubeHelper.get_playlists_and_videos
+        """
+        return [{"playlist": e["playlist"], "items": e["items"]} for e in self.entries.values()]
+
+    def compact(self) -> dict:
+        """same format as YouTubeHelper.get_playlists_and_videos_compact
+        """
+        res = {}
+        for playlist_id, e in self.entries.items():
+            res[e["playlist"]["snippet"]["title"]] = {
+                "id": playlist_id,
+                "videos": [i["snippet"]["resourceId"]["videoId"] for i in e["items"]]
+            }
+        return res
+
+    def video_ids(self) -> set:
+        """ids of all videos that are in at least one playlist
+        """
+        return {i["snippet"]["resourceId"]["videoId"] for e in self.entries.values() for i in e["items"]}
+
+    def uploaded_videos(self) -> dict:
+        """uploaded videos as of the last refresh_uploads(), dict of video id -> item of the uploads playlist
+        (snippet.title is the video title), oldest upload first
+        """
+        if self.uploads is None:
+            return {}
+        items = sorted(self.uploads["items"], key=lambda i: i["snippet"].get("publishedAt", ""))
+        return {i["snippet"]["resourceId"]["videoId"]: i for i in items}
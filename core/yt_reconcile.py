@@ -0,0 +1,180 @@
+import json
+from typing import Dict, List, Tuple
+
+from core.google_sheets import GoogleSheets
+from core.yt_helper import YouTubeHelper, ChannelInventory, QuotaLedger
+
+# columns of the video sheets and of their playlist sheets, as used by upload_videos / upload_ff_videos in yt_api.py
+VIDEO_SHEETS = {
+    "Videos": {"playlists_sheet": "Playlists", "col_prefix": "", "ready": "Ready", "id": "Video ID",
+               "link": "Video Link", "title": "Video Title", "playlists": "Playlists"},
+    "FFVideos": {"playlists_sheet": "FFPlaylists", "col_prefix": "FF ", "ready": "FF Ready", "id": "FF Video ID",
+                 "link": "FF Link", "title": "FF Title", "playlists": "FF Playlists"},
+}
+
+# other sheets (and their video id column) whose videos are on the channel, e.g. the recordings of live broadcasts,
+# which also show up in the uploads playlist
+REFERENCE_SHEETS = {"Broadcasts": "Video ID"}
+
+
+class ReconcilePlan:
+    def __init__(self):
+        """Differences between the video sheets and the channel, and the actions that resolve them.
+        Uploads are not part of the plan (they need the video files), rows that need one are only reported
+        and picked up by the next upload_videos / upload_ff_videos run.
+        """
+        # (sheet, row, {column: new value}), e.g. ids of adopted videos
+        self.sheet_updates: List[Tuple[GoogleSheets, dict, dict]] = []
+        # (playlists sheet, playlist row, column prefix) of playlists that do not exist on the channel
+        self.playlists_to_create: List[Tuple[GoogleSheets, dict, str]] = []
+        # (playlists sheet, playlist row, column prefix, video id), the playlist id is read when the plan is applied
+        self.playlist_inserts: List[Tuple[GoogleSheets, dict, str, str]] = []
+        # "sheet: key" of ready rows without a video on the channel
+        self.missing_uploads: List[str] = []
+        # uploads playlist items of videos that are not referenced by any row
+        self.orphaned_videos: List[dict] = []
+
+    def cost(self) -> int:
+        """quota units needed to apply the plan
+        """
+        return QuotaLedger.cost("playlists.insert") * len(self.playlists_to_create) + \
+            QuotaLedger.cost("playlistItems.insert") * len(self.playlist_inserts)
+
+    def is_empty(self) -> bool:
+        return len(self.sheet_updates) == 0 and len(self.playlists_to_create) == 0 and len(self.playlist_inserts) == 0
+
+    def print(self):
+        for sheet, row, values in self.sheet_updates:
+            print(f"update {sheet.sheet_name} {row[sheet.index_key]}: {values}")
+        for playlists, p_row, col_prefix in self.playlists_to_create:
+            print(f"create playlist {p_row[playlists.index_key]} '{p_row[col_prefix + 'P Title']}'")
+        for playlists, p_row, col_prefix, video_id in self.playlist_inserts:
+            print(f"add video {video_id} to playlist {p_row[playlists.index_key]}")
+        for key in self.missing_uploads:
+            print(f"missing upload: {key}")
+        for item in self.orphaned_videos:
+            print(f"orphaned video: {item['snippet']['resourceId']['videoId']} '{item['snippet']['title']}'")
+        print(f"\r\n{len(self.sheet_updates)} sheet updates, {len(self.playlists_to_create)} playlists to create, "
+              f"{len(self.playlist_inserts)} playlist inserts ({self.cost()} quota units), "
+              f"{len(self.missing_uploads)} missing uploads, {len(self.orphaned_videos)} orphaned videos")
+
+
+class Reconciler:
+    def __init__(self, yt: YouTubeHelper, sheets: Dict[str, GoogleSheets], use_cache: bool = True):
+        """Compares the Videos / FFVideos sheets (and their playlist sheets, all in sheets) with the channel inventory.
+        Videos of the REFERENCE_SHEETS (if in sheets) are never adopted or reported as orphaned.
+        The inventory is pulled once: the playlists with their items (only changed playlists are fetched),
+        the uploads playlist, and the caption state of all videos referenced by the sheets (videos.list per 50 ids).
+        """
+        self.yt = yt
+        self.sheets = sheets
+        self.inventory = ChannelInventory(yt)
+        self.inventory.refresh(force=not use_cache)
+        self.inventory.refresh_uploads(force=not use_cache)
+        self.uploads = self.inventory.uploaded_videos()
+        # playlist id -> ids of the videos in it
+        self.playlist_videos = {p_id: {i["snippet"]["resourceId"]["videoId"] for i in e["items"]}
+                                for p_id, e in self.inventory.entries.items()}
+
+    def _video_sheets(self):
+        for sheet_name, cols in VIDEO_SHEETS.items():
+            if sheet_name in self.sheets:
+                yield self.sheets[sheet_name], self.sheets[cols["playlists_sheet"]], cols
+
+    def diff(self) -> ReconcilePlan:
+        plan = ReconcilePlan()
+
+        # adopt uploads whose id never made it into the sheet (e.g. crash before saving), matched by title
+        referenced = {row[cols["id"]] for videos, _, cols in self._video_sheets() for row in videos.data
+                      if row[cols["id"]]}
+        for sheet_name, id_col in REFERENCE_SHEETS.items():
+            if sheet_name in self.sheets:
+                referenced.update(row[id_col] for row in self.sheets[sheet_name].data if row[id_col])
+        by_title: Dict[str, List[str]] = {}
+        for video_id, item in self.uploads.items():
+            if video_id not in referenced:
+                by_title.setdefault(item["snippet"]["title"], []).append(video_id)
+        video_ids: Dict[int, str] = {}
+        for videos, _, cols in self._video_sheets():
+            for row in videos.data:
+                video_id = row[cols["id"]]
+                if not video_id:
+                    candidates = by_title.get(self.yt.make_youtube_title(row[cols["title"]]))
+                    if candidates:
+                        # oldest upload first, later duplicates stay orphaned
+                        video_id = candidates.pop(0)
+                        referenced.add(video_id)
+                        plan.sheet_updates.append((videos, row, {cols["id"]: video_id,
+                                                                 cols["link"]: "https://youtu.be/" + video_id}))
+                if video_id:
+                    video_ids[id(row)] = video_id
+
+        existing = self.yt.get_videos_by_ids(list(video_ids.values()), part="id,contentDetails")
+
+        for videos, playlists, cols in self._video_sheets():
+            col_prefix = cols["col_prefix"]
+            to_create = {}
+            for row in videos.data:
+                video_id = video_ids.get(id(row))
+                if video_id is not None and video_id not in existing:
+                    # video was deleted on the channel, the next upload run uploads it again
+                    plan.sheet_updates.append((videos, row, {cols["id"]: "", cols["link"]: "",
+                                                             "Subtitles Uploaded": ""}))
+                    video_id = None
+                if video_id is None:
+                    if row[cols["ready"]] == "1":
+                        plan.missing_uploads.append(f"{videos.sheet_name}: {row[videos.index_key]}")
+                    continue
+
+                has_captions = existing[video_id]["contentDetails"].get("caption") == "true"
+                if has_captions != (row["Subtitles Uploaded"] == "y"):
+                    # captions were uploaded without saving the flag, or are gone and have to be uploaded again
+                    plan.sheet_updates.append((videos, row, {"Subtitles Uploaded": "y" if has_captions else ""}))
+
+                for p in row[cols["playlists"]].split("|") if row[cols["playlists"]] else []:
+                    p_row = playlists.data_by_index.get(p)
+                    if p_row is None:
+                        print(f"WARNING: could not find playlist {p}")
+                        continue
+                    playlist_id = p_row[col_prefix + "P ID"]
+                    if not playlist_id or playlist_id not in self.playlist_videos:
+                        to_create[p] = p_row
+                    elif video_id in self.playlist_videos[playlist_id]:
+                        continue
+                    plan.playlist_inserts.append((playlists, p_row, col_prefix, video_id))
+            plan.playlists_to_create += [(playlists, p_row, col_prefix) for p_row in to_create.values()]
+
+        # completed live broadcasts (e.g. of earlier events, not in the Broadcasts sheet) are not orphaned uploads
+        unreferenced = [video_id for video_id in self.uploads if video_id not in referenced]
+        live = self.yt.get_videos_by_ids(unreferenced, part="id,liveStreamingDetails")
+        plan.orphaned_videos = [self.uploads[video_id] for video_id in unreferenced
+                                if video_id not in live or "liveStreamingDetails" not in live[video_id]]
+        return plan
+
+    def apply(self, plan: ReconcilePlan):
+        """execute plan: sheet updates, missing playlists, playlist inserts (in batch requests), then save the sheets
+        """
+        changed: Dict[str, GoogleSheets] = {}
+        for sheet, row, values in plan.sheet_updates:
+            row.update(values)
+            changed[sheet.sheet_name] = sheet
+
+        for playlists, p_row, col_prefix in plan.playlists_to_create:
+            print(f"\r\ncreating playlist titled '{p_row[col_prefix + 'P Title']}'...")
+            res = self.yt.create_playlist(p_row[col_prefix + "P Title"], p_row[col_prefix + "P Description"])
+            p_row[col_prefix + "P ID"] = res["id"]
+            changed[playlists.sheet_name] = playlists
+
+        items = [(p_row[col_prefix + "P ID"], video_id) for _, p_row, col_prefix, video_id in plan.playlist_inserts]
+        results = self.yt.add_videos_to_playlists(items)
+        for (playlists, p_row, col_prefix, video_id), res in zip(plan.playlist_inserts, results):
+            print(json.dumps(res))
+            if not p_row[col_prefix + "P Link"]:
+                p_row[col_prefix + "P Link"] = f"https://www.youtube.com/watch?v={video_id}&list={
+                    p_row[col_prefix + 'P ID']}"
+                changed[playlists.sheet_name] = playlists
+
+        for sheet in changed.values():
+            sheet.save()
+        print(f"{len(plan.sheet_updates)} sheet updates, {len(plan.playlists_to_create)} playlists created, "
+              f"{len(plan.playlist_inserts)} videos added to playlists.")
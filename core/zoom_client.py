@@ -0,0 +1,119 @@
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+from core.auth import Authentication
+from core.http_client import HttpClient, RETRY_STATUSES, retry_after_seconds
+from core.zoom_token import ZoomTokenManager
+
+ZOOM_API_URL = "https://api.zoom.us/v2"
+
+# default request rate, Zoom allows 10 to 80 requests per second depending on the API and the account plan
+DEFAULT_RATE_PER_SECOND = 10
+
+
+class RateLimiter:
+    def __init__(self, rate_per_second: int):
+        """Allows at most rate_per_second calls of wait() to return within any second, thread-safe.
+        pause() blocks all callers for some time, e.g. for the Retry-After of a 429 response.
+        """
+        self.rate = max(1, int(rate_per_second))
+        self._calls = deque(maxlen=self.rate)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            t = max(time.monotonic(), self._paused_until)
+            if len(self._calls) > 0:
+                t = max(t, self._calls[-1])
+            if len(self._calls) >= self.rate:
+                t = max(t, self._calls[0] + 1.0)
+            self._calls.append(t)
+        delay = t - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class ZoomClient:
+    def __init__(self, auth: Authentication, max_workers: int = 8, rate_per_second: int = DEFAULT_RATE_PER_SECOND,
+                 max_retries: int = 3):
+        """Zoom API client that sends requests over one pooled keep-alive session with the shared access token.
+        All requests (also of concurrent threads, see run_all) are throttled to rate_per_second, 429 responses
+        are retried after their Retry-After (up to max_retries times) and pause all other requests meanwhile.
+        """
+        self.tokens = ZoomTokenManager.for_auth(auth)
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(rate_per_second)
+        # 429 responses are handled in request(), so the pause applies to all threads
+        self.http = HttpClient(timeout=30, pool_maxsize=max(1, max_workers),
+                               retry_statuses=tuple(s for s in RETRY_STATUSES if s != 429))
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """send request to ZOOM_API_URL + path (e.g. "/meetings/123"), kwargs are passed to requests
+        """
+        response = None
+        for attempt in range(self.max_retries + 1):
+            self.limiter.wait()
+            token = self.tokens.token()
+            response = self.http.request(method, ZOOM_API_URL + path,
+                                         headers={"Authorization": f"Bearer {token}"}, **kwargs)
+            if response.status_code == 401 and attempt == 0:
+                # token was revoked or expired early
+                self.tokens.invalidate(token)
+            elif response.status_code == 429:
+                wait = retry_after_seconds(response)
+                print(f"Zoom rate limit reached ({response.headers.get('X-RateLimit-Type', 'unknown')}), "
+                      f"retrying in {wait:.1f}s")
+                self.limiter.pause(wait)
+            else:
+                return response
+        return response
+
+    def run_all(self, calls: Dict[str, Callable[[], requests.Response]]) -> Dict[str, dict]:
+        """run calls (key -> function sending one request) concurrently with max_workers threads,
+        returns key -> {"response": response or None, "error": exception or None, "latency": seconds}
+        """
+        def run(call: Callable[[], requests.Response]) -> dict:
+            start = time.perf_counter()
+            try:
+                return {"response": call(), "error": None, "latency": time.perf_counter() - start}
+            except Exception as ex:
+                return {"response": None, "error": ex, "latency": time.perf_counter() - start}
+
+        if len(calls) == 0:
+            return {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(calls)))) as pool:
+            return dict(zip(calls.keys(), pool.map(run, calls.values())))
+
+    @staticmethod
+    def print_summary(results: Dict[str, dict], expected_status=204, wall_time: float = None) -> int:
+        """print a table with status and latency per key, returns the number of calls with expected_status
+        (a status code or a tuple of them)
+        """
+        expected = (expected_status,) if isinstance(expected_status, int) else tuple(expected_status)
+        table = [["ID", "Status", "Latency (ms)", "Error"]]
+        success = 0
+        for key, r in results.items():
+            status = r["response"].status_code if r["response"] is not None else ""
+            error = str(r["error"]) if r["error"] is not None else \
+                (r["response"].text[:80] if status not in expected else "")
+            if status in expected:
+                success += 1
+            table.append([key, status, f"{r['latency'] * 1000:.0f}", error])
+        widths = [max(len(str(row[i])) for row in table) for i in range(len(table[0]))]
+        for row in table:
+            print("  ".join(str(v).ljust(w) for v, w in zip(row, widths)))
+        latencies = sorted(r["latency"] for r in results.values())
+        if len(latencies) > 0:
+            print(f"latency median {latencies[len(latencies) // 2] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms"
+                  + (f", total {wall_time:.1f} s" if wall_time is not None else ""))
+        return success
@@ -0,0 +1,69 @@
+import time
+import base64
+import threading
+
+from core.auth import Authentication
+from core.http_client import http_client
+
+ZOOM_OAUTH_URL = "https://zoom.us/oauth/token"
+
+# a new token is requested this many seconds before the current one expires
+REFRESH_MARGIN = 300
+
+
+class ZoomTokenManager:
+    _shared: dict = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, client_id: str, client_secret: str, account_id: str, refresh_margin: float = REFRESH_MARGIN):
+        """Access token of the Zoom account credentials (server-to-server OAuth) app. The token is cached with its
+        expiry and only requested again refresh_margin seconds before it lapses (or after invalidate()).
+        Thread-safe, use for_auth() to share one manager between all callers.
+        """
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.account_id = account_id
+        self.refresh_margin = refresh_margin
+        self.num_requests = 0
+        self._token: str = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_auth(cls, auth: Authentication) -> "ZoomTokenManager":
+        """shared manager for the Zoom app configured in auth
+        """
+        key = (auth.zoom["account_id"], auth.zoom["client_id"])
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(auth.zoom["client_id"], auth.zoom["client_secret"], auth.zoom["account_id"])
+            return cls._shared[key]
+
+    def token(self) -> str:
+        with self._lock:
+            if self._token is None or time.monotonic() >= self._expires_at - self.refresh_margin:
+                self._request_token()
+            return self._token
+
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token()}"}
+
+    def invalidate(self, token: str = None):
+        """drop the cached token (e.g. after a 401), if token is given only if it is still the cached one
+        """
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+
+    def _request_token(self):
+        credentials = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+        requested_at = time.monotonic()
+        response = http_client.post(ZOOM_OAUTH_URL,
+                                    params={"grant_type": "account_credentials", "account_id": self.account_id},
+                                    headers={"Authorization": f"Basic {credentials}"}, timeout=30)
+        self.num_requests += 1
+        if response.status_code != 200:
+            raise RuntimeError(f"requesting Zoom access token failed: {response.status_code} {response.text}")
+        info = response.json()
+        self._token = info["access_token"]
+        self._expires_at = requested_at + float(info.get("expires_in", 3600))
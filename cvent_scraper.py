@@ -1,5 +1,5 @@
 from core.auth import Authentication
-import requests
+from core.http_client import HttpClient
 from lxml import html
 import time
 import json
@@ -8,7 +8,8 @@ import json
 def get_attendees_json(auth : Authentication):
     return_url = "ReturnUrl=%2fSubscribers%2fEvents2%2fInvitee%2fInviteeSearch%3ffromNav%3d1%26evtstub%3d" + auth.cvent['evtstub']
     login_url = "https://app.cvent.com/subscribers/Login.aspx?" + return_url
-    s = requests.Session()
+    # own client, the login cookies must not leak into the shared http_client
+    s = HttpClient()
     r = s.get(login_url)
     tree = html.fromstring(r.content)
     viewstate = tree.xpath('//input[@id="__VIEWSTATE"]/@value')[0]
@@ -3,6 +3,7 @@ from core.auth import Authentication
 from core.templates import load_templates_dict
 from core.aws_email import send_aws_email_paper
 from core.google_sheets import GoogleSheets
+from core.table_join import TableIndex
 import argparse
 import time
 
@@ -37,12 +38,10 @@ def send_emails(auth: Authentication, template: dict, without_slot_contributors:
 def join_session_contributor_rows() -> List[dict]:
     """retrieve and join each session row with corresponding event row
     """
-    sessions = GoogleSheets()
-    sessions.load_sheet("Sessions")
-    events = GoogleSheets()
-    events.load_sheet("Events")
-    tracks = GoogleSheets()
-    tracks.load_sheet("Tracks")
+    sheets = GoogleSheets.load_many(["Sessions", "Events", "Tracks"])
+    sessions = sheets["Sessions"]
+    events = sheets["Events"]
+    tracks = sheets["Tracks"]
     tracks_dict = dict()
     for t in tracks.data:
         tracks_dict[t["Track"]] = t
@@ -69,34 +68,21 @@ def join_slot_contributors() -> List[dict]:
     """retrieve and join each session row with corresponding event row, but also consolidate
     all presenters/speakers based on the associated slot items into the 'Slot Contributors Emails' column
     """
+    # fetch all sheets at once, join_session_contributor_rows is then served from the sheet cache
+    sheets = GoogleSheets.load_many(["Sessions", "Events", "Tracks", "ItemsVIS-A", "ItemsEXT"])
     sessions = join_session_contributor_rows()
     sessions_dict = {}
     for s in sessions:
         sessions_dict[s["Session ID"]] = s
-    items1_sheet = GoogleSheets()
-    items1_sheet.load_sheet("ItemsVIS-A")
-    items2_sheet = GoogleSheets()
-    items2_sheet.load_sheet("ItemsEXT")
-    # items3_sheet = GoogleSheets()
-    # items3_sheet.load_sheet("ItemsVISSpecial")
-
-    items = []
-    items.extend(items1_sheet.data)
-    items.extend(items2_sheet.data)
-    # items.extend(items3_sheet.data)
-
-    items_by_session: dict[str, List[dict]] = {}
-
-    for item in items:
-        s_id = item["Session ID"]
+    items1_sheet = sheets["ItemsVIS-A"]
+    items2_sheet = sheets["ItemsEXT"]
+    # items3_sheet = sheets["ItemsVISSpecial"]
+
+    items_by_session = TableIndex([items1_sheet, items2_sheet], "Session ID")
+
+    for s_id in items_by_session.keys():
         if type(s_id) != str or len(s_id.strip()) == 0 or s_id not in sessions_dict:
             print(f"WARNING: could not match session id {s_id}")
-            continue
-
-        if s_id in items_by_session:
-            items_by_session[s_id].append(item)
-        else:
-            items_by_session[s_id] = [item]
 
     for s in sessions:
         s_id = s["Session ID"]
@@ -107,7 +93,7 @@ def join_slot_contributors() -> List[dict]:
             continue
         emails_set = set()
         emails = []
-        items = items_by_session[s_id]
+        items = items_by_session.get_all(s_id)
         for item in items:
             cont_emails: str = item["Slot Contributors Emails"]
             if type(cont_emails) != str or len(cont_emails) == 0:
@@ -14,12 +14,11 @@ def send_emails_to_authors(auth: Authentication, event_prefix: str, email_templa
     event_prefix: event prefix to send to, can only do one at a time
 
     """
-    sheet_db_papers = GoogleSheets()
-    sheet_db_papers.load_sheet("PapersDB")
+    sheets = GoogleSheets.load_many(["PapersDB", "Events"])
+    sheet_db_papers = sheets["PapersDB"]
     templates = load_templates_dict()
 
-    sheet_events = GoogleSheets()
-    sheet_events.load_sheet("Events")
+    sheet_events = sheets["Events"]
     events_prefix_dict = dict()
 
     for e in sheet_events.data:
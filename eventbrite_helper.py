@@ -10,20 +10,18 @@ import time
 from urllib.parse import urlsplit
 from datetime import datetime
 from email.mime.image import MIMEImage
-import urllib.request
 
 import core.auth as auth
+from core.http_client import http_client
 
 alphabet = string.ascii_letters + string.digits
 
 
 def call_get_attendees(session : auth.Authentication, page : int = 1):
     url = f"https://www.eventbriteapi.com/v3/events/{session.eventbrite_event_id}/attendees/?token={session.eventbrite_token}&page={page}"
-    req=urllib.request.Request(url,
-         headers={"Content-Type":"application/json"}
-    )
-    with urllib.request.urlopen(req) as u:
-        return json.loads(u.read().decode('utf-8'))
+    resp = http_client.get(url, headers={"Content-Type":"application/json"})
+    resp.raise_for_status()
+    return resp.json()
 
 def get_attendees(session : auth.Authentication):
     
@@ -40,10 +38,11 @@ def get_attendees(session : auth.Authentication):
     # It looks like we can also directly request a page by passing page: <number>
 
     res = []
-    # Page indices start at 1 inclusive
+    # Page indices start at 1 inclusive, the first page was already fetched above
     for i in range(1, last_page + 1):
         #print(f"Fetching eventbrite registrations page {i} of {last_page}")        
-        attendees = call_get_attendees(session, i)
+        if i > 1:
+            attendees = call_get_attendees(session, i)
         if not "attendees" in attendees:
             print("Error fetching eventbrite response?")
             print(attendees)
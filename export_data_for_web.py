@@ -6,10 +6,15 @@ from threading import local
 import ics
 # from PIL import Image
 from datetime import timezone, datetime, timedelta
+from typing import Any, Callable, List
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 from core.auth import Authentication
 from core.google_sheets import GoogleSheets
+from core.table_join import one_to_many
+from core.export_manifest import ExportManifest
+from core.ics_fragments import CalendarFragments
 
 # FNOs must be formated as plain text in the Google Sheets, or else you're get a UID missing key error
 
@@ -67,9 +72,10 @@ def make_description_for_session(session_title: str, session_id: str, session_ro
     return text
 
 
-def make_calendar_for_session(session_title: str, session_id: str, session_room: str, start_time: datetime, end_time: datetime) -> ics.Calendar:
-    calendar = ics.Calendar()
+def make_event_for_session(session_title: str, session_id: str, session_room: str, start_time: datetime, end_time: datetime) -> ics.Event:
     event = ics.Event()
+    # stable uid, so that calendars assembled in different runs refer to the same event
+    event.uid = f"{session_id}@ieeevis.org"
     event.begin = start_time
     event.end = end_time
     event.name = session_title + " [VIS 2024]"
@@ -85,15 +91,104 @@ def make_calendar_for_session(session_title: str, session_id: str, session_room:
 
     event.description += make_description_for_session(
         session_title, session_id, session_room, start_time, end_time)
-    calendar.events.add(event)
-    return calendar
+    return event
 
 
-def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool, export_img: bool, export_pdf: bool):
+def export_calendars(manifest: ExportManifest, ics_sessions: List[tuple], max_workers: int = 8):
+    """write the session, event and full conference .ics files whose sessions changed since the last export.
+    Each session event is built and serialized once, calendars are assembled from the cached VEVENT fragments
+    and written on a thread pool.
+    ics_sessions: list of (event prefix, arguments of make_event_for_session, digest of these arguments)
+    """
+    # (path, digest, session ids) of all calendar files
+    files = []
+    event_groups = {}
+    for event_prefix, cal_args, digest in ics_sessions:
+        if event_prefix not in event_groups:
+            event_groups[event_prefix] = []
+        event_groups[event_prefix].append((cal_args[1], digest))
+        # the session ics file
+        files.append((os.path.join("ics", cal_args[1] + ".ics"), digest, [cal_args[1]]))
+
+    all_sessions = [(cal_args[1], digest) for _, cal_args, digest in ics_sessions]
+    files.append((os.path.join("ics", "VIS2024.ics"), ExportManifest.digest([d for _, d in all_sessions]),
+                  [sid for sid, _ in all_sessions]))
+    for k, group in event_groups.items():
+        files.append((os.path.join("ics", k + ".ics"), ExportManifest.digest([d for _, d in group]),
+                      [sid for sid, _ in group]))
+
+    to_write = [f for f in files if not manifest.is_current(f[0], f[1])]
+    manifest.num_skipped += len(files) - len(to_write)
+
+    fragments = CalendarFragments()
+    cal_args_by_session = {cal_args[1]: cal_args for _, cal_args, _ in ics_sessions}
+    for _, _, session_ids in to_write:
+        for sid in session_ids:
+            if sid not in fragments:
+                fragments.add(sid, make_event_for_session(*cal_args_by_session[sid]))
+
+    def write_calendar(f: tuple):
+        path, digest, session_ids = f
+        manifest.write(path, digest, lambda: fragments.calendar(dict.fromkeys(session_ids)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(write_calendar, to_write))
+
+
+def export_shards(manifest: ExportManifest, all_events: dict, all_posters: dict, session_digests: dict,
+                  dumps: Callable[[Any], str], fmt: str):
+    """write one json shard per event (events/<event prefix>.json, sessions without their slots), per session
+    (sessions/<session id>.json, including slots and abstracts) and per poster event (posters/<event prefix>.json),
+    plus index.json that maps events to their session ids and paper/poster uids to the shard containing them,
+    so that the web client only has to load what a page needs.
+    """
+    for d in ["events", "sessions", "posters"]:
+        os.makedirs(os.path.join(manifest.output_dir, d), exist_ok=True)
+
+    index = {"events": {}, "papers": {}, "posters": {}}
+    for prefix, e_data in all_events.items():
+        event_meta = {k: v for k, v in e_data.items() if k != "sessions"}
+        session_summaries = []
+        for s_data in e_data["sessions"]:
+            sid = s_data["session_id"]
+            manifest.write(os.path.join("sessions", sid + ".json"), ExportManifest.digest(fmt, session_digests[sid]),
+                           lambda: dumps(s_data), compressible=True)
+            session_summaries.append({k: v for k, v in s_data.items() if k != "time_slots"})
+            for slot in s_data["time_slots"]:
+                index["papers"][slot["uid"]] = sid
+
+        e_digest = ExportManifest.digest(fmt, event_meta, [session_digests[ss["session_id"]] for ss in session_summaries])
+        manifest.write(os.path.join("events", prefix + ".json"), e_digest,
+                       lambda: dumps({**event_meta, "sessions": session_summaries}), compressible=True)
+        index["events"][prefix] = {
+            "event": e_data["event"],
+            "event_type": e_data["event_type"],
+            "sessions": [ss["session_id"] for ss in session_summaries]
+        }
+
+    posters_by_event = {}
+    for uid, p_data in all_posters.items():
+        posters_by_event.setdefault(p_data["event_prefix"], {})[uid] = p_data
+        index["posters"][uid] = p_data["event_prefix"]
+    for prefix, posters in posters_by_event.items():
+        manifest.write(os.path.join("posters", prefix + ".json"), ExportManifest.digest(fmt, posters),
+                       lambda: dumps(posters), compressible=True)
+
+    # the index is loaded by every page, so it is always written compact regardless of fmt
+    manifest.write("index.json", ExportManifest.digest("compact", index),
+                   lambda: json.dumps(index, separators=(",", ":")), compressible=True)
+
+
+def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool, export_img: bool, export_pdf: bool,
+                        incremental: bool = False, sharded: bool = False, compact: bool = False, precompress: List[str] = None):
     """create data for virtual website.
     authentication: Authentication instance in which aws ses client, & google sheets was authenticated
     conference_db: Google Sheet identifier for Conference Database Sheet. TODO add more info about that sheet
     output_dir: output directory for data
+    incremental: only rewrite files whose source rows changed since the last export (tracked in export_manifest.json)
+    sharded: additionally write per-event and per-session shards and a compact index.json (see export_shards)
+    compact: write json without indentation and whitespace
+    precompress: also write pre-compressed siblings of the json files, list of "gzip" and/or "br"
 
     """
     # Check for output path
@@ -102,47 +197,29 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
 
     if export_ics and not os.path.exists(os.path.join(output_dir, "ics")):
         os.makedirs(os.path.join(output_dir, "ics"), exist_ok=True)
-    full_calendar = ics.Calendar()
-    event_calendars = {}
+    manifest = ExportManifest(output_dir, force=not incremental, precompress=precompress)
+    ics_sessions = []
+    session_digests = {}
 
     all_posters = {}
     all_papers = {}
     all_events = {}
 
-    sheet_events = GoogleSheets()
-    sheet_events.load_sheet("Events")
-
-    sheet_sessions = GoogleSheets()
-    sheet_sessions.load_sheet("Sessions")
-
-    sheet_papers = GoogleSheets()
-    sheet_papers.load_sheet("ItemsVIS-A")
-
-    sheet_ext = GoogleSheets()
-    sheet_ext.load_sheet("ItemsEXT")
-
-    sheet_ff_playlists = GoogleSheets()
-    sheet_ff_playlists.load_sheet("FFPlaylists")
-
-    sheet_ff_videos = GoogleSheets()
-    sheet_ff_videos.load_sheet("FFVideos")
-
-    # sheet_pre_videos = GoogleSheets()
-    # sheet_pre_videos.load_sheet("TalkVideos")
-
-    sheet_bunny = GoogleSheets()
-    sheet_bunny.load_sheet("BunnyContent")
-
-    sheet_posters = GoogleSheets()
-    sheet_posters.load_sheet("Posters")
-
-    # All paper types, full, short, workshop
-    sheet_db_papers = GoogleSheets()
-    sheet_db_papers.load_sheet("PapersDB")
-
-    # All tracks/rooms of the conference, create dict based on "Track"
-    sheet_tracks = GoogleSheets()
-    sheet_tracks.load_sheet("Tracks")
+    # All paper types, full, short, workshop are in PapersDB,
+    # all tracks/rooms of the conference in Tracks, create dict based on "Track"
+    sheets = GoogleSheets.load_many(["Events", "Sessions", "ItemsVIS-A", "ItemsEXT", "FFPlaylists", "FFVideos",
+                                     "BunnyContent", "Posters", "PapersDB", "Tracks"])
+    sheet_events = sheets["Events"]
+    sheet_sessions = sheets["Sessions"]
+    sheet_papers = sheets["ItemsVIS-A"]
+    sheet_ext = sheets["ItemsEXT"]
+    sheet_ff_playlists = sheets["FFPlaylists"]
+    sheet_ff_videos = sheets["FFVideos"]
+    # sheet_pre_videos = sheets["TalkVideos"]
+    sheet_bunny = sheets["BunnyContent"]
+    sheet_posters = sheets["Posters"]
+    sheet_db_papers = sheets["PapersDB"]
+    sheet_tracks = sheets["Tracks"]
 
     db_papers_dict = dict()
     for db_p in sheet_db_papers.data:
@@ -186,8 +263,8 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
             print('Error, duplicate event_prefix')
             print(e_data)
 
-    # Create session data
-    for s in sheet_sessions.data:
+    # Create session data, each session joined with its slot items
+    for s, session_items in one_to_many(sheet_sessions, "Session ID", [sheet_papers, sheet_ext]):
         sid = s["Session ID"]
         t = tracks_dict[s["Track"]] if s["Track"] in tracks_dict else None
         s_ff = ff_videos_dict[sid] if sid in ff_videos_dict else None
@@ -222,33 +299,22 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
         if export_ics:
             # TODO check sessions
             if s["DateTime Start"] and s["DateTime End"]:
+                cal_args = (s["Session Title"], s["Session ID"], t["Room Name"] if t else "",
+                            parse_time(s["DateTime Start"]), parse_time(s["DateTime End"]))
+                ics_sessions.append(
+                    (s["Event Prefix"], cal_args, ExportManifest.digest(*cal_args)))
 
-                calendar = make_calendar_for_session(s["Session Title"], s["Session ID"], t["Room Name"] if t else "", parse_time(
-                    s["DateTime Start"]), parse_time(s["DateTime End"]))
-
-                full_calendar.events |= calendar.events
-
-                if s["Event Prefix"] not in event_calendars:
-                    event_calendars[s["Event Prefix"]] = ics.Calendar()
-                event_calendars[s["Event Prefix"]].events |= calendar.events
-
-                # Create the session ics file
-                with open(os.path.join(output_dir, "ics", s["Session ID"] + ".ics"), "w", encoding="utf8") as f:
-                    f.write(calendar.serialize())
+        # all source rows this session's output depends on
+        session_inputs = [s, t, s_ff]
 
-        filtered_papers = list(
-            filter(lambda p: p["Session ID"] == s_data["session_id"], sheet_papers.data))
-
-        filtered_ext = list(
-            filter(lambda e: e["Session ID"] == s_data["session_id"], sheet_ext.data))
-
-        for p in filtered_papers + filtered_ext:
+        for p in session_items:
             # Find the corresponding entry by Paper UID in PapersDB
             uid = p["Paper UID"]
             p_db = db_papers_dict[uid] if uid in db_papers_dict else None
             ff = ff_videos_dict[uid] if uid in ff_videos_dict else None
             # pv = pre_videos_dict[uid] if uid in pre_videos_dict else None
             bc = bunny_dict[uid] if uid in bunny_dict else None
+            session_inputs.append([p, p_db, ff, bc])
 
             p_event_prefix = p_db["Event Prefix"] if p_db else ""
 
@@ -344,6 +410,8 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
                 print(
                     f"MISSING: data for paper UID = {uid}. Items* {('Valid' if p else 'Missing')}. PapersDB is {('Valid' if p_db else 'Missing')}.")
 
+        session_digests[sid] = ExportManifest.digest(session_inputs)
+
         if s_data["event_prefix"] in all_events:
             all_events[s_data["event_prefix"]]["sessions"].append(s_data)
         else:
@@ -398,21 +466,30 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
             all_posters[p_data["uid"]] = p_data
 
     if export_ics:
-        with open(os.path.join(output_dir, "ics", "VIS2024.ics"), "w", encoding="utf8") as f:
-            f.write(full_calendar.serialize())
+        export_calendars(manifest, ics_sessions)
+
+    fmt = "compact" if compact else "indent"
 
-        for k, v in event_calendars.items():
-            with open(os.path.join(output_dir, "ics", k + ".ics"), "w", encoding="utf8") as f:
-                f.write(v.serialize())
+    def dumps(obj) -> str:
+        if compact:
+            return json.dumps(obj, separators=(",", ":"))
+        return json.dumps(obj, indent=4)
 
-    with open(os.path.join(output_dir, "session_list.json"), "w", encoding="utf8") as f:
-        json.dump(all_events, f, indent=4)
+    all_session_digests = list(session_digests.values())
+    manifest.write("session_list.json", ExportManifest.digest(fmt, sheet_events.data, all_session_digests),
+                   lambda: dumps(all_events), compressible=True)
 
-    with open(os.path.join(output_dir, "paper_list.json"), "w", encoding="utf8") as f:
-        json.dump(all_papers, f, indent=4)
+    manifest.write("paper_list.json", ExportManifest.digest(fmt, all_session_digests),
+                   lambda: dumps(all_papers), compressible=True)
 
-    with open(os.path.join(output_dir, "poster_list.json"), "w", encoding="utf8") as f:
-        json.dump(all_posters, f, indent=4)
+    manifest.write("poster_list.json", ExportManifest.digest(fmt, sheet_posters.data),
+                   lambda: dumps(all_posters), compressible=True)
+
+    if sharded:
+        export_shards(manifest, all_events, all_posters, session_digests, dumps, fmt)
+
+    manifest.save()
+    print(f"{manifest.num_written} files written, {manifest.num_skipped} unchanged files skipped.")
 
 
 if __name__ == '__main__':
@@ -427,6 +504,16 @@ if __name__ == '__main__':
     parser.add_argument('--pdf', help='include PDF files in data output directory',
                         action='store_true', default=False)
 
+    parser.add_argument('--incremental', help='only rewrite json and ics files whose source rows changed since the last export',
+                        action='store_true', default=False)
+
+    parser.add_argument('--sharded', help='also write per-event and per-session json shards and a compact index.json',
+                        action='store_true', default=False)
+    parser.add_argument('--compact', help='write json files without indentation',
+                        action='store_true', default=False)
+    parser.add_argument('--precompress', help='write pre-compressed siblings of the json files',
+                        nargs='*', choices=["gzip", "br"], default=None)
+
     parser.add_argument(
         '--output_dir', help='output directory for all the web data', default="./")
     args = parser.parse_args()
@@ -436,4 +523,6 @@ if __name__ == '__main__':
         # create output data for web
         create_data_for_web(
             auth=auth, output_dir=args.output_dir,
-            export_ics=args.ics, export_img=args.img, export_pdf=args.pdf)
+            export_ics=args.ics, export_img=args.img, export_pdf=args.pdf,
+            incremental=args.incremental, sharded=args.sharded, compact=args.compact,
+            precompress=args.precompress)
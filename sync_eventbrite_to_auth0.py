@@ -9,7 +9,6 @@ import string
 import secrets
 import time
 import http.client
-import requests
 
 from urllib.parse import urlsplit
 from datetime import datetime
@@ -17,6 +16,7 @@ from email.mime.image import MIMEImage
 
 import core.auth as auth
 import core.schedule as schedule
+from core.http_client import http_client
 
 alphabet = string.ascii_letters + string.digits
 
@@ -59,8 +59,8 @@ def send_to_auth0(session, filename, access_token, connection_id):
     }
 
     domain = "https://" + urlsplit(session.auth0["audience"]).netloc + "/api/v2/jobs/users-imports"
-    response = requests.post(domain, data=payload, files=files,
-                             headers=headers)
+    response = http_client.post(domain, data=payload, files=files,
+                                headers=headers)
     print(response.content)
 
 def send_register_email(email, session, logo_attachment, name, password):
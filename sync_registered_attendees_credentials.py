@@ -7,6 +7,7 @@ import asn_registration_helper
 import cvent_scraper
 
 from enum import Enum
+from typing import Dict
 
 from auth0_helper import create_user, retrieve_users_via_export
 from core.auth import Authentication
@@ -43,7 +44,21 @@ def get_auth0_users(auth: Authentication) -> list:
     return auth0_users
 
 
-def sync_attendees(auth: Authentication, vendor: Vendor):
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def build_auth0_index(auth0_users: list) -> Dict[str, dict]:
+    """index of the auth0 users by normalized email
+    """
+    return {normalize_email(u['email']): u for u in auth0_users if u.get('email')}
+
+
+def sync_attendees(auth: Authentication, vendor: Vendor, auth0_index: Dict[str, dict] = None) -> Dict[str, dict]:
+    """create auth0 users for the valid attendees of vendor that are not in auth0 yet.
+    auth0_index (see build_auth0_index) is exported from auth0 if not given, it is updated with the created users
+    and returned, so it can be passed to the next sync
+    """
     attendees = []
     if vendor == Vendor.ASN:
         attendees = get_asn_attendees(auth)
@@ -53,9 +68,11 @@ def sync_attendees(auth: Authentication, vendor: Vendor):
         attendees = get_eventbrite_attendees(auth)
     else:
         print(f"Unknown vendor of type = {vendor}")
-        return
+        return auth0_index
 
-    auth0_users = get_auth0_users(auth)
+    if auth0_index is None:
+        auth0_index = build_auth0_index(get_auth0_users(auth))
+        print(f"Indexed {len(auth0_index)} auth0 users")
 
     print(f"Found {len(attendees)} attendees from {vendor}")
 
@@ -68,6 +85,7 @@ def sync_attendees(auth: Authentication, vendor: Vendor):
     #     print(au)
 
     auth_count = 0
+    access_token = None
 
     for a in attendees:
         name = None
@@ -88,26 +106,40 @@ def sync_attendees(auth: Authentication, vendor: Vendor):
             isValid = a['cancelled'] == False
         else:
             print(f"Unknown vendor of type = {vendor}")
-            return
+            return auth0_index
 
         if name and email and isValid:
             # Check if user is already in auth0
-            au = next((a for a in auth0_users if a['email'].strip(
-            ).lower() == email.strip().lower()), None)
-            if au == None:
-                create_user(auth, auth.get_auth0_token(), email,
-                            name, {'invite_email_sent': False})
-                auth_count += 1
+            key = normalize_email(email)
+            if key not in auth0_index:
+                if access_token is None:
+                    access_token = auth.get_auth0_token()
+                resp = create_user(auth, access_token, email,
+                                   name, {'invite_email_sent': False})
+                if resp.status_code == 201:
+                    auth0_index[key] = resp.json()
+                    auth_count += 1
+                elif resp.status_code == 409:
+                    # created outside of this sync since the index was built
+                    auth0_index[key] = {'email': email}
     print(f"{auth_count} attendees authorized in Auth0")
+    return auth0_index
 
 
-def monitor_sync_attendees(auth: Authentication, vendor: Vendor):
-    """
+def monitor_sync_attendees(auth: Authentication, vendor: Vendor, index_refresh_hours: float = 24):
+    """sync attendees every 20 minutes, the auth0 user index is kept between the syncs
+    and only exported again from auth0 every index_refresh_hours (e.g. to notice deleted users)
     """
     print("monitoring started...")
+    auth0_index = None
+    index_time = 0
     while True:
+        if time.monotonic() - index_time > index_refresh_hours * 3600:
+            auth0_index = None
         try:
-            sync_attendees(auth, vendor)
+            if auth0_index is None:
+                index_time = time.monotonic()
+            auth0_index = sync_attendees(auth, vendor, auth0_index)
         except Exception as e:
             print(f"\r\nERROR OCCURRED: {e}\r\n")
         time.sleep(20*60)
@@ -123,12 +155,14 @@ if __name__ == '__main__':
 
     parser.add_argument('--vendor', help='which vendor to pull registered attendees from',
                         type=Vendor, choices=list(Vendor), default=Vendor.ASN)
+    parser.add_argument('--index_refresh_hours', help='with --monitoring, export the auth0 users again after this many hours',
+                        type=float, default=24)
     args = parser.parse_args()
 
     auth = Authentication(auth0_api=True)
     args = parser.parse_args()
 
     if args.monitoring:
-        monitor_sync_attendees(auth, args.vendor)
+        monitor_sync_attendees(auth, args.vendor, args.index_refresh_hours)
     elif args.sync:
         sync_attendees(auth, args.vendor)
@@ -6,26 +6,50 @@ import time
 import glob
 import argparse
 import json
-from typing import Any, Dict
+import functools
+from typing import Any, Callable, Dict, List
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from core.auth import Authentication
-from core.pmu_helper import PmuHelper
+from core.pmu_helper import PmuHelper, PmuPrefetcher
 
-from core.yt_helper import YouTubeHelper
-from core.google_sheets import GoogleSheets
+from core.yt_helper import YouTubeHelper, QuotaLedger, QuotaScheduler, ThumbnailManifest, DEFAULT_DAILY_QUOTA
+from core.yt_reconcile import Reconciler
+from core.yt_broadcasts import BroadcastController
+from core.google_sheets import GoogleSheets, SheetWriter
+from core.table_join import TableIndex
+from core.conference_db import ConferenceDatabase
+
+
+def select_broadcasts(args: argparse.Namespace, broadcasts: GoogleSheets = None) -> List[dict]:
+    """broadcasts filtered by dow = Day of Week, selected from the local conference database if --db is specified.
+    Without broadcasts sheet (read-only commands) the database rows are returned, otherwise the rows of the sheet
+    whose Video ID was selected, so that they can be saved back
+    """
+    if args.db:
+        selected = ConferenceDatabase(args.db).select("Broadcasts", {"Day of Week": args.dow})
+        print(f"{len(selected)} broadcasts selected from {args.db}")
+        if broadcasts is None:
+            return selected
+        video_ids = set(b["Video ID"] for b in selected if b["Video ID"])
+        return list(filter(lambda d: d["Video ID"] in video_ids, broadcasts.data))
+
+    if broadcasts is None:
+        broadcasts = GoogleSheets()
+        broadcasts.load_sheet("Broadcasts")
+        print(f"{len(broadcasts.data)} broadcasts loaded")
+    data = broadcasts.data
+    if args.dow and len(args.dow.strip()) > 0:
+        data = list(filter(lambda d: d["Day of Week"] == args.dow, data))
+    return data
 
 
 def disable_autostart_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
     """disable autostart of broadcasts from sheet, possibly filtered by dow = Day of Week
     """
-    broadcasts = GoogleSheets()
-    broadcasts.load_sheet("Broadcasts")
-    data = broadcasts.data
-    print(f"{len(data)} broadcasts loaded")
+    data = select_broadcasts(args)
     data = list(filter(lambda d: d["Video ID"]
                 and len(d["Video ID"].strip()) > 0, data))
-    if args.dow:
-        data = list(filter(lambda d: d["Day of Week"] == args.dow, data))
 
     num_to_schedule = len(data)
     print(f"{num_to_schedule} broadcasts will be updated")
@@ -41,55 +65,50 @@ def unbind_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
     """unbind broadcasts from sheet, possibly filtered by dow = Day of Week
     """
     broadcasts = GoogleSheets()
-    broadcasts.load_sheet("Broadcasts")
+    broadcasts.load_sheet("Broadcasts", replay_journal=True)
     data = broadcasts.data
     print(f"{len(data)} broadcasts loaded")
     data = list(filter(lambda d: d["Video ID"] and len(
-        d["Video ID"].strip()) > 0 and d["Stream Bound"] == "y", data))
-    if args.dow:
-        data = list(filter(lambda d: d["Day of Week"] == args.dow, data))
+        d["Video ID"].strip()) > 0 and d["Stream Bound"] == "y", select_broadcasts(args, broadcasts)))
 
     num_to_schedule = len(data)
     print(f"{num_to_schedule} broadcasts will be unbound")
+    controller = BroadcastController(yt, args.broadcast_workers)
+    results = controller.unbind(data)
     for broadcast in data:
-        v_id: str = broadcast["Video ID"]
-        title: str = broadcast["Title"]
-        print(f"unbinding for {v_id} - {title}")
-        res = yt.bind_stream_to_broadcast(None, v_id)
-        print(json.dumps(res))
-        broadcast["Stream Bound"] = ""
-        broadcasts.save()
+        if not isinstance(results.get(broadcast["Video ID"]), Exception):
+            broadcast["Stream Bound"] = ""
+    broadcasts.save()
+    controller.print_states()
 
 
 def stop_and_unbind_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
     """stop and unbind broadcasts from sheet, possibly filtered by dow = Day of Week
     """
     broadcasts = GoogleSheets()
-    broadcasts.load_sheet("Broadcasts")
+    broadcasts.load_sheet("Broadcasts", replay_journal=True)
     data = broadcasts.data
     print(f"{len(data)} broadcasts loaded")
     # data = list(filter(lambda d: d["Video ID"] and len(
     #     d["Video ID"].strip()) > 0 and d["Stream Bound"] == "y", data))
-    if args.dow:
-        data = list(filter(lambda d: d["Day of Week"] == args.dow, data))
+    data = select_broadcasts(args, broadcasts)
 
     num_to_schedule = len(data)
     print(f"{num_to_schedule} broadcasts will be stopped and unbound")
+    controller = BroadcastController(yt, args.broadcast_workers)
+    results = controller.stop(data)
     for broadcast in data:
-        v_id: str = broadcast["Video ID"]
-        title: str = broadcast["Title"]
-        print(f"stopping {v_id} - {title}")
-        res = yt.stop_and_unbind_broadcast(v_id)
-        print(json.dumps(res))
-        broadcast["Stream Bound"] = ""
-        broadcasts.save()
+        if not isinstance(results.get(broadcast["Video ID"]), Exception):
+            broadcast["Stream Bound"] = ""
+    broadcasts.save()
+    controller.print_states()
 
 
 def bind_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
     """bind broadcasts in sheet, possibly filtered by dow = Day of Week
     """
     broadcasts = GoogleSheets()
-    broadcasts.load_sheet("Broadcasts")
+    broadcasts.load_sheet("Broadcasts", replay_journal=True)
     data = broadcasts.data
     print(f"{len(data)} broadcasts loaded")
     # data = list(filter(lambda d: d["Video ID"] and len(
@@ -97,49 +116,40 @@ def bind_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
     if not args.dow or len(args.dow.strip()) == 0:
         print("--dow needs to be specified")
         return
-    data = list(filter(lambda d: d["Day of Week"] == args.dow, data))
+    data = select_broadcasts(args, broadcasts)
 
     num_to_schedule = len(data)
     print(f"{num_to_schedule} broadcasts will be bind")
+    controller = BroadcastController(yt, args.broadcast_workers)
+    results = controller.bind(data)
     for broadcast in data:
-        l_id: str = broadcast["Livestream ID"]
-        title: str = broadcast["Title"]
-        stream_key_id = broadcast["Stream Key ID"]
-        broadcast_id = broadcast["Video ID"]
-        print(
-            f"\r\nbind stream {stream_key_id} to broadcast {l_id} with id {broadcast_id} - {title}...")
-        res = yt.bind_stream_to_broadcast(stream_key_id, broadcast_id)
-        print(json.dumps(res))
-        broadcast["Stream Bound"] = "y"
-        broadcasts.save()
+        if broadcast["Video ID"] in results and not isinstance(results[broadcast["Video ID"]], Exception):
+            broadcast["Stream Bound"] = "y"
+    broadcasts.save()
+    controller.print_states()
 
 
 def start_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
     """start broadcasts in sheet, possibly filtered by dow = Day of Week
     """
-    broadcasts = GoogleSheets()
-    broadcasts.load_sheet("Broadcasts")
-    data = broadcasts.data
-    print(f"{len(data)} broadcasts loaded")
+    data = select_broadcasts(args)
     # data = list(filter(lambda d: d["Video ID"] and len(
     #     d["Video ID"].strip()) > 0 and d["Stream Bound"] == "y", data))
-    if args.dow and len(args.dow.strip()) > 0:
-        data = list(filter(lambda d: d["Day of Week"] == args.dow, data))
 
     num_to_schedule = len(data)
     print(f"{num_to_schedule} broadcasts will be started")
-    for broadcast in data:
-        try:
-            l_id: str = broadcast["Livestream ID"]
-            title: str = broadcast["Title"]
-            stream_key_id = broadcast["Stream Key ID"]
-            broadcast_id = broadcast["Video ID"]
-            print(
-                f"\r\nstart broadcast {l_id} with id {broadcast_id} - {title}...")
-            res = yt.make_broadcast_live(broadcast_id, stream_key_id)
-            print(json.dumps(res))
-        except Exception as e:
-            print(e)
+    controller = BroadcastController(yt, args.broadcast_workers)
+    controller.start(data)
+    controller.print_states()
+
+
+def broadcasts_status(yt: YouTubeHelper, args: argparse.Namespace):
+    """print the state of broadcasts in sheet and their streams, possibly filtered by dow = Day of Week
+    """
+    data = select_broadcasts(args)
+    controller = BroadcastController(yt, args.broadcast_workers)
+    controller.poll(data)
+    controller.print_states()
 
 
 def set_recordings_thumbs(yt: YouTubeHelper, args: argparse.Namespace):
@@ -149,27 +159,42 @@ def set_recordings_thumbs(yt: YouTubeHelper, args: argparse.Namespace):
         print("--path has to be provided")
         return
     recordings = GoogleSheets()
-    recordings.load_sheet("Recordings")
+    recordings.load_sheet("Recordings", replay_journal=True)
 
+    to_set = []
     for recording in recordings.data:
-        if recording["Thumbnail Uploaded"] == "y":
-            continue
         sid: str = recording["Source ID"]
-        print(f"\r\nSetting thumbnail for {sid}...\r\n")
         link: str = recording["YouTube Link"]
+        path = os.path.join(args.path, sid + ".png")
+        if recording["Thumbnail Uploaded"] == "y" and (not link or not os.path.isfile(path)):
+            continue
         if not link or not link.startswith("https"):
             print(f"missing or invalid youtube link for {sid}")
             continue
-
-        path = os.path.join(args.path, sid + ".png")
         if not os.path.isfile(path):
             print(f"MISSING thumbnail for id {sid}")
             continue
-        res = yt.set_thumbnail(link[32:], path)
+
+        # only upload thumbnails whose image changed since it was last set
+        video_id = link[32:]
+        key = ThumbnailManifest.file_key(path)
+        if recording["Thumbnail Uploaded"] == "y" and yt.thumbnails.get(video_id) is None:
+            # uploaded before the manifest existed
+            yt.thumbnails.set(video_id, key)
+        if yt.thumbnails.is_current(video_id, key):
+            continue
+        to_set.append((recording, video_id, path))
+
+    print(f"\r\nSetting {len(to_set)} thumbnails...\r\n")
+    results = yt.set_thumbnails([(video_id, path) for _, video_id, path in to_set], args.upload_workers)
+    for (recording, _, _), res in zip(to_set, results):
+        if isinstance(res, Exception):
+            print(f"setting thumbnail for {recording['Source ID']} failed: {res}")
+            continue
         print(json.dumps(res))
         recording["Thumbnail Uploaded"] = "y"
         try:
-            recordings.save()
+            recordings.save_row(recording)
         except BaseException as ex:
             print("\r\nsaving failed: ")
             print(ex)
@@ -177,12 +202,7 @@ def set_recordings_thumbs(yt: YouTubeHelper, args: argparse.Namespace):
 def get_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
     """update broadcasts from sheet, possibly filtered by dow = Day of Week
     """
-    broadcasts = GoogleSheets()
-    broadcasts.load_sheet("Broadcasts")
-    data = broadcasts.data
-    print(f"{len(data)} broadcasts loaded")
-    if args.dow:
-        data = list(filter(lambda d: d["Day of Week"] == args.dow, data))
+    data = select_broadcasts(args)
 
     num_to_update = len(data)
 
@@ -194,20 +214,19 @@ def get_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
 def update_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
     """update broadcasts from sheet, possibly filtered by dow = Day of Week
     """
-    broadcasts = GoogleSheets()
-    broadcasts.load_sheet("Broadcasts")
-    data = broadcasts.data
-    print(f"{len(data)} broadcasts loaded")
-    if args.dow:
-        data = list(filter(lambda d: d["Day of Week"] == args.dow, data))
+    data = select_broadcasts(args)
 
     num_to_update = len(data)
 
     print(f"{num_to_update} broadcasts will be scheduled")
+    jobs = {}
     for broadcast in data:
         l_id: str = broadcast["Livestream ID"]
         title: str = broadcast["Title"]
         broadcast_id: str = broadcast["Video ID"]
+        if not broadcast_id:
+            print(f"ERROR: broadcast {l_id} - {title} has not been scheduled yet")
+            continue
         thumbnail_path: str = broadcast["Thumbnail File Name"]
         use_thumbnail: bool = False
         if thumbnail_path and len(thumbnail_path) > 0:
@@ -234,22 +253,31 @@ def update_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
             continue
         end_dt = datetime.fromisoformat(end_dt.replace('Z', '+00:00'))
 
-        res = yt.update_broadcast(broadcast_id, start_dt, end_dt, enable_captions=True,
-                                  thumbnail_path=thumbnail_path if use_thumbnail else None,
-                                  enable_auto_start=False)
-        print(json.dumps(res))
-        num_to_update += 1
+        if use_thumbnail and yt.thumbnails.is_current(broadcast_id, ThumbnailManifest.file_key(thumbnail_path)):
+            print(f"thumbnail {thumbnail_path} is unchanged")
+            use_thumbnail = False
+
+        jobs[broadcast_id] = functools.partial(yt.update_broadcast, broadcast_id, start_dt, end_dt, enable_captions=True,
+                                               thumbnail_path=thumbnail_path if use_thumbnail else None,
+                                               enable_auto_start=False)
+
+    # all broadcasts are updated concurrently
+    controller = BroadcastController(yt, args.broadcast_workers)
+    for res in controller.run(jobs, "update").values():
+        print(str(res) if isinstance(res, Exception) else json.dumps(res))
+    controller.print_states()
 
 
 def schedule_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
     """schedule broadcasts from sheet, possibly filtered by dow = Day of Week
     """
     broadcasts = GoogleSheets()
-    broadcasts.load_sheet("Broadcasts")
+    broadcasts.load_sheet("Broadcasts", replay_journal=True)
     data = broadcasts.data
     print(f"{len(data)} broadcasts loaded")
     data = list(filter(lambda d: d["Video ID"] == None or len(
         d["Video ID"].strip()) == 0, data))
+    # not select_broadcasts: unscheduled broadcasts have no Video ID to match the --db rows with
     if args.dow:
         data = list(filter(lambda d: d["Day of Week"] == args.dow, data))
 
@@ -293,7 +321,7 @@ def schedule_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
         broadcast_id = res["id"]
         broadcast["Video ID"] = broadcast_id
         broadcast["YouTube URL"] = "https://youtu.be/" + broadcast_id
-        broadcasts.save()
+        broadcasts.save_row(broadcast)
         num_scheduled += 1
 
         if num_scheduled >= max_n_schedules:
@@ -304,12 +332,10 @@ def schedule_broadcasts(yt: YouTubeHelper, args: argparse.Namespace):
 def populate_ffpl_sheet(args: argparse.Namespace):
     """Enrich sheet "FFPlaylists" with playlists to create based on events and sessions
     """
-    sessions = GoogleSheets()
-    sessions.load_sheet("Sessions")
-    events = GoogleSheets()
-    events.load_sheet("Events")
-    playlists = GoogleSheets()
-    playlists.load_sheet("FFPlaylists")
+    sheets = GoogleSheets.load_many(["Sessions", "Events", "FFPlaylists"], replay_journal=True)
+    sessions = sheets["Sessions"]
+    events = sheets["Events"]
+    playlists = sheets["FFPlaylists"]
 
     num_added = 0
 
@@ -376,12 +402,10 @@ def populate_ffpl_sheet(args: argparse.Namespace):
 def populate_pl_sheet(args: argparse.Namespace):
     """Enrich sheet "Playlists" with playlists to create based on events and sessions
     """
-    sessions = GoogleSheets()
-    sessions.load_sheet("Sessions")
-    events = GoogleSheets()
-    events.load_sheet("Events")
-    playlists = GoogleSheets()
-    playlists.load_sheet("Playlists")
+    sheets = GoogleSheets.load_many(["Sessions", "Events", "Playlists"], replay_journal=True)
+    sessions = sheets["Sessions"]
+    events = sheets["Events"]
+    playlists = sheets["Playlists"]
 
     num_added = 0
 
@@ -449,7 +473,7 @@ def create_ff_playlists(yt: YouTubeHelper):
     """Create youtube playlists based on sheet "FFPlaylists"
     """
     playlists = GoogleSheets()
-    playlists.load_sheet("FFPlaylists")
+    playlists.load_sheet("FFPlaylists", replay_journal=True)
 
     num_added = 0
     for row in playlists.data:
@@ -463,7 +487,7 @@ def create_ff_playlists(yt: YouTubeHelper):
         print(json.dumps(res))
         row["FF P ID"] = res["id"]
         num_added += 1
-        playlists.save()
+        playlists.save_row(row)
 
     print(f"{num_added} playlists created.")
 
@@ -472,7 +496,7 @@ def create_playlists(yt: YouTubeHelper):
     """Create youtube playlists based on sheet "Playlists"
     """
     playlists = GoogleSheets()
-    playlists.load_sheet("Playlists")
+    playlists.load_sheet("Playlists", replay_journal=True)
 
     num_added = 0
     for row in playlists.data:
@@ -486,7 +510,7 @@ def create_playlists(yt: YouTubeHelper):
         print(json.dumps(res))
         row["P ID"] = res["id"]
         num_added += 1
-        playlists.save()
+        playlists.save_row(row)
 
     print(f"{num_added} playlists created.")
 
@@ -513,107 +537,194 @@ def find_file_by_uid(path: str, uid: str, extension: str) -> pathlib.Path:
     return None
 
 
-def upload_ff_videos(yt: YouTubeHelper, args: argparse.Namespace):
-    """upload fast forwards based on FFVideos sheet and specified path
+def run_upload_jobs(jobs: List[Callable[[], Any]], on_done: Callable[[Any], None], max_workers: int):
+    """run jobs on a pool of max_workers threads. on_done is called on the main thread with the result of
+    every successful job in the order of jobs (e.g. to add videos to playlists in sheet order)
     """
-    playlists = GoogleSheets()
-    playlists.load_sheet("FFPlaylists")
-    videos = GoogleSheets()
-    videos.load_sheet("FFVideos")
-    num_playlists_created = 0
-    num_videos_uploaded = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [pool.submit(job) for job in jobs]
+        try:
+            for future in futures:
+                try:
+                    result = future.result()
+                except Exception as ex:
+                    print(f"\r\nERROR: upload failed: {str(ex)}")
+                    continue
+                on_done(result)
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
 
-    max_n_uploads = 100
-    if args.max_n_uploads and args.max_n_uploads < max_n_uploads:
-        max_n_uploads = args.max_n_uploads
+
+def add_video_to_sheet_playlists(yt: YouTubeHelper, playlists: GoogleSheets, writer: SheetWriter,
+                                 playlist_refs: List[str], video_id: str, col_prefix: str = "") -> int:
+    """add video to the referenced playlists of the Playlists sheet (col_prefix "FF " for FFPlaylists),
+    playlists that do not exist yet are created first. Returns the number of created playlists.
+    """
+    num_playlists_created = 0
+    p_rows = []
+    for p in playlist_refs:
+        if p not in playlists.data_by_index:
+            print(f"WARNING: could not find playlist {p}")
+            continue
+        p_row = playlists.data_by_index[p]
+        playlist_id = p_row[col_prefix + "P ID"]
+        if not playlist_id or len(playlist_id) == 0:
+            # we first have to create playlist
+            title = p_row[col_prefix + "P Title"]
+            desc = p_row[col_prefix + "P Description"]
+            print(f"\r\ncreating playlist titled '{title}'...")
+            res = yt.create_playlist(title, desc)
+            print(json.dumps(res))
+            p_row[col_prefix + "P ID"] = res["id"]
+            num_playlists_created += 1
+            writer.save_row(playlists, p_row)
+        p_rows.append(p_row)
+
+    # add to playlists
+    print(f"\r\nadd video to playlists {[p_row[col_prefix + 'P ID'] for p_row in p_rows]}")
+    p_results = yt.add_videos_to_playlists([(p_row[col_prefix + "P ID"], video_id) for p_row in p_rows])
+    for p_row, p_res in zip(p_rows, p_results):
+        print(json.dumps(p_res))
+        if not p_row[col_prefix + "P Link"] or len(p_row[col_prefix + "P Link"]) == 0:
+            # we can now create proper watch link for playlist because we have uploaded first video
+            p_row[col_prefix + "P Link"] = f"https://www.youtube.com/watch?v={
+                video_id}&list={p_row[col_prefix + 'P ID']}"
+            writer.save_row(playlists, p_row)
+    return num_playlists_created
+
+
+def upload_video_and_captions(yt: YouTubeHelper, videos: GoogleSheets, writer: SheetWriter, row: dict, cols: dict,
+                              video_path: str, subs_path: str, thumb_path: str, video_stream=None,
+                              video_size: int = None, subs_data: bytes = None, wait_for_quota: bool = False) -> str:
+    """upload video (if the row has no video id yet) with thumbnail and the captions (if not uploaded yet)
+    of a row of the Videos or FFVideos sheet, cols maps "id", "link", "title", "description" to its columns.
+    video_stream (with video_size if known) and subs_data can be provided instead of video_path and subs_path.
+    The quota units are reserved first, the row is skipped if they are not available (or waits for the quota
+    reset with wait_for_quota).
+    Returns the id of the uploaded video or None if the video was uploaded before or skipped.
+    """
+    video_id = row[cols["id"]]
+    needs_upload = not video_id or len(video_id) == 0
+    units = QuotaLedger.cost("videos.insert", "thumbnails.set", "captions.insert") if needs_upload \
+        else QuotaLedger.cost("captions.insert")
+    if not yt.quota.acquire(units, wait_for_quota):
+        print(f"skipping {row[videos.index_key]}: not enough YouTube quota left today "
+              f"(resets at {yt.quota.next_reset().isoformat()})")
+        return None
+    try:
+        return _upload_video_and_captions(yt, videos, writer, row, cols, video_path, subs_path, thumb_path,
+                                          video_stream, video_size, subs_data)
+    finally:
+        yt.quota.release()
+
+
+def _upload_video_and_captions(yt: YouTubeHelper, videos: GoogleSheets, writer: SheetWriter, row: dict, cols: dict,
+                               video_path: str, subs_path: str, thumb_path: str, video_stream,
+                               video_size: int, subs_data: bytes) -> str:
+    video_id = row[cols["id"]]
+    uploaded_id = None
+    if not video_id or len(video_id) == 0:
+        # upload video
+        print(f"\r\nuploading video {video_path}")
+        if video_stream is not None:
+            v_res = yt.upload_video_stream(video_stream, row[cols["title"]], row[cols["description"]],
+                                           size=video_size, name=str(video_path))
+        else:
+            v_res = yt.upload_video(str(video_path), row[cols["title"]], row[cols["description"]],
+                                    resume_key=f"{videos.sheet_name}-{row[videos.index_key]}")
+        print(json.dumps(v_res))
+        if not v_res:
+            raise RuntimeError(f"upload of {video_path} failed")
+        video_id = v_res["id"]
+        uploaded_id = video_id
+        row[cols["id"]] = video_id
+        row[cols["link"]] = "https://youtu.be/" + video_id
+        writer.save_row(videos, row)
+
+        # set thumbnail
+        if thumb_path:
+            print(f"\r\nsetting thumbnail {thumb_path}")
+            t_res = yt.set_thumbnail(video_id, str(thumb_path))
+            print(json.dumps(t_res))
+
+    # upload captions
+    if (subs_path or subs_data) and row["Subtitles Uploaded"] != "y":
+        print(f"\r\nuploading captions {subs_path}")
+        try:
+            c_res = yt.upload_subtitles(video_id, str(subs_path) if subs_path else None, subtitles_data=subs_data)
+            print(json.dumps(c_res))
+            row["Subtitles Uploaded"] = "y"
+            writer.save_row(videos, row)
+        except BaseException as e:
+            print(f"error occurred while uploading subtitles:\r\n{str(e)}")
+    return uploaded_id
+
+
+def select_upload_rows(videos: GoogleSheets, ready_col: str, id_col: str, max_n_uploads: int) -> List[dict]:
+    """rows of the videos sheet that are ready and still need their video or captions uploaded,
+    at most max_n_uploads of them need a video upload
+    """
+    rows = []
+    num_to_upload = 0
     for row in videos.data:
-        if row["FF Ready"] != "1":
+        if row[ready_col] != "1":
             continue
-        ex_id = row["FF Video ID"]
+        ex_id = row[id_col]
         captions_uploaded = row["Subtitles Uploaded"] == "y"
         if ex_id and len(ex_id) > 0 and captions_uploaded:
             continue  # already uploaded
-
-        src_id = row["FF Source ID"]
-        print(f"\r\nprocessing {src_id}")
-        video_path = find_file(args.path, row["FF File Name"])
-        subs_path = find_file(args.path, row["FF Subtitles File Name"])
-        thumb_path = find_file(args.path, row["FF Thumbnail File Name"])
-        if not video_path:
-            print(f"ERROR: video not found: {video_path}")
+        if num_to_upload >= max_n_uploads and not ex_id:
             continue
+        rows.append(row)
+        if not ex_id:
+            num_to_upload += 1
+    return rows
 
-        if not ex_id or len(ex_id) == 0:
-            # upload video
-            print(f"\r\nuploading video {video_path}")
-            v_res = yt.upload_video(
-                str(video_path), row["FF Title"], row["FF Description"])
-            print(json.dumps(v_res))
-            video_id = v_res["id"]
-            row["FF Video ID"] = video_id
-            row["FF Link"] = "https://youtu.be/" + video_id
-
-            videos.save()
-            num_videos_uploaded += 1
-
-            # make sure all referenced playlists are created
-            playlist_refs = row["FF Playlists"].split("|")
-
-            for p in playlist_refs:
-                if p not in playlists.data_by_index:
-                    print(f"WARNING: could not find playlist {p}")
-                    continue
-                p_row = playlists.data_by_index[p]
-                playlist_id = p_row["FF P ID"]
-                if not playlist_id or len(playlist_id) == 0:
-                    # we first have to create playlist
-                    title = p_row["FF P Title"]
-                    desc = p_row["FF P Description"]
-                    print(f"\r\ncreating playlist titled '{title}'...")
-                    res = yt.create_playlist(title, desc)
-                    print(json.dumps(res))
-                    p_row["FF P ID"] = res["id"]
-                    playlist_id = res["id"]
-                    num_playlists_created += 1
-                    playlists.save()
-
-                # add to playlists
-                print(f"\r\nadd video to playlist {playlist_id}")
-                p_res = yt.add_video_to_playlist(playlist_id, video_id)
-                print(json.dumps(p_res))
-                if not p_row["FF P Link"] or len(p_row["FF P Link"]) == 0:
-                    # we can now create proper watch link for playlist because we have uploaded first video
-                    p_row["FF P Link"] = f"https://www.youtube.com/watch?v={
-                        video_id}&list={playlist_id}"
-                    playlists.save()
-
-            # set thumbnail
-            if thumb_path:
-                print(f"\r\nsetting thumbnail {thumb_path}")
-                t_res = yt.set_thumbnail(video_id, str(thumb_path))
-                print(json.dumps(t_res))
-        else:
-            video_id = row["FF Video ID"]
-
-        # upload captions
-        if subs_path:
-            print(f"\r\nuploading captions {subs_path}")
-            try:
-                c_res = yt.upload_subtitles(video_id, str(subs_path))
-                print(json.dumps(c_res))
-                row["Subtitles Uploaded"] = "y"
-                videos.save()
-            except BaseException as e:
-                print(f"error occurred while uploading subtitles:\r\n{str(e)}")
 
-        if num_videos_uploaded >= max_n_uploads:
-            print("max num of uploads reached.")
-            break
-    print(f"\r\n{num_videos_uploaded} videos uploaded.")
+def upload_ff_videos(yt: YouTubeHelper, args: argparse.Namespace):
+    """upload fast forwards based on FFVideos sheet and specified path, args.upload_workers videos are uploaded concurrently
+    """
+    sheets = GoogleSheets.load_many(["FFPlaylists", "FFVideos"], replay_journal=True)
+    playlists = sheets["FFPlaylists"]
+    videos = sheets["FFVideos"]
+    num_playlists_created = 0
+    num_videos_uploaded = 0
+    cols = {"id": "FF Video ID", "link": "FF Link", "title": "FF Title", "description": "FF Description"}
+
+    # the number of uploads is also limited by the daily quota, see upload_video_and_captions
+    max_n_uploads = args.max_n_uploads
+
+    def make_job(row: dict, writer: SheetWriter) -> Callable:
+        def job():
+            src_id = row["FF Source ID"]
+            print(f"\r\nprocessing {src_id}")
+            video_path = find_file(args.path, row["FF File Name"])
+            subs_path = find_file(args.path, row["FF Subtitles File Name"])
+            thumb_path = find_file(args.path, row["FF Thumbnail File Name"])
+            if not video_path:
+                print(f"ERROR: video not found: {row['FF File Name']}")
+                return row, None
+            return row, upload_video_and_captions(yt, videos, writer, row, cols, video_path, subs_path, thumb_path,
+                                                  wait_for_quota=args.wait_for_quota)
+        return job
+
+    with SheetWriter() as writer:
+        def on_done(result):
+            nonlocal num_videos_uploaded, num_playlists_created
+            row, video_id = result
+            if video_id:
+                num_videos_uploaded += 1
+                num_playlists_created += add_video_to_sheet_playlists(
+                    yt, playlists, writer, row["FF Playlists"].split("|"), video_id, "FF ")
+
+        rows = select_upload_rows(videos, "FF Ready", "FF Video ID", max_n_uploads)
+        run_upload_jobs([make_job(row, writer) for row in rows], on_done, args.upload_workers)
+    print(f"\r\n{num_videos_uploaded} videos uploaded, {num_playlists_created} playlists created.")
 
 
 def upload_videos(yt: YouTubeHelper, args: argparse.Namespace):
-    """upload presentation videos based on Videos sheet and specified path
+    """upload presentation videos based on Videos sheet and specified path, args.upload_workers videos are uploaded concurrently
     """
     # path = Path(args.path)
     # channel_id = args.channel_id
@@ -622,132 +733,129 @@ def upload_videos(yt: YouTubeHelper, args: argparse.Namespace):
         print("--path has to be provided")
         return
 
-    playlists = GoogleSheets()
-    playlists.load_sheet("Playlists")
-    videos = GoogleSheets()
-    videos.load_sheet("Videos")
+    sheets = GoogleSheets.load_many(["Playlists", "Videos"], replay_journal=True)
+    playlists = sheets["Playlists"]
+    videos = sheets["Videos"]
     num_playlists_created = 0
     num_videos_uploaded = 0
     pmu: PmuHelper = None
+    cols = {"id": "Video ID", "link": "Video Link", "title": "Video Title", "description": "Video Description"}
+
+    # the number of uploads is also limited by the daily quota, see upload_video_and_captions
+    max_n_uploads = args.max_n_uploads
+    rows = select_upload_rows(videos, "Ready", "Video ID", max_n_uploads)
+    prefetcher: PmuPrefetcher = None
+    pmu_uids = [row["Video Source ID"] for row in rows if row["Video File Name"] == ":pmu:"]
+    if len(pmu_uids) > 0:
+        pmu = PmuHelper()
+    if len(pmu_uids) > 0 and not args.pmu_stream:
+        # download the next PMU videos while earlier ones are uploaded
+        depth = args.pmu_prefetch if args.pmu_prefetch else args.upload_workers + 1
+        prefetcher = PmuPrefetcher(pmu, pmu_uids, args.path, depth, int(args.pmu_disk_cap * 1024**3))
+
+    def make_job(row: dict, writer: SheetWriter) -> Callable:
+        def job():
+            src_id = row["Video Source ID"]
+            print(f"\r\nprocessing {src_id}")
+
+            vfn = row["Video File Name"]
+            is_pmu = False
+
+            video_path: str = None
+            subs_path: str = None
+            thumb_path: str = None
+            if vfn == ":pmu:" and args.pmu_stream:
+                # pipe the PMU download into the upload without temp files
+                needs_upload = not row["Video ID"]
+                stream, size, subs_data = pmu.open_presentation_video(src_id, open_video=needs_upload)
+                try:
+                    return row, upload_video_and_captions(yt, videos, writer, row, cols, f"{src_id} (PMU)", None, None,
+                                                          video_stream=stream, video_size=size, subs_data=subs_data,
+                                                          wait_for_quota=args.wait_for_quota)
+                finally:
+                    if stream is not None:
+                        stream.close()
+            elif vfn == ":pmu:":
+                is_pmu = True
+                p1, p2 = prefetcher.get(src_id)
+                video_path = Path(p1)
+                subs_path = Path(p2) if p2 is not None else None
+            else:
+                video_path = find_file(args.path, vfn)
+                subs_path = find_file(args.path, row["Video Subtitles File Name"])
+                thumb_path = find_file(args.path, row["Video Thumbnail File Name"])
 
-    max_n_uploads = 100
-    if args.max_n_uploads and args.max_n_uploads < max_n_uploads:
-        max_n_uploads = args.max_n_uploads
-    for row in videos.data:
-        if row["Ready"] != "1":
-            continue
-        ex_id = row["Video ID"]
-        captions_uploaded = row["Subtitles Uploaded"] == "y"
-        if ex_id and len(ex_id) > 0 and captions_uploaded:
-            continue  # already uploaded
-
-        src_id = row["Video Source ID"]
-        print(f"\r\nprocessing {src_id}")
-
-        vfn = row["Video File Name"]
-        is_pmu = False
-
-        video_path: str = None
-        subs_path: str = None
-        thumb_path: str = None
-        if vfn == ":pmu:":
-            is_pmu = True
-            if pmu is None:
-                pmu = PmuHelper()
-            p1, p2 = pmu.download_presentation_video(src_id, args.path)
-            video_path = Path(p1)
-            subs_path = Path(p2) if p2 is not None else None
-        else:
-            video_path = find_file(args.path, vfn)
-            subs_path = find_file(args.path, row["Video Subtitles File Name"])
-            thumb_path = find_file(args.path, row["Video Thumbnail File Name"])
-
-        if not video_path:
-            print(f"ERROR: video not found: {video_path}")
-            continue
-
-        if not ex_id or len(ex_id) == 0:
-            # upload video
-            print(
-                f"\r\nuploading video {video_path} (#upload {num_videos_uploaded + 1})")
-            v_res = yt.upload_video(
-                str(video_path), row["Video Title"], row["Video Description"])
-            print(json.dumps(v_res))
-            video_id = v_res["id"]
-            row["Video ID"] = video_id
-            row["Video Link"] = "https://youtu.be/" + video_id
+            if not video_path:
+                print(f"ERROR: video not found: {vfn}")
+                return row, None
 
             try:
-                videos.save()
-            except BaseException as ex:
-                print(f"\r\nsaving videos.csv failed: {str(ex)}")
-
-            num_videos_uploaded += 1
-
-            # make sure all referenced playlists are created
-            playlist_refs = row["Playlists"].split("|")
-
-            for p in playlist_refs:
-                if p not in playlists.data_by_index:
-                    print(f"WARNING: could not find playlist {p}")
-                    continue
-                p_row = playlists.data_by_index[p]
-                playlist_id = p_row["P ID"]
-                if not playlist_id or len(playlist_id) == 0:
-                    # we first have to create playlist
-                    title = p_row["P Title"]
-                    desc = p_row["P Description"]
-                    print(f"\r\ncreating playlist titled '{title}'...")
-                    res = yt.create_playlist(title, desc)
-                    print(json.dumps(res))
-                    p_row["P ID"] = res["id"]
-                    playlist_id = res["id"]
-                    num_playlists_created += 1
-                    playlists.save()
-
-                # add to playlists
-                print(f"\r\nadd video to playlist {playlist_id}")
-                p_res = yt.add_video_to_playlist(playlist_id, video_id)
-                print(json.dumps(p_res))
-                if not p_row["P Link"] or len(p_row["P Link"]) == 0:
-                    # we can now create proper watch link for playlist because we have uploaded first video
-                    p_row["P Link"] = f"https://www.youtube.com/watch?v={
-                        video_id}&list={playlist_id}"
-                    playlists.save()
-
-            # set thumbnail
-            if thumb_path:
-                print(f"\r\nsetting thumbnail {thumb_path}")
-                t_res = yt.set_thumbnail(video_id, str(thumb_path))
-                print(json.dumps(t_res))
-        else:
-            video_id = row["Video ID"]
+                return row, upload_video_and_captions(yt, videos, writer, row, cols, video_path, subs_path, thumb_path,
+                                                  wait_for_quota=args.wait_for_quota)
+            finally:
+                if is_pmu:
+                    # delete temp download files
+                    print("\r\ndeleting temp files...")
+                    prefetcher.release(src_id)
+        return job
+
+    with SheetWriter() as writer:
+        def on_done(result):
+            nonlocal num_videos_uploaded, num_playlists_created
+            row, video_id = result
+            if video_id:
+                num_videos_uploaded += 1
+                num_playlists_created += add_video_to_sheet_playlists(
+                    yt, playlists, writer, row["Playlists"].split("|"), video_id)
 
-        # upload captions
-        if subs_path:
-            print(f"\r\nuploading captions {subs_path}")
-            try:
-                c_res = yt.upload_subtitles(video_id, str(subs_path))
-                print(json.dumps(c_res))
-                row["Subtitles Uploaded"] = "y"
-                try:
-                    videos.save()
-                except BaseException as ex:
-                    print(f"\r\nsaving videos.csv failed: {str(ex)}")
-            except BaseException as e:
-                print(f"error occurred while uploading subtitles:\r\n{str(e)}")
+        try:
+            run_upload_jobs([make_job(row, writer) for row in rows], on_done, args.upload_workers)
+        finally:
+            if prefetcher:
+                prefetcher.close()
+    print(f"\r\n{num_videos_uploaded} videos uploaded, {num_playlists_created} playlists created.")
 
-        if is_pmu:
-            # delete temp download files
-            print("\r\ndeleting temp files...")
-            os.remove(str(video_path))
-            if subs_path is not None:
-                os.remove(str(subs_path))
 
-        if num_videos_uploaded >= max_n_uploads:
-            print("max num of uploads reached.")
-            break
-    print(f"\r\n{num_videos_uploaded} videos uploaded.")
+def run_queue(yt: YouTubeHelper, args: argparse.Namespace):
+    """run the commands listed in args.queue by priority (broadcasts before uploads) within the daily quota
+    """
+    # command: (priority, quota units needed to start it, function)
+    commands = {
+        "schedule_broadcasts": (0, QuotaLedger.cost("liveBroadcasts.insert"), schedule_broadcasts),
+        "update_broadcasts": (1, QuotaLedger.cost("liveBroadcasts.update"), update_broadcasts),
+        "upload_videos": (2, QuotaLedger.cost("videos.insert"), upload_videos),
+        "set_recordings_thumbs": (3, QuotaLedger.cost("thumbnails.set"), set_recordings_thumbs),
+        "upload_ff_videos": (4, QuotaLedger.cost("videos.insert"), upload_ff_videos),
+    }
+    scheduler = QuotaScheduler(yt.quota)
+    for name in args.queue.split(","):
+        name = name.strip()
+        if name not in commands:
+            raise RuntimeError(f"unknown command '{name}' in --queue, has to be one of {list(commands.keys())}")
+        priority, units, fn = commands[name]
+        scheduler.add(name, lambda fn=fn: fn(yt, args), units, priority)
+    scheduler.run(args.wait_for_quota)
+
+
+def reconcile_videos(yt: YouTubeHelper, args: argparse.Namespace):
+    """compare the Videos and FFVideos sheets with the channel and print the actions that bring them in line
+    (adopt uploaded videos missing in the sheet, fix caption flags, create playlists, add videos to playlists),
+    the actions are executed with args.apply
+    """
+    sheets = GoogleSheets.load_many(["Playlists", "Videos", "FFPlaylists", "FFVideos", "Broadcasts"], replay_journal=True)
+    reconciler = Reconciler(yt, sheets, use_cache=not args.refresh_inventory)
+    plan = reconciler.diff()
+    plan.print()
+    if not args.apply or plan.is_empty():
+        return
+    if not yt.quota.acquire(plan.cost(), args.wait_for_quota):
+        print(f"not enough YouTube quota left today for {plan.cost()} units "
+              f"(resets at {yt.quota.next_reset().isoformat()})")
+        return
+    try:
+        reconciler.apply(plan)
+    finally:
+        yt.quota.release()
 
 
 def populate_videos(args: argparse.Namespace):
@@ -755,20 +863,17 @@ def populate_videos(args: argparse.Namespace):
     """
     path = Path(args.path)
     is_ff: bool = args.populate_ff_videos
-    playlists = GoogleSheets()
-    playlists.load_sheet("FFPlaylists" if is_ff else "Playlists")
-    papers = GoogleSheets()
-    papers.load_sheet("PapersDB")
-    sessions = GoogleSheets()
-    sessions.load_sheet("Sessions")
-    ff_videos = GoogleSheets()
-    ff_videos.load_sheet("FFVideos" if is_ff else "Videos")
-    items1 = GoogleSheets()
-    items1.load_sheet("ItemsVIS-A")
-    items2 = GoogleSheets()
-    items2.load_sheet("ItemsEXT")
-    events = GoogleSheets()
-    events.load_sheet("Events")
+    playlists_sheet = "FFPlaylists" if is_ff else "Playlists"
+    videos_sheet = "FFVideos" if is_ff else "Videos"
+    sheets = GoogleSheets.load_many(
+        [playlists_sheet, "PapersDB", videos_sheet, "ItemsVIS-A", "ItemsEXT"], replay_journal=True)
+    playlists = sheets[playlists_sheet]
+    papers = sheets["PapersDB"]
+    ff_videos = sheets[videos_sheet]
+    items1 = sheets["ItemsVIS-A"]
+    items2 = sheets["ItemsEXT"]
+
+    events_by_prefix = TableIndex(events, "Event Prefix")
 
     num_added = 0
     to_add = []
@@ -849,10 +954,9 @@ def populate_videos(args: argparse.Namespace):
             event_title = ""
             event = session["Event Prefix"]
             if event and len(event) > 0:
-                for event_row in events.data:
-                    if event_row["Event Prefix"] == event:
-                        event_title = event_row["Event"]
-                        break
+                event_row = events_by_prefix.get(event)
+                if event_row:
+                    event_title = event_row["Event"]
             session_title = session["Session Title"]
             title = f"{session_title} Session - Fast Forward | {
                 args.venue}" if is_ff else f"{session_title} Session | {args.venue}"
@@ -949,20 +1053,17 @@ def populate_videos_papersdb(args: argparse.Namespace):
 
     pmu = PmuHelper()
     is_ff: bool = args.populate_ff_videos
-    playlists = GoogleSheets()
-    playlists.load_sheet("FFPlaylists" if is_ff else "Playlists")
-    papers = GoogleSheets()
-    papers.load_sheet("PapersDB")
-    sessions = GoogleSheets()
-    sessions.load_sheet("Sessions")
-    ff_videos = GoogleSheets()
-    ff_videos.load_sheet("FFVideos" if is_ff else "Videos")
-    items1 = GoogleSheets()
-    items1.load_sheet("ItemsVIS-A")
-    items2 = GoogleSheets()
-    items2.load_sheet("ItemsEXT")
-    events = GoogleSheets()
-    events.load_sheet("Events")
+    playlists_sheet = "FFPlaylists" if is_ff else "Playlists"
+    videos_sheet = "FFVideos" if is_ff else "Videos"
+    sheets = GoogleSheets.load_many(
+        [playlists_sheet, "PapersDB", "Sessions", videos_sheet, "ItemsVIS-A", "ItemsEXT", "Events"], replay_journal=True)
+    playlists = sheets[playlists_sheet]
+    papers = sheets["PapersDB"]
+    sessions = sheets["Sessions"]
+    ff_videos = sheets[videos_sheet]
+    items1 = sheets["ItemsVIS-A"]
+    items2 = sheets["ItemsEXT"]
+    events = sheets["Events"]
 
     num_added = 0
     to_add = []
@@ -1098,6 +1199,12 @@ if __name__ == '__main__':
                         action='store_true', default=False)
     parser.add_argument('--playlists_items', help='retrieve playlists and all items',
                         action='store_true', default=False)
+    parser.add_argument('--refresh_inventory', help='fetch the items of all playlists again instead of only the changed ones',
+                        action='store_true', default=False)
+    parser.add_argument('--reconcile', help='compare Videos/FFVideos sheets with the channel and print the needed actions',
+                        action='store_true', default=False)
+    parser.add_argument('--apply', help='with --reconcile execute the actions',
+                        action='store_true', default=False)
     parser.add_argument('--playlist_items', help='retrieve all playlist items of a playlist',
                         action='store_true', default=False)
     parser.add_argument('--create_playlist', help='create playlist',
@@ -1133,6 +1240,8 @@ if __name__ == '__main__':
                         action='store_true', default=False)
     parser.add_argument('--stop_broadcasts', help='stop broadcasts in sheet',
                         action='store_true', default=False)
+    parser.add_argument('--broadcasts_status', help='print the state of broadcasts in sheet and their streams',
+                        action='store_true', default=False)
     parser.add_argument('--upload_video', help='upload video',
                         action='store_true', default=False)
     parser.add_argument('--upload_ff_videos', help='upload FF videos in specified path and based on FFVideos sheet',
@@ -1169,10 +1278,27 @@ if __name__ == '__main__':
         '--path', help='path to file or directory that should be uploaded, e.g. video file', default=None)
     parser.add_argument(
         '--dow', help='day of week for scheduling broadcasts', default=None)
+    parser.add_argument(
+        '--db', help='select the broadcasts of the broadcast commands (except --schedule_broadcasts) by --dow '
+        'from this local conference database (e.g. ./tmp/conference.db)', default=None)
+    parser.add_argument(
+        '--sync_db', help='download the sheets into the --db conference database before running the command',
+        action='store_true', default=False)
     parser.add_argument(
         '--venue', help='venue title for titles, descriptions', default="VIS 2023")
     parser.add_argument(
         '--max_n_uploads', help='maximum number of video uploads', default=100, type=int)
+    parser.add_argument(
+        '--upload_workers', help='number of videos that are uploaded concurrently', default=4, type=int)
+    parser.add_argument(
+        '--broadcast_workers', help='number of broadcasts that are bound / transitioned concurrently', default=16, type=int)
+    parser.add_argument(
+        '--pmu_prefetch', help='number of PMU videos that are downloaded ahead of the uploads (default: upload_workers + 1)',
+        default=None, type=int)
+    parser.add_argument(
+        '--pmu_disk_cap', help='maximum GB of downloaded PMU videos on disk', default=20, type=float)
+    parser.add_argument('--pmu_stream', help='stream PMU videos to YouTube instead of downloading them to --path first',
+                        action='store_true', default=False)
     parser.add_argument('--create_session_playlists', help='when populating video playlists also create playlists for sessions',
                         action='store_true', default=False)
     parser.add_argument('--only_v', help='when populating playlists only create playlists for events starting with v-',
@@ -1180,12 +1306,25 @@ if __name__ == '__main__':
 
     parser.add_argument('--no_auth', help='do not instantiate YouTubeHelper with authentication',
                         action='store_true', default=False)
+    parser.add_argument('--daily_quota', help='YouTube Data API quota units per day',
+                        default=DEFAULT_DAILY_QUOTA, type=int)
+    parser.add_argument('--wait_for_quota', help='wait for the daily quota reset (midnight Pacific Time) instead of skipping work',
+                        action='store_true', default=False)
+    parser.add_argument('--queue', help='comma separated commands that are run by priority within the daily quota, '
+                        'e.g. upload_ff_videos,schedule_broadcasts,upload_videos', default=None)
 
     args = parser.parse_args()
 
-    yt = None if args.no_auth else YouTubeHelper()
+    if args.sync_db:
+        if not args.db:
+            raise RuntimeError("--sync_db requires --db")
+        ConferenceDatabase(args.db).sync()
+
+    yt = None if args.no_auth else YouTubeHelper(args.daily_quota)
 
-    if args.playlists:
+    if args.queue:
+        run_queue(yt, args)
+    elif args.playlists:
         playlists = yt.get_all_playlists()
         print(json.dumps(playlists))
     elif args.playlist:
@@ -1195,7 +1334,7 @@ if __name__ == '__main__':
         res = yt.get_streams()
         print(json.dumps(res))
     elif args.playlists_items:
-        res = yt.get_playlists_and_videos()
+        res = yt.get_playlists_and_videos(use_cache=not args.refresh_inventory)
         print(json.dumps(res))
     elif args.playlist_items:
         res = yt.get_playlist_items(args.id)
@@ -1229,7 +1368,7 @@ if __name__ == '__main__':
         res = yt.get_video(args.id)
         print(json.dumps(res))
     elif args.update_video:
-        res = yt.update_video(args.id, args.title, args.description)
+        res = yt.update_video(False, args.id, args.title, args.description)
         print(json.dumps(res))
     elif args.bind:
         res = yt.bind_stream_to_broadcast(args.stream_key, args.id)
@@ -1248,6 +1387,8 @@ if __name__ == '__main__':
         print(json.dumps(res))
     elif args.start_broadcasts:
         start_broadcasts(yt, args)
+    elif args.broadcasts_status:
+        broadcasts_status(yt, args)
     elif args.stop_broadcast:
         res = yt.stop_and_unbind_broadcast(args.id)
         print(json.dumps(res))
@@ -1269,5 +1410,7 @@ if __name__ == '__main__':
         upload_ff_videos(yt, args)
     elif args.upload_videos:
         upload_videos(yt, args)
+    elif args.reconcile:
+        reconcile_videos(yt, args)
     elif args.set_recordings_thumbs:
         set_recordings_thumbs(yt, args)
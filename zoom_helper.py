@@ -1,45 +1,26 @@
 import argparse
 import json
+import time
+import functools
 from datetime import datetime, timedelta, timezone
-from typing import Any, List
+from typing import List
 import requests
 import string
 import secrets
-import base64
 
-from core.google_sheets import GoogleSheets
+from core.google_sheets import GoogleSheets, SheetWriter
 from core.auth import Authentication
+from core.conference_db import ConferenceDatabase, SYNC_SHEETS
+from core.zoom_token import ZoomTokenManager
+from core.zoom_client import ZoomClient, DEFAULT_RATE_PER_SECOND, ZOOM_API_URL
+from core.http_client import http_client
 
 
 def get_headers_with_access(auth: Authentication):
-    client_id = auth.zoom["client_id"]
-    account_id = auth.zoom["account_id"]
-    client_secret = auth.zoom["client_secret"]
-
-    credentials = base64.b64encode(
-        f"{client_id}:{client_secret}".encode()).decode()
-
-    # Create the Authorization header
-    headers = {
-        "Authorization": f"Basic {credentials}"
-    }
-
-    oauth_endpoint = f"https://zoom.us/oauth/token?grant_type=account_credentials&account_id={
-        account_id}"
-
-    payload = {}
-
-    response = requests.request(
-        "POST", oauth_endpoint, headers=headers, data=payload)
-
-    if response.status_code == 200:
-        access_token = response.json()["access_token"]
-        access_headers = {
-            "Authorization": f"Bearer {access_token}"
-        }
-        return access_headers
-    else:
-        None
+    """authorization headers with the access token of the Zoom app, the token is cached and shared
+    between all calls and threads until shortly before it expires (see ZoomTokenManager)
+    """
+    return ZoomTokenManager.for_auth(auth).headers()
 
 
 def format_time_iso8601_utc(t: datetime):
@@ -55,8 +36,8 @@ def delete_meeting(auth: Authentication, meeting_id: str) -> requests.Response:
     """delete a scheduled Zoom meeting
     """
     headers = get_headers_with_access(auth)
-    resp = requests.delete(
-        f"https://api.zoom.us/v2/meetings/{meeting_id}", headers=headers).json()
+    resp = http_client.delete(
+        f"{ZOOM_API_URL}/meetings/{meeting_id}", headers=headers).json()
     return resp
 
 
@@ -144,8 +125,8 @@ def schedule_zoom_webinar(auth: Authentication, title: str, password: str, start
     }
 
     headers = get_headers_with_access(auth)
-    zoom_info = requests.post(f"https://api.zoom.us/v2/users/{user_id}/webinars",
-                              json=webinar_info, headers=headers).json()
+    zoom_info = http_client.post(f"{ZOOM_API_URL}/users/{user_id}/webinars",
+                                 json=webinar_info, headers=headers).json()
     return zoom_info
 
 
@@ -153,8 +134,8 @@ def get_webinar(auth: Authentication, webinar_id: str) -> requests.Response:
     """ get info of a scheduled Zoom webinar
     """
     headers = get_headers_with_access(auth)
-    resp = requests.get(
-        f"https://api.zoom.us/v2/webinars/{webinar_id}", headers=headers).json()
+    resp = http_client.get(
+        f"{ZOOM_API_URL}/webinars/{webinar_id}", headers=headers).json()
     return resp
 
 
@@ -162,21 +143,26 @@ def get_meeting(auth: Authentication, meeting_id: str) -> requests.Response:
     """get info of a scheduled Zoom meeting such as start_url
     """
     headers = get_headers_with_access(auth)
-    resp = requests.get(
-        f"https://api.zoom.us/v2/meetings/{meeting_id}", headers=headers).json()
+    resp = http_client.get(
+        f"{ZOOM_API_URL}/meetings/{meeting_id}", headers=headers).json()
     return resp
 
 
-def update_zoom_meeting(headers: Any, meeting_id: int, title: str, password: str, start: datetime, end: datetime,
-                        agenda: str, user_id: str, session_id: str):
-    """Update a zoom meeting
-    """
+def truncate_meeting_texts(title: str, agenda: str):
     # Max Zoom meeting topic length is 200 characters
     if len(title) > 200:
         title = title[0:199]
     # Max agenda length is 2000 characters
     if len(agenda) > 2000:
         agenda = agenda[0:1999]
+    return title, agenda
+
+
+def update_zoom_meeting(client: ZoomClient, meeting_id: int, title: str, password: str, start: datetime, end: datetime,
+                        agenda: str, user_id: str, session_id: str) -> requests.Response:
+    """Update a zoom meeting
+    """
+    title, agenda = truncate_meeting_texts(title, agenda)
 
     difference = end - start
     duration = divmod(difference.total_seconds(), 60)[0]
@@ -209,22 +195,14 @@ def update_zoom_meeting(headers: Any, meeting_id: int, title: str, password: str
         "type": 2
     }
 
-    meeting_resp = requests.patch(f"https://api.zoom.us/v2/meetings/{meeting_id}",
-                                  json=meeting_info, headers=headers)
-    print(meeting_resp)
-    return meeting_resp
+    return client.request("PATCH", f"/meetings/{meeting_id}", json=meeting_info)
 
 
-def schedule_zoom_meeting(headers: Any, title: str, password: str, start: datetime, end: datetime,
-                          agenda: str, user_id: str, session_id: str):
-    """Schedule a zoom meeting
+def schedule_zoom_meeting(client: ZoomClient, title: str, password: str, start: datetime, end: datetime,
+                          agenda: str, user_id: str, session_id: str) -> requests.Response:
+    """Schedule a zoom meeting, the created meeting is returned in the response body (status 201)
     """
-    # Max Zoom meeting topic length is 200 characters
-    if len(title) > 200:
-        title = title[0:199]
-    # Max agenda length is 2000 characters
-    if len(agenda) > 2000:
-        agenda = agenda[0:1999]
+    title, agenda = truncate_meeting_texts(title, agenda)
 
     difference = end - start
     duration = divmod(difference.total_seconds(), 60)[0]
@@ -281,167 +259,246 @@ def schedule_zoom_meeting(headers: Any, title: str, password: str, start: dateti
         "type": 2
     }
 
-    create_meeting_resp = requests.post(f"https://api.zoom.us/v2/users/{user_id}/meetings",
-                                        json=meeting_info, headers=headers)
-    print(create_meeting_resp)
-    return create_meeting_resp.json()
+    return client.request("POST", f"/users/{user_id}/meetings", json=meeting_info)
 
 
-def schedule_meetings(args: argparse.Namespace):
-    """Schedule meetings based on Sessions sheet in Data spreadsheet
+def list_host_meetings(client: ZoomClient, host: str) -> List[dict]:
+    """all scheduled (not yet expired) meetings of a host, the agenda of listed meetings is cut to 250 characters
     """
-    auth = Authentication()
-    headers = get_headers_with_access(auth)
-
-    sessions_sheet = GoogleSheets()
-    sessions_sheet.load_sheet("Sessions")
-    tracks = GoogleSheets()
-    tracks.load_sheet("Tracks")
-    tracks_dict: dict[dict[str, Any], Any] = {}
-    for row in tracks.data:
-        tracks_dict[row["Track"]] = row
-    events_sheet = GoogleSheets()
-    events_sheet.load_sheet("Events")
-    events = events_sheet.data
-    events_dict = dict()
-    for e in events:
-        events_dict[e["Event Prefix"]] = e["Event"]
-
-    # Filter out sessions that have not been scheduled yet and have a Track
-    sessions = list(filter(lambda row: row["Track"] and len(row["Track"].strip()) > 0 and row["Track"].strip() != "various" and
-                           (row["Zoom Meeting ID"] is None or len(row["Zoom Meeting ID"].strip()) == 0), sessions_sheet.data))
-
-    # Filter for args event_prefix
-    if args.event_prefix and len(args.event_prefix) > 0:
-        sessions = list(
-            filter(lambda it: it["Event Prefix"] == args.event_prefix, sessions))
+    meetings = []
+    page_token = ""
+    while True:
+        resp = client.request("GET", f"/users/{host}/meetings",
+                              params={"type": "scheduled", "page_size": 300, "next_page_token": page_token})
+        if resp.status_code != 200:
+            raise RuntimeError(f"listing meetings of {host} failed: {resp.status_code} {resp.text}")
+        info = resp.json()
+        meetings += info.get("meetings", [])
+        page_token = info.get("next_page_token")
+        if not page_token:
+            return meetings
+
+
+def desired_meeting(session: dict, track: dict, event_name: str, args: argparse.Namespace) -> dict:
+    """meeting parameters of a session as they are sent to Zoom
+    """
+    start = datetime.fromisoformat(session["DateTime Start"].replace('Z', '+00:00'))
+    end = datetime.fromisoformat(session["DateTime End"].replace('Z', '+00:00'))
+    start = start - timedelta(minutes=args.time_before)
+    end = end + timedelta(minutes=args.time_after)
+    agenda = f"Event: {event_name}\n Session: {
+        session["Session Title"]}\n Program: https://ieeevis.org/year/2024/program/session_{session["Session ID"]}.html"
+    title, agenda = truncate_meeting_texts(f"IEEE VIS - {session['Session Title']}", agenda)
+    return {"title": title, "agenda": agenda, "start": start, "end": end, "host": track["Zoom Host ID"]}
+
+
+def meeting_changes(meeting: dict, desired: dict) -> List[str]:
+    """fields of a listed meeting that differ from the desired parameters
+    """
+    changes = []
+    if meeting.get("topic") != desired["title"]:
+        changes.append("topic")
+    if meeting.get("start_time") != format_time_iso8601_utc(desired["start"].astimezone(timezone.utc)):
+        changes.append("start_time")
+    if meeting.get("duration") != int(divmod((desired["end"] - desired["start"]).total_seconds(), 60)[0]):
+        changes.append("duration")
+    # listed agendas are cut to 250 characters
+    agenda = meeting.get("agenda", "")
+    if agenda != desired["agenda"] and not (len(agenda) >= 250 and desired["agenda"].startswith(agenda)):
+        changes.append("agenda")
+    return changes
+
+
+def plan_meetings(client: ZoomClient, args: argparse.Namespace, mode: str):
+    """Compute the desired meeting of every selected session, diff it against the meetings of the hosts
+    (one list call per host, all hosts in parallel) and return (Sessions sheet, plan entries).
+    mode "schedule" plans sessions without meeting: "adopt" an existing meeting of the host with the same
+    topic and start (e.g. created by a run that could not save the sheet, updated if it differs) or "create" one.
+    mode "update" plans sessions with meeting: "update" if topic, start, duration or agenda differ, otherwise "noop".
+    """
+    sheets = GoogleSheets.load_many(["Sessions", "Tracks", "Events"], replay_journal=True)
+    sessions_sheet = sheets["Sessions"]
+    tracks_dict: dict[str, dict] = {row["Track"]: row for row in sheets["Tracks"].data}
+    events_dict = {e["Event Prefix"]: e["Event"] for e in sheets["Events"].data}
+
+    def has_meeting(row):
+        return row["Zoom Meeting ID"] is not None and len(row["Zoom Meeting ID"].strip()) > 0
+
+    # Filter out sessions without Track and, depending on mode, with or without Zoom Meeting ID,
+    # meetings are not scheduled for sessions of the "various" track, but their existing meetings are updated
+    sessions = list(filter(lambda row: row["Track"] and len(row["Track"].strip()) > 0
+                           and (mode == "update" or row["Track"].strip() != "various")
+                           and has_meeting(row) == (mode == "update"), sessions_sheet.data))
+    if args.db:
+        # the sheet rows are kept (their Zoom Meeting ID is saved), the database selects them by Session ID
+        selected = set(s["Session ID"] for s in ConferenceDatabase(args.db).filter_sessions(args.dow, args.event_prefix, args.track))
+        sessions = list(filter(lambda it: it["Session ID"] in selected, sessions))
+        print(f"{len(sessions)} sessions selected from {args.db}")
+    else:
+        if args.event_prefix and len(args.event_prefix) > 0:
+            sessions = list(filter(lambda it: it["Event Prefix"] == args.event_prefix, sessions))
+        if args.track and len(args.track) > 0:
+            sessions = list(filter(lambda it: it["Track"] == args.track, sessions))
+        # Filter for day of the week e.g. mon1, tue1 for 1 block on Monday or Tuesday
+        if args.dow:
+            sessions = list(filter(lambda it: it["Day of Week"] == args.dow, sessions))
+
+    entries = []
+    for session in sessions:
+        track = tracks_dict[session["Track"]]
+        if not track["Zoom Host ID"]:
+            print(f"Zoom Host not found for session {session['Session ID']}")
+            continue
+        entries.append({"session": session, "track": track,
+                        "desired": desired_meeting(session, track, events_dict[session["Event Prefix"]], args)})
+
+    hosts = sorted({e["desired"]["host"] for e in entries})
+    listed = client.run_all({host: functools.partial(list_host_meetings, client, host) for host in hosts})
+    meetings_by_id = {}
+    meetings_by_topic = {}
+    for host, r in listed.items():
+        if r["error"] is not None:
+            raise r["error"]
+        for m in r["response"]:
+            meetings_by_id[str(m["id"])] = m
+            meetings_by_topic.setdefault((host, m.get("topic"), m.get("start_time")), []).append(m)
+
+    for e in entries:
+        desired = e["desired"]
+        if mode == "update":
+            meeting = meetings_by_id.get(e["session"]["Zoom Meeting ID"].strip())
+            e["meeting"] = meeting
+            # meetings that are not listed (e.g. of another host) are updated without diffing
+            e["changes"] = meeting_changes(meeting, desired) if meeting else ["unlisted"]
+            e["action"] = "update" if len(e["changes"]) > 0 else "noop"
+        else:
+            key = (desired["host"], desired["title"], format_time_iso8601_utc(desired["start"].astimezone(timezone.utc)))
+            candidates = meetings_by_topic.get(key)
+            e["meeting"] = candidates.pop(0) if candidates else None
+            # an adopted meeting is updated as well if its duration or agenda differ
+            e["changes"] = meeting_changes(e["meeting"], desired) if e["meeting"] else []
+            e["action"] = "adopt" if e["meeting"] else "create"
+
+    num_actions = 0
+    for e in entries:
+        if e["action"] != "noop":
+            num_actions += 1
+            if num_actions > args.max_n_schedules:
+                e["action"] = "skip"
+    return sessions_sheet, entries
+
+
+def print_meeting_plan(entries: List[dict]):
+    table = [["Session ID", "Action", "Meeting ID", "Host", "Start", "Changes"]]
+    for e in entries:
+        meeting_id = str(e["meeting"]["id"]) if e["meeting"] else e["session"]["Zoom Meeting ID"]
+        table.append([e["session"]["Session ID"], e["action"], meeting_id or "", e["desired"]["host"],
+                      format_time_iso8601_utc(e["desired"]["start"].astimezone(timezone.utc)), ",".join(e["changes"])])
+    widths = [max(len(str(row[i])) for row in table) for i in range(len(table[0]))]
+    for row in table:
+        print("  ".join(str(v).ljust(w) for v, w in zip(row, widths)))
+    counts = {}
+    for e in entries:
+        counts[e["action"]] = counts.get(e["action"], 0) + 1
+    print(", ".join(f"{n} {action}" for action, n in counts.items()) if counts else "nothing to do")
+
+
+def execute_meeting_plan(client: ZoomClient, sessions_sheet: GoogleSheets, entries: List[dict]):
+    """create / adopt / update the meetings of the plan in parallel, every created or adopted meeting
+    is written back to the Sessions sheet (journaled) as soon as its call returns
+    """
+    def write_back(session: dict, track: dict, meeting: dict, writer: SheetWriter):
+        session["Zoom Meeting ID"] = str(meeting["id"])
+        session["Zoom Password"] = meeting.get("password", "")
+        session["Zoom URL"] = meeting["join_url"]
+        session["Zoom Host Start URL"] = meeting.get("start_url", "")
+        session["Zoom Host Username"] = track["Zoom Host ID"]
+        session["Slido URL"] = track["Slido URL"]
+        writer.save_row(sessions_sheet, session)
+
+    def make_call(e: dict, writer: SheetWriter):
+        session, track, desired = e["session"], e["track"], e["desired"]
+
+        def call() -> requests.Response:
+            if e["action"] == "create":
+                resp = schedule_zoom_meeting(client, desired["title"], generate_password(), desired["start"],
+                                             desired["end"], desired["agenda"], desired["host"], session["Session ID"])
+                if resp.status_code == 201:
+                    write_back(session, track, resp.json(), writer)
+            elif e["action"] == "adopt":
+                # the listed meeting has no password and start url
+                resp = client.request("GET", f"/meetings/{e['meeting']['id']}")
+                if resp.status_code == 200:
+                    meeting = resp.json()
+                    write_back(session, track, meeting, writer)
+                    if len(e["changes"]) > 0:
+                        resp = update_zoom_meeting(client, int(meeting["id"]), desired["title"],
+                                                   meeting.get("password", ""), desired["start"], desired["end"],
+                                                   desired["agenda"], desired["host"], session["Session ID"])
+            else:
+                resp = update_zoom_meeting(client, int(session["Zoom Meeting ID"]), desired["title"],
+                                           session["Zoom Password"], desired["start"], desired["end"],
+                                           desired["agenda"], desired["host"], session["Session ID"])
+            return resp
+        return call
+
+    to_run = [e for e in entries if e["action"] in ("create", "adopt", "update")]
+    start = time.perf_counter()
+    with SheetWriter() as writer:
+        results = client.run_all({e["session"]["Session ID"]: make_call(e, writer) for e in to_run})
+    success = ZoomClient.print_summary(results, (200, 201, 204), time.perf_counter() - start)
+    print(f"{success} out of {len(to_run)} meetings created, adopted or updated")
 
-    # Filter for args track id
-    if args.track and len(args.track) > 0:
-        sessions = list(filter(lambda it: it["Track"] == args.track, sessions))
-    # Filter for day of the week e.g. mon1, tue1 for 1 block on Monday or Tuesday
-    if args.dow:
-        sessions = list(
-            filter(lambda it: it["Day of Week"] == args.dow, sessions))
 
-    num_to_schedule = len(sessions)
-    if num_to_schedule > args.max_n_schedules:
-        num_to_schedule = args.max_n_schedules
+def schedule_meetings(args: argparse.Namespace):
+    """Schedule meetings for sessions in Sessions sheet that have none yet, print the plan only with --plan
+    """
+    client = ZoomClient(Authentication(), args.workers, args.rate_limit)
+    sessions_sheet, entries = plan_meetings(client, args, "schedule")
+    print_meeting_plan(entries)
+    if not args.plan:
+        execute_meeting_plan(client, sessions_sheet, entries)
 
-    print(f"{num_to_schedule} meetings will be scheduled")
 
-    for i in range(num_to_schedule):
-        session: dict[str, Any] = sessions[i]
-        title = session["Session Title"]
-        track = tracks_dict[session["Track"]]
-        session_id = session["Session ID"]
-        start = datetime.fromisoformat(
-            session["DateTime Start"].replace('Z', '+00:00'))
-        end = datetime.fromisoformat(
-            session["DateTime End"].replace('Z', '+00:00'))
-        start = start - timedelta(minutes=args.time_before)
-        end = end + timedelta(minutes=args.time_after)
-        room = track["Room Name"]
-        host = track["Zoom Host ID"]
-        password = generate_password()
-        event_name = events_dict[session["Event Prefix"]]
-        agenda = f"Event: {event_name}\n Session: {
-            session["Session Title"]}\n Program: https://ieeevis.org/year/2024/program/session_{session["Session ID"]}.html"
-        if host:
-            print(
-                f"\r\n{i+1}/{num_to_schedule}: {title} - {room} | {start} - {end} | {host}")
-            resp = schedule_zoom_meeting(
-                headers, f"IEEE VIS - {title}", password, start, end, agenda, host, session_id)
-            print(f"\r\n{json.dumps(resp, indent=4)}")
-            session["Zoom Meeting ID"] = str(resp["id"])
-            session["Zoom Password"] = password
-            session["Zoom URL"] = resp["join_url"]
-            session["Zoom Host Start URL"] = resp["start_url"]
-            session["Zoom Host Username"] = host
-            session["Slido URL"] = track["Slido URL"]
-
-            sessions_sheet.save()
-        else:
-            print(f"Zoom Host not found for session {session_id}")
+def update_meetings(args: argparse.Namespace):
+    """Update the meetings of sessions in Sessions sheet that changed, print the plan only with --plan
+    """
+    client = ZoomClient(Authentication(), args.workers, args.rate_limit)
+    sessions_sheet, entries = plan_meetings(client, args, "update")
+    print_meeting_plan(entries)
+    if not args.plan:
+        execute_meeting_plan(client, sessions_sheet, entries)
 
 
-def update_meetings(args: argparse.Namespace):
-    """Schedule meetings based on Sessions sheet in Data spreadsheet
+def load_filtered_sessions(args: argparse.Namespace) -> List[dict]:
+    """sessions filtered by --dow, --event_prefix and --track, queried from the local conference database
+    if --db is specified, otherwise from the Sessions sheet
     """
-    auth = Authentication()
-    headers = get_headers_with_access(auth)
+    if args.db:
+        sessions = ConferenceDatabase(args.db).filter_sessions(args.dow, args.event_prefix, args.track)
+        print(f"{len(sessions)} sessions selected from {args.db}")
+        return sessions
 
-    sessions_sheet = GoogleSheets()
-    sessions_sheet.load_sheet("Sessions")
-    tracks = GoogleSheets()
-    tracks.load_sheet("Tracks")
-    tracks_dict: dict[dict[str, Any], Any] = {}
-    for row in tracks.data:
-        tracks_dict[row["Track"]] = row
-    events_sheet = GoogleSheets()
-    events_sheet.load_sheet("Events")
-    events = events_sheet.data
-    events_dict = dict()
-    for e in events:
-        events_dict[e["Event Prefix"]] = e["Event"]
-
-    # Filter out sessions have a Track and Zoom Meeting ID already to update
-    sessions = list(filter(lambda row: row["Track"] and len(
-        row["Track"].strip()) > 0 and row["Zoom Meeting ID"] and len(row["Zoom Meeting ID"].strip()) > 0, sessions_sheet.data))
+    session_sheet = GoogleSheets()
+    session_sheet.load_sheet("Sessions")
+    sessions = session_sheet.data
 
+    print(f"{len(sessions)} sessions loaded")
+    # Filter for day of the week e.g. mon1, tue1 for 1 block on Monday or Tuesday
+    if args.dow:
+        sessions = list(
+            filter(lambda it: it["Day of Week"] == args.dow, sessions))
     # Filter for args event_prefix
     if args.event_prefix and len(args.event_prefix) > 0:
         sessions = list(
             filter(lambda it: it["Event Prefix"] == args.event_prefix, sessions))
-
     # Filter for args track id
     if args.track and len(args.track) > 0:
         sessions = list(filter(lambda it: it["Track"] == args.track, sessions))
-    # Filter for day of the week e.g. mon1, tue1 for 1 block on Monday or Tuesday
-    if args.dow:
-        sessions = list(
-            filter(lambda it: it["Day of Week"] == args.dow, sessions))
-
-    num_to_schedule = len(sessions)
-    if num_to_schedule > args.max_n_schedules:
-        num_to_schedule = args.max_n_schedules
+    return sessions
 
-    print(f"{num_to_schedule} meetings will be updated")
 
-    success = 0
-    for i in range(num_to_schedule):
-        session: dict[str, Any] = sessions[i]
-        title = session["Session Title"]
-        track = tracks_dict[session["Track"]]
-        session_id = session["Session ID"]
-        start = datetime.fromisoformat(
-            session["DateTime Start"].replace('Z', '+00:00'))
-        end = datetime.fromisoformat(
-            session["DateTime End"].replace('Z', '+00:00'))
-        start = start - timedelta(minutes=args.time_before)
-        end = end + timedelta(minutes=args.time_after)
-        room = track["Room Name"]
-        host = track["Zoom Host ID"]
-
-        meeting_id = int(session["Zoom Meeting ID"])
-        password = session["Zoom Password"]
-        event_name = events_dict[session["Event Prefix"]]
-        agenda = f"Event: {event_name}\n Session: {
-            session["Session Title"]}\n Program: https://ieeevis.org/year/2024/program/session_{session["Session ID"]}.html"
-        
-        if host:
-            print(
-                f"\r\n{i+1}/{num_to_schedule}: {title} - {room} | {start} - {end} | {host}")
-            resp = update_zoom_meeting(
-                headers, meeting_id, f"IEEE VIS - {title}", password, start, end, agenda, host, session_id)
-            if resp.status_code == 204:
-                success += 1
-        else:
-            print(f"Zoom Host not found for session {session_id}")
-    print(f"{success} out of {len(sessions)} updated successfully")
-
-
-def update_zoom_meeting_livestream(auth: Authentication, meeting_id: int, page_url: str, stream_key: str, stream_url: str, resolution: str = "720p"):
+def update_zoom_meeting_livestream(client: ZoomClient, meeting_id: int, page_url: str, stream_key: str, stream_url: str, resolution: str = "720p"):
     livestream_info = {
         # The live stream page URL.
         "page_url": page_url,
@@ -452,56 +509,34 @@ def update_zoom_meeting_livestream(auth: Authentication, meeting_id: int, page_u
         "resolution": resolution
     }
 
-    headers = get_headers_with_access(auth)
-    response = requests.patch(f"https://api.zoom.us/v2/meetings/{
-                              meeting_id}/livestream", headers=headers, json=livestream_info)
-    return response
+    return client.request("PATCH", f"/meetings/{meeting_id}/livestream", json=livestream_info)
 
 
 def update_session_zoom_livestreams(args: argparse.Namespace):
-    auth = Authentication()
-    session_sheet = GoogleSheets()
-    session_sheet.load_sheet("Sessions")
-    sessions = session_sheet.data
-    streamkeys_sheet = GoogleSheets()
-    streamkeys_sheet.load_sheet("StreamKeys")
-    streamkeys = streamkeys_sheet.data
+    client = ZoomClient(Authentication(), args.workers, args.rate_limit)
+    if args.db:
+        streamkeys = ConferenceDatabase(args.db).select("StreamKeys")
+    else:
+        streamkeys = GoogleSheets.load_many(["StreamKeys"])["StreamKeys"].data
     streamkeys_dict = dict()
     for sk in streamkeys:
         streamkeys_dict[sk["Track"]] = sk
-
-    print(f"{len(sessions)} sessions loaded")
-    # Filter for day of the week e.g. mon1, tue1 for 1 block on Monday or Tuesday
-    if args.dow:
-        sessions = list(
-            filter(lambda it: it["Day of Week"] == args.dow, sessions))
-    # Filter for args event_prefix
-    if args.event_prefix and len(args.event_prefix) > 0:
-        sessions = list(
-            filter(lambda it: it["Event Prefix"] == args.event_prefix, sessions))
-    # Filter for args track id
-    if args.track and len(args.track) > 0:
-        sessions = list(filter(lambda it: it["Track"] == args.track, sessions))
+    sessions = load_filtered_sessions(args)
 
     print(f"Updating livestream for {len(sessions)} Zoom Meetings")
-    success = 0
+    calls = {}
     for s in sessions:
         id = s["Zoom Meeting ID"]
         sk = streamkeys_dict[s["Track"]]
-        page_url = s["Session YouTube URL"]
-        stream_key = sk["Stream Key"]
-        stream_url = sk["Ingestion URL"]
-        resp = update_zoom_meeting_livestream(
-            auth, id, page_url, stream_key, stream_url, "720p")
-        if resp.status_code != 204:
-            print(resp.status_code, resp.text)
-            print(f"{id} meeting not updated")
-        else:
-            success += 1
+        calls[id] = functools.partial(update_zoom_meeting_livestream, client, id, s["Session YouTube URL"],
+                                      sk["Stream Key"], sk["Ingestion URL"], "720p")
+    start = time.perf_counter()
+    results = client.run_all(calls)
+    success = ZoomClient.print_summary(results, 204, time.perf_counter() - start)
     print(f"{success} out of {len(sessions)} updated")
 
 
-def update_livestream_status(auth: Authentication, meeting_id: int, action: str, layout: str, close_caption: str):
+def update_livestream_status(client: ZoomClient, meeting_id: int, action: str, layout: str, close_caption: str):
     livestream_info = {
         # "start" - Start a livestream. "stop" - Stop an ongoing livestream. "mode" - Control a livestream view at runtime.
         "action": action,
@@ -514,10 +549,7 @@ def update_livestream_status(auth: Authentication, meeting_id: int, action: str,
         }
     }
 
-    headers = get_headers_with_access(auth)
-    response = requests.patch(f"https://api.zoom.us/v2/meetings/{
-                              meeting_id}/livestream/status", headers=headers, json=livestream_info)
-    return response
+    return client.request("PATCH", f"/meetings/{meeting_id}/livestream/status", json=livestream_info)
 
 
 def start_livestreams(args: argparse.Namespace):
@@ -529,35 +561,17 @@ def stop_livestreams(args: argparse.Namespace):
 
 
 def update_status_for_livestreams(args: argparse.Namespace, action: str):
-    auth = Authentication()
-    session_sheet = GoogleSheets()
-    session_sheet.load_sheet("Sessions")
-    sessions = session_sheet.data
-
-    print(f"{len(sessions)} sessions loaded")
-    # Filter for day of the week e.g. mon1, tue1 for 1 block on Monday or Tuesday
-    if args.dow:
-        sessions = list(
-            filter(lambda it: it["Day of Week"] == args.dow, sessions))
-    # Filter for args event_prefix
-    if args.event_prefix and len(args.event_prefix) > 0:
-        sessions = list(
-            filter(lambda it: it["Event Prefix"] == args.event_prefix, sessions))
-    # Filter for args track id
-    if args.track and len(args.track) > 0:
-        sessions = list(filter(lambda it: it["Track"] == args.track, sessions))
+    """start or stop the livestreams of all selected sessions at once, args.workers requests are sent concurrently
+    """
+    client = ZoomClient(Authentication(), args.workers, args.rate_limit)
+    sessions = load_filtered_sessions(args)
 
     print(f"Updating livestream status for {len(sessions)} Zoom Meetings")
-    success = 0
-    for s in sessions:
-        id = s["Zoom Meeting ID"]
-        resp = update_livestream_status(
-            auth, id, action, "follow_host", "off")
-        if resp.status_code != 204:
-            print(resp.status_code, resp.text)
-            print(f"{id} meeting not updated")
-        else:
-            success += 1
+    calls = {s["Zoom Meeting ID"]: functools.partial(update_livestream_status, client, s["Zoom Meeting ID"],
+                                                     action, "follow_host", "off") for s in sessions}
+    start = time.perf_counter()
+    results = client.run_all(calls)
+    success = ZoomClient.print_summary(results, 204, time.perf_counter() - start)
     print(f"{success} out of {len(sessions)} updated")
 
 
@@ -587,6 +601,13 @@ if __name__ == '__main__':
     parser.add_argument("--time_after", default=5, type=int,
                         help='Scheduled end time of meeting after official session end, in minutes')
 
+    parser.add_argument("--plan", action="store_true",
+                        help='with --schedule or --update only print the planned creates / updates')
+    parser.add_argument("--workers", default=16, type=int,
+                        help='number of Zoom API requests that are sent concurrently')
+    parser.add_argument("--rate_limit", default=DEFAULT_RATE_PER_SECOND, type=int,
+                        help='maximum number of Zoom API requests per second')
+
     parser.add_argument("--id", default=None, type=str, help='meeting id')
     parser.add_argument("--dow", default=None, type=str,
                         help='Day of Week and Session Block Number (e.g., mon1 = Monday First Block, tue3 = Tuesday Third Block)')
@@ -597,8 +618,20 @@ if __name__ == '__main__':
     parser.add_argument("--disable_dialin", action="store_true", default=True,
                         help='Enable dial-in for meetings (requires Pro account)')
 
+    parser.add_argument("--db", default=None, type=str,
+                        help='select sessions by --dow, --event_prefix and --track from this local conference database '
+                             '(e.g. ./tmp/conference.db), the livestream commands also read sessions and stream keys from it '
+                             'instead of downloading the sheets')
+    parser.add_argument("--sync_db", action="store_true",
+                        help='download the sheets into the --db conference database before running the command')
+
     args = parser.parse_args()
 
+    if args.sync_db:
+        if not args.db:
+            raise RuntimeError("--sync_db requires --db")
+        ConferenceDatabase(args.db).sync(SYNC_SHEETS + ["StreamKeys"])
+
     if args.schedule:
         schedule_meetings(args)
     elif args.update: